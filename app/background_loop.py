@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """An event loop running on a daemon thread, for synchronous callers that reuse async resources.
+
+    Streamlit reruns the script on a new thread for every interaction; running all coroutines on one long-lived
+    loop lets clients and sessions created on it be reused across reruns.
+    """
+
+    def __init__(self, name='background-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def run(self, coro, timeout=None):
+        """Run ``coro`` on the loop and block until it returns or ``timeout`` seconds pass."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Stop the loop and wait for its thread to exit."""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+import pandas as pd
+from loguru import logger
+
+from app.config import Config
+from app.credential_pool import create_credential_pool
+from app.output_formats import iter_frames, open_writer, output_path, take_rows, write_frame
+from app.rate_limiter import configure_scheduler
+from app.reddit_scraper import POST_COLUMNS, RedditScraper
+
+BATCH_OUTPUT_PATH = output_path(Config.BATCH_CSV_PATH, Config.OUTPUT_FORMAT)
+
+
+def read_queries(path):
+    """Read one query per line, skipping blank lines, ``#`` comments and repeated queries."""
+    with open(path, encoding='utf-8') as f:
+        queries = (line.strip() for line in f)
+        return list(dict.fromkeys(query for query in queries if query and not query.startswith('#')))
+
+
+class ProgressJournal:
+    """Append-only JSON lines record of the queries of a batch that are done, so a batch can resume.
+
+    A query is recorded only after its shard is written, and a line cut short by an interruption is ignored.
+    """
+
+    def __init__(self, path=Config.BATCH_JOURNAL_PATH):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.done[entry['query']] = entry
+
+    def record(self, query, shard_path, rows):
+        entry = {'query': query, 'shard': shard_path, 'rows': rows}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[query] = entry
+
+
+def shard_path(shard_dir, query, extension):
+    """Return the shard file of a query; the name is stable, so a resumed batch finds earlier shards."""
+    return os.path.join(shard_dir, hashlib.sha1(query.encode('utf-8')).hexdigest()[:16] + extension)
+
+
+# Per-process state of the pool workers: each worker runs its own event loop and Reddit client.
+_worker_loop = None
+_worker_scraper = None
+
+
+def _init_worker(client_id, client_secret, user_agent, rate_share):
+    global _worker_loop, _worker_scraper
+    scheduler = configure_scheduler(share=rate_share)
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+    async def create_reddit():
+        return RedditScraper.create_reddit(client_id, client_secret, user_agent, scheduler)
+
+    reddit = _worker_loop.run_until_complete(create_reddit())
+    reddit.read_only = True
+    _worker_scraper = RedditScraper(client_id, client_secret, user_agent, reddit=reddit,
+                                    credential_pool=create_credential_pool())
+    Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    if not _worker_loop.is_closed():
+        _worker_loop.run_until_complete(_worker_scraper.reddit.close())
+        if _worker_scraper.credential_pool is not None:
+            _worker_loop.run_until_complete(_worker_scraper.credential_pool.close())
+        _worker_loop.close()
+
+
+def _scrape_query(query, path, subreddit_limit, post_limit):
+    """Scrape one query in a worker and write its posts to a shard file. Returns the number of posts."""
+    try:
+        posts = _worker_loop.run_until_complete(_worker_scraper.fetch_post_records(query, subreddit_limit,
+                                                                                   post_limit))
+        write_frame(posts.to_frame(), path)
+        return len(posts)
+    except Exception as e:
+        # asyncprawcore exceptions cannot be unpickled in the parent process, which would break the pool
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def merge_shards(shard_paths, merged_path, chunk_size=Config.PIPELINE_CHUNK_SIZE):
+    """Concatenate shard files into one file, keeping only the first row of every post id."""
+    seen = set()
+    with open_writer(merged_path) as writer:
+        for path in shard_paths:
+            for chunk in iter_frames(path, chunk_size):
+                ids = chunk['id'].tolist() if isinstance(chunk, pd.DataFrame) else chunk.column('id').to_pylist()
+                keep = []
+                for i, post_id in enumerate(ids):
+                    if post_id not in seen:
+                        seen.add(post_id)
+                        keep.append(i)
+                writer.write(take_rows(chunk, keep))
+        if writer.rows == 0:
+            writer.write(pd.DataFrame(columns=POST_COLUMNS))
+    logger.info(f"Merged {len(shard_paths)} shards into {writer.rows} unique posts in {merged_path}.")
+    return writer.rows
+
+
+def run_batch(query_file, merged_path=BATCH_OUTPUT_PATH, workers=Config.BATCH_WORKERS,
+              subreddit_limit=Config.SUBREDDIT_LIMIT, post_limit=Config.POST_LIMIT,
+              journal_path=Config.BATCH_JOURNAL_PATH, shard_dir=Config.BATCH_SHARD_DIR):
+    """Scrape every query of ``query_file`` across ``workers`` processes and merge the results.
+
+    Each query is written to its own shard file and recorded in the progress journal, so running the same
+    batch again skips the queries already done and retries the ones that failed. The workers split the
+    rate-limit budget evenly, so throughput grows with the number of workers until that budget is spent.
+    Returns a summary of the batch.
+    """
+    queries = read_queries(query_file)
+    Config.ensure_directories()
+    journal = ProgressJournal(journal_path)
+    os.makedirs(shard_dir, exist_ok=True)
+    extension = os.path.splitext(merged_path)[1]
+    paths = {query: shard_path(shard_dir, query, extension) for query in queries}
+    pending = [query for query in queries if query not in journal.done]
+    logger.info(f"Batch of {len(queries)} queries: {len(queries) - len(pending)} already done, "
+                f"{len(pending)} to scrape with {workers} workers.")
+
+    failed = []
+    if pending:
+        workers = max(1, min(workers, len(pending)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(Config.CLIENT_ID, Config.CLIENT_SECRET, Config.USER_AGENT,
+                                           1 / workers)) as pool:
+            futures = {pool.submit(_scrape_query, query, paths[query], subreddit_limit, post_limit): query
+                       for query in pending}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to scrape query {query!r}: {e}")
+                    failed.append(query)
+                    continue
+                journal.record(query, paths[query], rows)
+                logger.info(f"Scraped {rows} posts for {query!r} ({len(journal.done)}/{len(queries)}).")
+
+    done = [query for query in queries if query in journal.done]
+    rows = merge_shards([paths[query] for query in done], merged_path)
+    return {'queries': len(queries), 'scraped': len(pending) - len(failed), 'skipped': len(queries) - len(pending),
+            'failed': failed, 'rows': rows}
@@ -0,0 +1,41 @@
+import json
+import os
+
+from loguru import logger
+
+from app.config import Config
+
+
+class CheckpointStore:
+    """Per-subreddit high-water marks of incremental scraping, kept in a JSON file.
+
+    Each subreddit maps to the ``created_utc`` and ``id`` of the newest post seen so far.
+    """
+
+    def __init__(self, path=Config.CHECKPOINT_PATH):
+        self.path = path
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.marks = json.load(f)
+
+    def get(self, subreddit_name):
+        return self.marks.get(subreddit_name)
+
+    def advance(self, subreddit_name, created_utc, post_id):
+        """Move the mark of a subreddit forward; older posts never move it back."""
+        mark = self.marks.get(subreddit_name)
+        if mark is None or created_utc > mark['created_utc']:
+            self.marks[subreddit_name] = {'created_utc': created_utc, 'id': post_id}
+
+    def update(self, marks):
+        for subreddit_name, mark in marks.items():
+            self.advance(subreddit_name, mark['created_utc'], mark['id'])
+
+    def save(self):
+        """Write the marks atomically, so an interrupted run keeps the previous checkpoint."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.marks, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved checkpoints of {len(self.marks)} subreddits to {self.path}.")
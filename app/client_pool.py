@@ -0,0 +1,70 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+from loguru import logger
+
+from app.config import Config
+from app.rate_limiter import get_scheduler
+from app.reddit_scraper import RedditScraper
+
+
+class RedditClientPool:
+    """A fixed set of long-lived Reddit clients leased out to concurrent requests.
+
+    All clients share one aiohttp session, so TLS connections are kept alive between requests, and each
+    client keeps its OAuth token for as long as the pool is open.
+    """
+
+    def __init__(self, client_id, client_secret, user_agent, size=Config.CLIENT_POOL_SIZE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.user_agent = user_agent
+        self.size = size
+        self.session = None
+        self.clients = []
+        self._idle = None
+
+    @property
+    def is_open(self):
+        return self.session is not None
+
+    async def open(self):
+        """Create the shared HTTP session and the pooled clients."""
+        if self.is_open:
+            return
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=Config.HTTP_CONNECTION_LIMIT))
+        self._idle = asyncio.Queue()
+        try:
+            for _ in range(self.size):
+                reddit = RedditScraper.create_reddit(self.client_id, self.client_secret, self.user_agent,
+                                                     get_scheduler(), self.session)
+                reddit.read_only = True
+                self.clients.append(reddit)
+                self._idle.put_nowait(reddit)
+        except Exception as e:
+            logger.error(f"Failed to open Reddit client pool: {e}")
+            await self.close()
+            raise
+        logger.info(f"Opened Reddit client pool with {self.size} clients.")
+
+    async def close(self):
+        """Close the shared HTTP session. The clients do not own it, so it is closed once here."""
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+        self.clients = []
+        self._idle = None
+        logger.info("Closed Reddit client pool.")
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow a client for the duration of the ``async with`` block."""
+        if not self.is_open:
+            await self.open()
+        idle = self._idle
+        reddit = await idle.get()
+        try:
+            yield reddit
+        finally:
+            idle.put_nowait(reddit)
@@ -0,0 +1,103 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pandas as pd
+from asyncpraw.models import MoreComments
+from loguru import logger
+
+from app.config import Config
+from app.output_formats import open_writer
+
+COMMENT_COLUMNS = ['submission_id', 'id', 'parent_id', 'depth', 'author', 'body', 'score', 'created_at']
+
+
+@asynccontextmanager
+async def _same_submission(submission):
+    yield submission
+
+
+def _short_id(fullname):
+    return fullname.split('_', 1)[-1]
+
+
+def build_comment(submission_id, comment, depth):
+    """Convert a comment into one row of the comments table. ``parent_id`` is the fullname of the parent:
+    ``t3_<submission id>`` for top-level comments, ``t1_<comment id>`` for replies."""
+    return {
+        'submission_id': submission_id,
+        'id': comment.id,
+        'parent_id': comment.parent_id,
+        'depth': depth,
+        'author': str(comment.author) if comment.author else '',
+        'body': comment.body or '',
+        'score': comment.score,
+        'created_at': datetime.fromtimestamp(comment.created_utc),
+    }
+
+
+async def iter_comment_tree(submission, max_depth=Config.COMMENT_MAX_DEPTH, max_comments=Config.COMMENT_MAX_PER_POST):
+    """Yield the comments of a submission breadth-first, as rows of the comments table.
+
+    ``MoreComments`` placeholders are expanded one at a time as the walk reaches them, so the shallowest
+    comments are fetched first. Comments deeper than ``max_depth`` (top-level comments have depth 0) are
+    skipped, and the walk stops after ``max_comments`` comments. Expanded comments are not attached to the
+    submission's comment forest, so only the frontier of the walk is held in memory.
+    """
+    if not getattr(submission, '_fetched', False):
+        submission.comment_limit = max_comments
+        await submission.load()
+    depths = {}
+    frontier = deque((item, 0) for item in submission.comments)
+    emitted = 0
+    while frontier and emitted < max_comments:
+        item, depth = frontier.popleft()
+        if depth > max_depth:
+            continue
+        if isinstance(item, MoreComments):
+            # The expanded comments come as one flat list, each after its parent
+            for child in await item.comments(update=False):
+                parent = _short_id(child.parent_id)
+                child_depth = depths[parent] + 1 if parent in depths else depth
+                if not isinstance(child, MoreComments):
+                    depths[child.id] = child_depth
+                frontier.append((child, child_depth))
+            continue
+        depths[item.id] = depth
+        yield build_comment(submission.id, item, depth)
+        emitted += 1
+        if depth < max_depth:
+            frontier.extend((reply, depth + 1) for reply in item.replies)
+
+
+async def stream_comments_to_file(submissions, file_path, max_depth=Config.COMMENT_MAX_DEPTH,
+                                  max_comments=Config.COMMENT_MAX_PER_POST, concurrency=Config.COMMENT_CONCURRENCY,
+                                  chunk_size=Config.PIPELINE_CHUNK_SIZE, lease_submission=_same_submission):
+    """Walk the comment trees of ``submissions``, at most ``concurrency`` at a time, and write them as one
+    flat table to ``file_path``. Rows are written in chunks of ``chunk_size`` as they arrive, so rows of
+    different submissions are interleaved. Returns the number of comments written.
+
+    Each tree is walked on the submission yielded by ``lease_submission(submission)``, which may bind it to
+    another client, and that lease is held until the whole tree has been fetched.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    chunk = []
+
+    with open_writer(file_path) as writer:
+        def flush():
+            writer.write(pd.DataFrame(chunk, columns=COMMENT_COLUMNS))
+            chunk.clear()
+
+        async def walk(submission):
+            async with semaphore, lease_submission(submission) as leased:
+                async for row in iter_comment_tree(leased, max_depth, max_comments):
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        flush()
+
+        await asyncio.gather(*(walk(submission) for submission in submissions))
+        if chunk or writer.rows == 0:
+            flush()
+    logger.info(f"Saved {writer.rows} comments of {len(submissions)} posts to {file_path}.")
+    return writer.rows
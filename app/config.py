@@ -9,24 +9,124 @@ class Config:
     CLIENT_ID = os.getenv('CLIENT_ID')
     CLIENT_SECRET = os.getenv('CLIENT_SECRET')
     USER_AGENT = os.getenv('USER_AGENT')
+    # More Reddit apps to spread requests over, as 'client_id:client_secret' pairs separated by commas. Each app has
+    # its own rate-limit budget, so fetch throughput grows with the number of apps. All of them use USER_AGENT.
+    REDDIT_CREDENTIALS = os.getenv('REDDIT_CREDENTIALS', '')
+    # Reddit API hosts; override to point the clients at another server, such as the benchmarks' fake Reddit
+    REDDIT_OAUTH_URL = os.getenv('REDDIT_OAUTH_URL')
+    REDDIT_URL = os.getenv('REDDIT_URL')
 
-    # Directories
+    # Directories, created by ensure_directories() when something is about to be written
     DATA_DIR = 'data'
     LOG_DIR = 'logs'
 
-    # Check if directories exist and create them if they don't
-    os.makedirs(DATA_DIR, exist_ok=True)
-    os.makedirs(LOG_DIR, exist_ok=True)
-
     # File paths
     RAW_CSV_PATH = os.path.join(DATA_DIR, 'fastapi_subreddits_posts.csv')
     CLEANED_CSV_PATH = os.path.join(DATA_DIR, 'cleaned_file.csv')
     SHUFFLED_CSV_PATH = os.path.join(DATA_DIR, 'shuffled_cleaned_file.csv')
     LOG_FILE_PATH = os.path.join(LOG_DIR, 'reddit_scraper.log')
+    CHECKPOINT_PATH = os.path.join(DATA_DIR, 'checkpoints.json')
+    INDEX_DB_PATH = os.path.join(DATA_DIR, 'posts.db')
+    COMMENTS_CSV_PATH = os.path.join(DATA_DIR, 'comments.csv')
+    BATCH_CSV_PATH = os.path.join(DATA_DIR, 'batch_posts.csv')
+    BATCH_JOURNAL_PATH = os.path.join(DATA_DIR, 'batch_journal.jsonl')
+    BATCH_SHARD_DIR = os.path.join(DATA_DIR, 'batch_shards')
+    CRAWL_COVERAGE_PATH = os.path.join(DATA_DIR, 'crawl_coverage.json')
+    JOB_DB_PATH = os.path.join(DATA_DIR, 'jobs.db')
 
     # Reddit API parameters
     SEARCH_QUERY = ''  # Your search query
     SUBREDDIT_LIMIT = 5
     POST_LIMIT = 10
-    POSTS_SORT = 'hot'
+    POSTS_SORT = 'top'  # Listing the posts are read from: 'hot', 'new', 'rising', 'top' or 'controversial'
+    POSTS_TIME_FILTER = 'all'  # Time filter of the 'top' and 'controversial' listings
     POSTS_FIELDS = ['title', 'self_text', 'score', 'num_comments', 'created_utc', 'permalink', 'url', 'author']
+
+    # Local search index (SQLite FTS5) that scraped posts are written through to
+    INDEX_ENABLED = True
+    INDEX_BATCH_SIZE = 1000  # Posts per write transaction
+
+    # Incremental scraping: crawl each subreddit's 'new' listing only down to the newest post already seen
+    # and append only unseen posts to the raw and cleaned files
+    INCREMENTAL = False
+
+    # Output
+    OUTPUT_FORMAT = 'csv'  # 'csv', 'parquet' or 'feather'; sets the extension of the RAW/CLEANED/SHUFFLED paths
+    OUTPUT_COMPRESSION = 'zstd'  # Compression of parquet and feather output
+
+    # Pipeline
+    PIPELINE_MODE = 'batch'  # 'batch', 'streaming' (chunked fetch -> clean -> save, out-of-core shuffle),
+    # 'comments' (comment trees of the top posts, saved to COMMENTS_CSV_PATH), 'refresh' (update the scores and
+    # comment counts of the posts already in the raw and cleaned files) or 'deep' (batch, fetching from every
+    # listing in DEEP_CRAWL_LISTINGS instead of POSTS_SORT only)
+    PIPELINE_CHUNK_SIZE = 5000  # Rows per chunk in the streaming pipeline
+    # Input bytes per on-disk bucket of the out-of-core shuffle of Parquet and Feather files; CSV files are shuffled
+    # through a row index saved next to them as <file>.offsets.npz
+    SHUFFLE_BUCKET_BYTES = 64 * 1024 * 1024
+    SHUFFLE_SEED = None  # Seed of the shuffles, samples and splits; the same seed gives the same output
+
+    # Cleaning
+    TEXT_COLUMNS = ['title', 'content', 'subreddit', 'url']  # The only columns clean_dataframe modifies
+
+    # Near-duplicate detection (reposts, crossposts) on the cleaned title and content, run on the cleaned file by the
+    # batch and streaming pipelines. Not run in INCREMENTAL mode, where the cleaned file is appended to.
+    DEDUP_MODE = None  # None (off), 'tag' (add duplicate_of and cluster_size) or 'collapse' (keep one post each)
+    DEDUP_SHINGLE_SIZE = 3  # Words per shingle
+    DEDUP_NUM_PERM = 128  # MinHash permutations
+    DEDUP_BANDS = 16  # LSH bands; DEDUP_NUM_PERM / DEDUP_BANDS signature values per band
+    DEDUP_THRESHOLD = 0.8  # Min estimated Jaccard similarity of near duplicates
+    DEDUP_SEED = 42
+
+    # Fetching
+    FETCH_CONCURRENCY = 8  # Max subreddit listings fetched at the same time
+    STREAM_BUFFER_SIZE = 100  # Max posts buffered between listing fetches and a streaming consumer
+    # Listings of each subreddit fetched by the deep crawl, as 'sort' or 'sort:time_filter'. Each listing is capped
+    # at about 1000 posts by Reddit; the union of several covers more. See CRAWL_COVERAGE_PATH for what each adds.
+    DEEP_CRAWL_LISTINGS = ['hot', 'new', 'rising'] + [f'{sort}:{time_filter}' for sort in ('top', 'controversial')
+                                                      for time_filter in ('all', 'year', 'month', 'week', 'day')]
+    REFRESH_BATCH_SIZE = 100  # Post ids per info request when refreshing stored posts; Reddit allows up to 100
+
+    # Comment trees
+    COMMENT_MAX_DEPTH = 10  # Top-level comments have depth 0
+    COMMENT_MAX_PER_POST = 1000
+    COMMENT_CONCURRENCY = 4  # Max comment trees fetched at the same time
+
+    # Batch scraping of a query file (one query per line) across worker processes
+    BATCH_QUERY_FILE = 'queries.txt'
+    BATCH_WORKERS = 4  # Each worker gets an equal share of the rate-limit budget
+
+    # Rate limiting (refined at runtime from Reddit's X-Ratelimit-* response headers)
+    RATE_LIMIT_PER_SECOND = 1.0
+    RATE_LIMIT_BURST = 5
+    RATE_LIMIT_MAX_RETRIES = 2  # Retries of a request answered with HTTP 429
+
+    # Credential pool, used when REDDIT_CREDENTIALS adds apps to CLIENT_ID: seconds an app is left out of rotation
+    CREDENTIAL_THROTTLE_COOLDOWN = 60  # After Reddit throttled it (HTTP 429)
+    CREDENTIAL_AUTH_COOLDOWN = 300  # After its credentials were rejected
+
+    # Result cache
+    CACHE_TTL_SECONDS = 300
+    CACHE_MAX_ENTRIES = 256
+    CACHE_DIR = None  # Set to a directory to keep cached results on disk as well
+
+    # FastAPI client pool
+    CLIENT_POOL_SIZE = 4
+    HTTP_CONNECTION_LIMIT = 100
+
+    # FastAPI background scrape jobs (POST /jobs)
+    JOB_STORE = 'memory'  # 'memory', or 'sqlite' to keep jobs and results in JOB_DB_PATH across restarts
+    JOB_WORKERS = 2  # Jobs run at the same time
+    JOB_QUEUE_SIZE = 100  # Queued jobs beyond which POST /jobs answers 429
+    JOB_MAX_FINISHED = 1000  # Finished jobs the memory store keeps results for
+    JOB_PROGRESS_INTERVAL = 100  # Posts between progress updates of a running job
+    JOB_POST_LIMIT = 1000  # Max post_limit accepted for a job; Reddit caps listings at about 1000 posts
+
+    # Streamlit app
+    UI_PAGE_SIZE = 50  # Result rows sent to the browser per page
+    UI_FETCH_TIMEOUT = 120  # Seconds a search may take before the app gives up on it
+
+    @classmethod
+    def ensure_directories(cls):
+        """Create the data and log directories if they do not exist."""
+        os.makedirs(cls.DATA_DIR, exist_ok=True)
+        os.makedirs(cls.LOG_DIR, exist_ok=True)
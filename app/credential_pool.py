@@ -0,0 +1,199 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+from asyncprawcore.exceptions import OAuthException, ResponseException
+from loguru import logger
+
+from app.config import Config
+from app.rate_limiter import RateLimitScheduler, get_scheduler
+
+
+def parse_credentials(spec, client_id=None, client_secret=None):
+    """Return the ``(client_id, client_secret)`` pairs of ``spec`` (``'id:secret,id:secret'``), preceded by the
+    given pair if there is one. Later pairs with an id already seen are ignored."""
+    credentials = {}
+    if client_id:
+        credentials[client_id] = client_secret
+    for pair in filter(None, (item.strip() for item in (spec or '').split(','))):
+        pair_id, separator, pair_secret = pair.partition(':')
+        if not separator or not pair_id:
+            raise ValueError(f"Invalid Reddit credential {pair_id!r}; expected 'client_id:client_secret'")
+        credentials.setdefault(pair_id, pair_secret)
+    return list(credentials.items())
+
+
+def is_auth_error(error):
+    """Whether Reddit rejected the credentials of the app rather than the request itself."""
+    if isinstance(error, OAuthException):
+        return True
+    return isinstance(error, ResponseException) and error.response.status == 401
+
+
+class Credential:
+    """One Reddit app of a :class:`CredentialPool`: its client, its scheduler and its usage counters."""
+
+    def __init__(self, client_id, client_secret, scheduler):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scheduler = scheduler
+        self.reddit = None
+        self.active_leases = 0
+        self.leases = 0
+        self.auth_failures = 0
+        self.cooldowns = 0
+        self.cooldown_until = 0.0
+
+    def cooldown_remaining(self, now):
+        """Seconds until the app is back in rotation, including a pause of its scheduler."""
+        return max(0.0, self.cooldown_until - now, self.scheduler.resume_in())
+
+    def headroom(self):
+        """Requests the app can send right away, less one for every lease already using it."""
+        return self.scheduler.available() - self.active_leases
+
+    def stats(self, now):
+        return {
+            'client_id': self.client_id,
+            'active_leases': self.active_leases,
+            'leases': self.leases,
+            'auth_failures': self.auth_failures,
+            'cooldowns': self.cooldowns,
+            'cooldown_seconds': round(self.cooldown_remaining(now), 3),
+            **self.scheduler.stats(),
+        }
+
+
+class CredentialPool:
+    """Reddit clients of several Reddit apps, so requests are spread over the rate-limit budgets of all of them.
+
+    Each app has one long-lived client with its own :class:`RateLimitScheduler`, and the clients share one aiohttp
+    session. :meth:`lease` hands out the client of the app with the most requests it can send right away, so
+    concurrent work is spread across the apps and N apps fetch about N times as fast as one. An app whose
+    credentials are rejected is left out of rotation for ``auth_cooldown`` seconds, and one that Reddit throttles
+    for ``throttle_cooldown`` seconds. Unlike :class:`app.client_pool.RedditClientPool`, a client can be leased by
+    several callers at once.
+
+    Every app gets its own scheduler, with the same share of its budget as the process-wide scheduler has of its,
+    so a throttled response only takes the app that got it out of rotation. The scheduler of the first app, which
+    is usually ``Config.CLIENT_ID``, learns what the other clients of that app have used from Reddit's rate-limit
+    headers.
+    """
+
+    def __init__(self, credentials, user_agent, throttle_cooldown=Config.CREDENTIAL_THROTTLE_COOLDOWN,
+                 auth_cooldown=Config.CREDENTIAL_AUTH_COOLDOWN):
+        share = get_scheduler().share
+        self.credentials = [Credential(client_id, client_secret, RateLimitScheduler(share=share))
+                            for client_id, client_secret in credentials]
+        self.user_agent = user_agent
+        self.throttle_cooldown = throttle_cooldown
+        self.auth_cooldown = auth_cooldown
+        self.session = None
+        self._loop = None
+
+    @property
+    def is_open(self):
+        return self.session is not None
+
+    async def open(self):
+        """Create the shared HTTP session and one client per app."""
+        from app.reddit_scraper import RedditScraper  # reddit_scraper imports this module
+
+        if self.is_open:
+            return
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=Config.HTTP_CONNECTION_LIMIT))
+        self._loop = asyncio.get_running_loop()
+        try:
+            for credential in self.credentials:
+                credential.reddit = RedditScraper.create_reddit(credential.client_id, credential.client_secret,
+                                                                self.user_agent, credential.scheduler, self.session)
+                credential.reddit.read_only = True
+        except Exception as e:
+            logger.error(f"Failed to open Reddit credential pool: {e}")
+            await self.close()
+            raise
+        logger.info(f"Opened Reddit credential pool with {len(self.credentials)} apps.")
+
+    async def close(self):
+        """Close the shared HTTP session. The clients do not own it, so it is closed once here."""
+        if not self.is_open:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            self._abandon()
+            return
+        await self.session.close()
+        self._discard()
+        logger.info("Closed Reddit credential pool.")
+
+    def _abandon(self):
+        """Drop a session opened on another event loop, closing it on that loop if it is still running. A session
+        of a finished loop can no longer be closed."""
+        session, loop = self.session, self._loop
+        self._discard()
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            logger.info("Closing Reddit credential pool on the event loop it was opened on.")
+        else:
+            logger.warning("Abandoned the HTTP session of the Reddit credential pool: the event loop it was opened on "
+                           "has finished without closing it. Close the pool before its event loop ends.")
+
+    def _discard(self):
+        self.session = None
+        self._loop = None
+        for credential in self.credentials:
+            credential.reddit = None
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow the client of the app with the most quota left for the ``async with`` block. Waits while every
+        app is out of rotation."""
+        if self.is_open and self._loop is not asyncio.get_running_loop():
+            self._abandon()  # aiohttp sessions can only be used on the event loop they were created on
+        if not self.is_open:
+            await self.open()
+        credential = await self._choose()
+        throttled = credential.scheduler.throttled_responses
+        credential.active_leases += 1
+        credential.leases += 1
+        try:
+            yield credential.reddit
+        except Exception as e:
+            if is_auth_error(e):
+                credential.auth_failures += 1
+                self._cool_down(credential, self.auth_cooldown, f"its credentials were rejected ({e})")
+            raise
+        finally:
+            credential.active_leases -= 1
+            if credential.scheduler.throttled_responses > throttled:
+                self._cool_down(credential, self.throttle_cooldown, "Reddit throttled it")
+
+    async def _choose(self):
+        while True:
+            now = time.monotonic()
+            ready = [credential for credential in self.credentials if not credential.cooldown_remaining(now)]
+            if ready:
+                return max(ready, key=lambda credential: (credential.headroom(), -credential.leases))
+            wait = min(credential.cooldown_remaining(now) for credential in self.credentials)
+            logger.warning(f"All {len(self.credentials)} Reddit apps are out of rotation, waiting {wait:.1f}s.")
+            await asyncio.sleep(wait)
+
+    def _cool_down(self, credential, seconds, reason):
+        now = time.monotonic()
+        if credential.cooldown_until <= now:
+            credential.cooldowns += 1
+            logger.warning(f"Taking Reddit app {credential.client_id} out of rotation for {seconds}s: {reason}.")
+        credential.cooldown_until = max(credential.cooldown_until, now + seconds)
+
+    def stats(self):
+        """Return the usage counters and scheduler stats of every app. Secrets are left out."""
+        now = time.monotonic()
+        return [credential.stats(now) for credential in self.credentials]
+
+
+def create_credential_pool():
+    """Create a pool of the configured Reddit apps, or return None if only one app is configured."""
+    credentials = parse_credentials(Config.REDDIT_CREDENTIALS, Config.CLIENT_ID, Config.CLIENT_SECRET)
+    if len(credentials) < 2:
+        return None
+    return CredentialPool(credentials, Config.USER_AGENT)
@@ -0,0 +1,108 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+from app.records import PostAccumulator
+
+LISTING_SORTS = ('hot', 'new', 'rising', 'top', 'controversial')
+TIME_FILTERS = ('all', 'year', 'month', 'week', 'day', 'hour')
+TIMED_SORTS = ('top', 'controversial')
+LISTING_PAGE_SIZE = 100  # Posts per listing request
+
+
+def parse_listing(spec):
+    """Split a listing spec such as ``'hot'`` or ``'top:year'`` into its sort and time filter."""
+    sort, _, time_filter = spec.partition(':')
+    if sort not in LISTING_SORTS:
+        raise ValueError(f"Unknown listing sort {sort!r}; expected one of {', '.join(LISTING_SORTS)}")
+    if time_filter and (sort not in TIMED_SORTS or time_filter not in TIME_FILTERS):
+        raise ValueError(f"Invalid time filter in listing {spec!r}")
+    return sort, time_filter or None
+
+
+def open_listing(subreddit, sort, limit, time_filter=None):
+    """Return the async iterator of one listing of ``subreddit``. Reddit serves at most about 1000 posts per
+    listing, whatever ``limit`` is."""
+    if sort in TIMED_SORTS:
+        return getattr(subreddit, sort)(time_filter=time_filter or 'all', limit=limit)
+    return getattr(subreddit, sort)(limit=limit)
+
+
+class CrawlCoverage:
+    """What each listing of a deep crawl contributed.
+
+    For every listing spec it counts the posts ``fetched``, the posts that were ``new`` when they arrived
+    (which depends on arrival order) and the posts ``exclusive`` to it (found by no other listing, independent of
+    order). ``estimated_requests`` is the number of pages of ``LISTING_PAGE_SIZE`` posts the fetched posts fill,
+    not a count of the requests sent, so retries are not included. Listings with few exclusive posts per request
+    are the ones to drop.
+    """
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.fetched = dict.fromkeys(self.specs, 0)
+        self.new = dict.fromkeys(self.specs, 0)
+        self.estimated_requests = dict.fromkeys(self.specs, 0)
+        self._found_by = {}  # post id -> bit mask of the listings that returned it
+
+    def __len__(self):
+        return len(self._found_by)
+
+    def add(self, spec, post_id):
+        """Record that the listing ``spec`` returned ``post_id``; True if no listing returned it before."""
+        self.fetched[spec] += 1
+        bit = 1 << self.specs.index(spec)
+        mask = self._found_by.get(post_id)
+        self._found_by[post_id] = bit if mask is None else mask | bit
+        if mask is None:
+            self.new[spec] += 1
+        return mask is None
+
+    def finish_listing(self, spec, fetched):
+        self.estimated_requests[spec] += max(1, math.ceil(fetched / LISTING_PAGE_SIZE))
+
+    def report(self):
+        exclusive = dict.fromkeys(self.specs, 0)
+        for mask in self._found_by.values():
+            if mask & (mask - 1) == 0:
+                exclusive[self.specs[mask.bit_length() - 1]] += 1
+        return {
+            'unique_posts': len(self._found_by),
+            'listings': {spec: {'fetched': self.fetched[spec], 'new': self.new[spec], 'exclusive': exclusive[spec],
+                                'estimated_requests': self.estimated_requests[spec]} for spec in self.specs},
+        }
+
+
+@asynccontextmanager
+async def _same_subreddit(subreddit):
+    yield subreddit
+
+
+async def crawl_subreddits(subreddits, listing_specs, post_limit, concurrency, lease_subreddit=_same_subreddit):
+    """Fetch every listing in ``listing_specs`` of every subreddit at once, at most ``concurrency`` at a time.
+
+    Posts are merged as they stream in, keeping the first copy of each id. Returns a :class:`PostAccumulator`
+    in arrival order and the :class:`CrawlCoverage` of the listings. Each listing is read from the subreddit
+    yielded by ``lease_subreddit(subreddit)``, which may bind it to another client.
+    """
+    listings = [(spec, *parse_listing(spec)) for spec in listing_specs]
+    coverage = CrawlCoverage(listing_specs)
+    posts = PostAccumulator()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def crawl(subreddit, spec, sort, time_filter):
+        subreddit_name = subreddit.display_name
+        fetched = 0
+        async with semaphore, lease_subreddit(subreddit) as leased:
+            async for submission in open_listing(leased, sort, post_limit, time_filter):
+                fetched += 1
+                if coverage.add(spec, submission.id):
+                    posts.append(subreddit_name, submission)
+        coverage.finish_listing(spec, fetched)
+
+    await asyncio.gather(*(crawl(subreddit, *listing) for subreddit in subreddits for listing in listings))
+    logger.info(f"Deep crawl found {len(posts)} unique posts in {len(subreddits)} subreddits "
+                f"across {len(listings)} listings.")
+    return posts, coverage
@@ -0,0 +1,71 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.config import Config
+from app.output_formats import detect_format, iter_frames, open_writer, read_table, take_rows
+from app.row_index import shuffle_csv_rows
+
+
+def _read_bucket(path):
+    if detect_format(path) == 'csv':
+        return pd.read_csv(path, dtype=str, keep_default_na=False, na_filter=False)
+    return read_table(path)
+
+
+def _empty_like(file_path):
+    if detect_format(file_path) == 'csv':
+        return pd.read_csv(file_path, nrows=0)
+    return read_table(file_path).slice(0, 0)
+
+
+def shuffle_out_of_core(file_path, shuffled_file_path, chunk_size=Config.PIPELINE_CHUNK_SIZE,
+                        bucket_bytes=Config.SHUFFLE_BUCKET_BYTES, seed=Config.SHUFFLE_SEED):
+    """Shuffle the rows of a posts file that may not fit in memory.
+
+    Rows are read in chunks and scattered into randomly chosen bucket files on disk, sized so that
+    one bucket holds about ``bucket_bytes`` of input. Each bucket is then shuffled in memory and
+    appended to the output. Scattering uniformly and shuffling each bucket yields a uniform random
+    permutation, and peak memory is bounded by the chunk and bucket sizes rather than the file size.
+    Buckets use the format of the input, and CSV values are copied as strings, so every value is
+    written back exactly as read.
+
+    A CSV file shuffled into a CSV file skips the buckets: :func:`app.row_index.shuffle_csv_rows` is already
+    out-of-core, copying raw rows from a memory map with 8 bytes of offset per row, and leaves its row index
+    in ``<file>.offsets.npz`` next to the input.
+    """
+    if detect_format(file_path) == detect_format(shuffled_file_path) == 'csv':
+        rows = shuffle_csv_rows(file_path, shuffled_file_path, seed)
+        logger.info(f"Shuffled {rows} rows of {file_path} through its row index to {shuffled_file_path}.")
+        return
+    rng = np.random.default_rng(seed)
+    buckets = max(1, math.ceil(os.path.getsize(file_path) / bucket_bytes))
+    suffix = os.path.splitext(str(file_path))[1]
+
+    output_dir = os.path.dirname(os.path.abspath(shuffled_file_path))
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix='shuffle-') as bucket_dir:
+        bucket_paths = [os.path.join(bucket_dir, f'bucket-{i}{suffix}') for i in range(buckets)]
+        bucket_writers = [open_writer(path) for path in bucket_paths]
+        try:
+            for chunk in iter_frames(file_path, chunk_size):
+                assignments = rng.integers(0, buckets, size=len(chunk))
+                for bucket in np.unique(assignments):
+                    bucket_writers[bucket].write(take_rows(chunk, np.flatnonzero(assignments == bucket)))
+        finally:
+            for writer in bucket_writers:
+                writer.close()
+
+        with open_writer(shuffled_file_path) as out:
+            for path, writer in zip(bucket_paths, bucket_writers):
+                if writer.rows == 0:
+                    continue
+                bucket = _read_bucket(path)
+                out.write(take_rows(bucket, rng.permutation(len(bucket))))
+            if out.rows == 0:
+                out.write(_empty_like(file_path))
+
+    logger.info(f"Shuffled {file_path} through {buckets} on-disk buckets to {shuffled_file_path}.")
@@ -1,17 +1,117 @@
-from fastapi import FastAPI, HTTPException, Path
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal, Optional
 
+from fastapi import FastAPI, HTTPException, Path, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, Field
+
+from app.client_pool import RedditClientPool
+from app.config import Config
+from app.credential_pool import create_credential_pool
+from app.jobs import SUCCEEDED, JobQueue, JobQueueFull
+from app.metrics import HTTP_REQUEST_SECONDS
+from app.post_index import get_post_index
+from app.rate_limiter import get_scheduler
+from app.result_cache import get_result_cache
 from app.reddit_scraper import RedditScraper, CLIENT_ID, CLIENT_SECRET, USER_AGENT, SUBREDDIT_LIMIT, POST_LIMIT
 
-app = FastAPI()
+client_pool = RedditClientPool(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
+# Set when REDDIT_CREDENTIALS configures more Reddit apps; the scrapers then fetch listings with its clients
+credential_pool = create_credential_pool()
+
+
+async def run_scrape_job(job, report_progress):
+    """Run a queued scrape on a pooled client, reporting progress every ``JOB_PROGRESS_INTERVAL`` posts.
+
+    The posts are returned even if adding them to the search index fails, since the job's results do not depend
+    on the index.
+    """
+    posts = []
+    async with client_pool.lease() as reddit:
+        scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT, reddit=reddit,
+                                       credential_pool=credential_pool)
+        async for post in scraper.iter_posts(job['query'], job['subreddit_limit'], job['post_limit']):
+            posts.append(post)
+            if len(posts) % Config.JOB_PROGRESS_INTERVAL == 0:
+                await report_progress(len(posts))
+    await report_progress(len(posts))
+    try:
+        await asyncio.to_thread(RedditScraper.index_posts, posts)
+    except Exception as e:
+        logger.error(f"Failed to index the posts of job {job['id']}: {e}")
+    return posts
+
+
+job_queue = JobQueue(run_scrape_job)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    await client_pool.open()
+    if credential_pool is not None:
+        await credential_pool.open()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if credential_pool is not None:
+        await credential_pool.close()
+    await client_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class RequestLatencyMiddleware:
+    """Plain ASGI middleware that records the latency of every request, until its last byte is sent.
+
+    Requests are labelled by route template rather than by raw path, so all queries share one series.
+    """
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(path, scope['method'], str(status)).observe(time.perf_counter() - start)
+
+
+app.add_middleware(RequestLatencyMiddleware)
 
 
 class FastApiRedditScraper:
-    def __init__(self, client_id, client_secret, user_agent):
-        self.scraper = RedditScraper(client_id, client_secret, user_agent)
+    def __init__(self, client_id, client_secret, user_agent, reddit=None, credential_pool=None):
+        self.scraper = RedditScraper(client_id, client_secret, user_agent, reddit=reddit,
+                                     credential_pool=credential_pool)
         self.scraper.initialize_reddit()
 
     def fetch_posts(self, query, subreddit_limit, post_limit):
-        return self.scraper.fetch_reddit_posts(query, subreddit_limit, post_limit)
+        return self.scraper.fetch_cached_posts(query, subreddit_limit, post_limit)
+
+    def iter_posts(self, query, subreddit_limit, post_limit):
+        return self.scraper.iter_reddit_posts(query, subreddit_limit, post_limit)
 
 
 @app.get("/scrape/{query}")
@@ -20,8 +120,10 @@ async def scrape(query: str = Path(..., description="The search query to scrape
         raise HTTPException(status_code=400, detail="Query must be provided")
 
     try:
-        scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
-        fetched_posts = scraper.fetch_posts(query, SUBREDDIT_LIMIT, POST_LIMIT)
+        async with client_pool.lease() as reddit:
+            scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT, reddit=reddit,
+                                           credential_pool=credential_pool)
+            fetched_posts = await scraper.fetch_posts(query, SUBREDDIT_LIMIT, POST_LIMIT)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while scraping: {str(e)}")
 
@@ -29,3 +131,105 @@ async def scrape(query: str = Path(..., description="The search query to scrape
         raise HTTPException(status_code=404, detail="No posts found for the provided query")
 
     return {"posts": fetched_posts}
+
+
+@app.get("/search")
+def search(q: Optional[str] = Query(None, description="Keywords to match in title and content"),
+           subreddit: Optional[str] = Query(None, description="Only posts from this subreddit"),
+           since: Optional[datetime] = Query(None, description="Only posts created at or after this time"),
+           until: Optional[datetime] = Query(None, description="Only posts created before this time"),
+           sort: Optional[Literal['relevance', 'score', 'created_at']] = Query(None, description="Result order"),
+           limit: int = Query(50, ge=1, le=500),
+           offset: int = Query(0, ge=0)):
+    """Search previously scraped posts in the local index, without calling Reddit."""
+    try:
+        posts = get_post_index().search(q, subreddit, since, until, limit=limit, offset=offset, sort=sort)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while searching: {str(e)}")
+    return {"posts": posts}
+
+
+STREAM_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+
+def format_stream_event(payload, output_format, event=None):
+    data = json.dumps(jsonable_encoder(payload))
+    if output_format == 'sse':
+        prefix = f"event: {event}\n" if event else ""
+        return f"{prefix}data: {data}\n\n"
+    return f"{data}\n"
+
+
+@app.get("/scrape/{query}/stream")
+async def scrape_stream(query: str = Path(..., description="The search query to scrape Reddit posts for"),
+                        output_format: Literal['ndjson', 'sse'] = Query('ndjson', alias='format',
+                                                                        description="Stream format")):
+    if not query:
+        raise HTTPException(status_code=400, detail="Query must be provided")
+
+    async def stream_posts():
+        async with client_pool.lease() as reddit:
+            scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT, reddit=reddit,
+                                           credential_pool=credential_pool)
+            try:
+                async for post in scraper.iter_posts(query, SUBREDDIT_LIMIT, POST_LIMIT):
+                    yield format_stream_event(post, output_format)
+            except Exception as e:
+                # The response has already started, so the error is reported in-band.
+                logger.error(f"Streaming scrape for '{query}' failed: {e}")
+                yield format_stream_event({"error": f"An error occurred while scraping: {str(e)}"}, output_format,
+                                          event='error')
+
+    return StreamingResponse(stream_posts(), media_type=STREAM_MEDIA_TYPES[output_format])
+
+
+class JobRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="The search query to scrape Reddit posts for")
+    subreddit_limit: int = Field(SUBREDDIT_LIMIT, ge=1, le=100)
+    post_limit: int = Field(POST_LIMIT, ge=1, le=Config.JOB_POST_LIMIT)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Queue a scrape to run in the background. Poll ``GET /jobs/{job_id}`` for its status and results."""
+    if not job_queue.is_running:
+        raise HTTPException(status_code=503, detail="The job queue is not running")
+    try:
+        return await job_queue.submit(request.query, request.subreddit_limit, request.post_limit)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"The job queue is full: {str(e)}")
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str,
+            offset: int = Query(0, ge=0, description="Index of the first result to return"),
+            limit: int = Query(100, ge=1, le=1000, description="Max results to return")):
+    """Status and progress of a job, with a page of its results once it has succeeded."""
+    job = job_queue.store.get(job_id) if job_queue.store is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    results = job_queue.store.results(job_id, offset, limit) if job['status'] == SUCCEEDED else []
+    next_offset = offset + len(results) if offset + len(results) < job['result_count'] else None
+    return {**job, "results": results, "offset": offset, "next_offset": next_offset}
+
+
+@app.get("/rate-limit")
+async def rate_limit():
+    return get_scheduler().stats()
+
+
+@app.get("/credentials/stats")
+async def credential_stats():
+    """Usage of each configured Reddit app: leases, auth failures, cooldowns and rate-limit stats."""
+    return {"credentials": credential_pool.stats() if credential_pool is not None else []}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return get_result_cache().stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of the scraper, the Reddit API calls and the HTTP requests of this app."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
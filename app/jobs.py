@@ -0,0 +1,281 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from loguru import logger
+
+from app.config import Config
+from app.sqlite_connections import ThreadLocalConnections
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class JobQueueFull(Exception):
+    """Raised by :meth:`JobQueue.submit` when ``max_queued`` jobs are already waiting."""
+
+
+def new_job(query, subreddit_limit, post_limit):
+    return {
+        'id': uuid.uuid4().hex,
+        'status': QUEUED,
+        'query': query,
+        'subreddit_limit': subreddit_limit,
+        'post_limit': post_limit,
+        'progress': 0,
+        'result_count': 0,
+        'error': None,
+        'created_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+    }
+
+
+class MemoryJobStore:
+    """Jobs and their results held in this process. Only the ``max_finished`` most recent finished jobs are kept."""
+
+    def __init__(self, max_finished=Config.JOB_MAX_FINISHED):
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._results = {}
+        self._queued = OrderedDict()
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            self._queued[job['id']] = None
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def count_queued(self):
+        return len(self._queued)
+
+    def claim_next(self):
+        """Mark the oldest queued job as running and return it, or None if no job is queued."""
+        with self._lock:
+            if not self._queued:
+                return None
+            job_id, _ = self._queued.popitem(last=False)
+            job = self._jobs[job_id]
+            job.update(status=RUNNING, started_at=time.time())
+            return dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def finish(self, job_id, status, posts=None, error=None):
+        with self._lock:
+            self._jobs[job_id].update(status=status, error=error, finished_at=time.time(),
+                                      result_count=len(posts or ()))
+            self._results[job_id] = list(posts or ())
+            self._finished[job_id] = None
+            while len(self._finished) > self.max_finished:
+                expired, _ = self._finished.popitem(last=False)
+                self._jobs.pop(expired, None)
+                self._results.pop(expired, None)
+
+    def results(self, job_id, offset, limit):
+        with self._lock:
+            return self._results.get(job_id, [])[offset:offset + limit]
+
+    def requeue_running(self):
+        return 0
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    query TEXT NOT NULL,
+    subreddit_limit INTEGER,
+    post_limit INTEGER,
+    progress INTEGER NOT NULL DEFAULT 0,
+    result_count INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    post TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+) WITHOUT ROWID;
+"""
+
+CLAIM_NEXT = """
+UPDATE jobs SET status = 'running', started_at = ?
+WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+RETURNING *
+"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class SQLiteJobStore:
+    """Jobs and their results in a SQLite database, so queued jobs survive a restart.
+
+    Jobs that were running when the process stopped are queued again by :meth:`requeue_running`. Results are
+    stored one row per post and read back a page at a time. Each thread gets its own connection.
+    """
+
+    def __init__(self, path=Config.JOB_DB_PATH):
+        self.path = path
+        self._connections = ThreadLocalConnections(path, SCHEMA)
+
+    def connection(self):
+        return self._connections.get()
+
+    def add(self, job):
+        with self.connection() as conn:
+            conn.execute(f"INSERT INTO jobs ({', '.join(job)}) VALUES ({', '.join('?' * len(job))})",
+                         list(job.values()))
+
+    def get(self, job_id):
+        row = self.connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def count_queued(self):
+        return self.connection().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim_next(self):
+        """Mark the oldest queued job as running and return it, or None if no job is queued."""
+        with self.connection() as conn:
+            row = conn.execute(CLAIM_NEXT, (time.time(),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def update(self, job_id, **fields):
+        with self.connection() as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                         [*fields.values(), job_id])
+
+    def finish(self, job_id, status, posts=None, error=None):
+        posts = posts or ()
+        with self.connection() as conn:
+            conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+            conn.executemany('INSERT INTO job_results (job_id, position, post) VALUES (?, ?, ?)',
+                             ((job_id, position, json.dumps(post, default=_json_default))
+                              for position, post in enumerate(posts)))
+            conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ?, result_count = ? WHERE id = ?',
+                         (status, error, time.time(), len(posts), job_id))
+
+    def results(self, job_id, offset, limit):
+        rows = self.connection().execute(
+            'SELECT post FROM job_results WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?',
+            (job_id, offset, limit))
+        return [json.loads(row['post']) for row in rows]
+
+    def requeue_running(self):
+        """Queue the jobs left running by a previous process again. Returns their count."""
+        with self.connection() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued', progress = 0, started_at = NULL "
+                                "WHERE status = 'running'").rowcount
+
+
+def create_job_store(kind=Config.JOB_STORE):
+    if kind == 'sqlite':
+        return SQLiteJobStore()
+    if kind == 'memory':
+        return MemoryJobStore()
+    raise ValueError(f"Unknown job store {kind!r}; expected 'memory' or 'sqlite'")
+
+
+class JobQueue:
+    """Scrape jobs run in the background by a fixed number of worker tasks.
+
+    The store is the queue: workers claim the oldest queued job from it, so a persistent store carries the
+    queue over a restart. :meth:`submit` applies backpressure by refusing new jobs once ``max_queued`` are
+    waiting. ``runner(job, report_progress)`` does the work and returns the posts; ``await report_progress(count)``
+    records how many posts it has fetched so far. Store calls run in a thread, so they do not block the loop.
+    """
+
+    def __init__(self, runner, store=None, workers=Config.JOB_WORKERS, max_queued=Config.JOB_QUEUE_SIZE):
+        self.runner = runner
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self._tasks = []
+        self._wakeup = None
+        self._submit_lock = None
+
+    @property
+    def is_running(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the workers, creating the configured store if none was given."""
+        if self.is_running:
+            return
+        if self.store is None:
+            self.store = create_job_store()
+        requeued = await asyncio.to_thread(self.store.requeue_running)
+        if requeued:
+            logger.info(f"Queued {requeued} interrupted jobs again.")
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._submit_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._work(), name=f'job-worker-{i}') for i in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers.")
+
+    async def stop(self):
+        """Cancel the workers. Jobs they were running stay 'running' in a persistent store until the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped job workers.")
+
+    async def submit(self, query, subreddit_limit, post_limit):
+        """Queue a scrape and return the new job. Raises :class:`JobQueueFull` when the queue is full."""
+        job = new_job(query, subreddit_limit, post_limit)
+        async with self._submit_lock:  # So concurrent submits cannot all pass the check before any is added
+            if await asyncio.to_thread(self.store.count_queued) >= self.max_queued:
+                raise JobQueueFull(f"{self.max_queued} jobs are already queued")
+            await asyncio.to_thread(self.store.add, job)
+        self._wakeup.set()
+        return job
+
+    async def _work(self):
+        while True:
+            # Cleared before the claim, so a job submitted after an empty claim still wakes the worker
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                await self._wakeup.wait()
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        job_id = job['id']
+
+        async def report_progress(count):
+            await asyncio.to_thread(self.store.update, job_id, progress=count)
+
+        logger.info(f"Running job {job_id} for '{job['query']}'.")
+        try:
+            posts = await self.runner(job, report_progress)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, FAILED, error=str(e))
+            return
+        await asyncio.to_thread(self.store.finish, job_id, SUCCEEDED, posts)
+        logger.info(f"Job {job_id} finished with {len(posts)} posts.")
@@ -0,0 +1,67 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import REGISTRY, Counter, Histogram
+
+# Buckets from 5 ms to 10 min; covers single API calls as well as whole pipeline stages
+DURATION_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram('reddit_scraper_stage_seconds', 'Duration of scrape pipeline stages.', ['stage'],
+                          buckets=DURATION_BUCKETS)
+API_REQUESTS = Counter('reddit_api_requests_total', 'Reddit API responses received, by HTTP status.', ['status'])
+API_REQUEST_SECONDS = Histogram('reddit_api_request_seconds', 'Reddit API response time, excluding rate-limit waits.',
+                                buckets=DURATION_BUCKETS)
+RATE_LIMIT_DELAYED = Counter('reddit_rate_limit_delayed_requests_total', 'Reddit API requests delayed by the '
+                             'rate limiter.')
+RATE_LIMIT_WAIT_SECONDS = Counter('reddit_rate_limit_wait_seconds_total', 'Time Reddit API requests spent waiting '
+                                  'for the rate limiter.')
+POSTS_FETCHED = Counter('reddit_posts_fetched_total', 'Posts fetched from Reddit.')
+BYTES_WRITTEN = Counter('reddit_scraper_bytes_written_total', 'Bytes written to output files, by format.',
+                        ['format'])
+HTTP_REQUEST_SECONDS = Histogram('http_request_seconds', 'FastAPI request latency, until the response is sent.',
+                                 ['path', 'method', 'status'], buckets=DURATION_BUCKETS)
+
+SUMMARY_SAMPLES = {
+    'posts_fetched': 'reddit_posts_fetched_total',
+    'api_requests': 'reddit_api_requests_total',
+    'rate_limit_delayed_requests': 'reddit_rate_limit_delayed_requests_total',
+    'rate_limit_wait_seconds': 'reddit_rate_limit_wait_seconds_total',
+    'bytes_written': 'reddit_scraper_bytes_written_total',
+}
+
+
+def _sample_total(name):
+    """Sum a counter over all its label values."""
+    return sum(sample.value for metric in REGISTRY.collect() for sample in metric.samples if sample.name == name)
+
+
+class RunMetrics:
+    """Timings and counter deltas of one pipeline run, for the summary logged at its end.
+
+    Stage timings go to :data:`STAGE_SECONDS` as well. Counters are process-wide, so a run's deltas include
+    anything else the process did at the same time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._start_totals = {key: _sample_total(name) for key, name in SUMMARY_SAMPLES.items()}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.labels(name).observe(elapsed)
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def summary(self):
+        totals = {key: _sample_total(name) - self._start_totals[key] for key, name in SUMMARY_SAMPLES.items()}
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 3),
+            'stage_seconds': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            **{key: round(value, 3) if isinstance(value, float) and not value.is_integer() else int(value)
+               for key, value in totals.items()},
+        }
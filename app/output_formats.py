@@ -0,0 +1,249 @@
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from app.config import Config
+from app.metrics import BYTES_WRITTEN
+
+FORMAT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+EXTENSION_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+COLUMNAR_FORMATS = {'parquet', 'feather'}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet and Feather output require pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def posts_schema():
+    """Explicit Arrow types of the post columns. Columns not listed here keep their inferred type."""
+    pa = _pyarrow()
+    return pa.schema([
+        ('subreddit', pa.dictionary(pa.int32(), pa.string())),
+        ('title', pa.string()),
+        ('score', pa.int32()),
+        ('id', pa.string()),
+        ('url', pa.string()),
+        ('num_comments', pa.int32()),
+        ('created_at', pa.timestamp('ms')),  # Parquet has no second resolution
+        ('content', pa.string()),
+    ])
+
+
+def output_path(path, output_format):
+    """Return ``path`` with the file extension of ``output_format``."""
+    return os.path.splitext(path)[0] + FORMAT_EXTENSIONS[output_format]
+
+
+def detect_format(path):
+    return EXTENSION_FORMATS.get(os.path.splitext(str(path))[1].lower(), 'csv')
+
+
+def to_table(frame):
+    """Convert a DataFrame (or Arrow table) to an Arrow table that follows :func:`posts_schema`."""
+    pa = _pyarrow()
+    table = frame if isinstance(frame, pa.Table) else pa.Table.from_pandas(frame, preserve_index=False)
+    schema = posts_schema()
+    for i, name in enumerate(table.column_names):
+        if name in schema.names:
+            target = schema.field(name)
+            column = table.column(i)
+            if column.type != target.type:
+                if pa.types.is_dictionary(target.type) and pa.types.is_dictionary(column.type):
+                    column = column.cast(target.type.value_type)
+                column = column.cast(target.type)
+            table = table.set_column(i, target, column)
+    return table.replace_schema_metadata(None)
+
+
+def _count_written(path, size=None):
+    try:
+        BYTES_WRITTEN.labels(detect_format(path)).inc(os.path.getsize(path) if size is None else size)
+    except OSError:
+        pass  # Metrics never fail a write
+
+
+def take_rows(frame, indices):
+    """Select rows by position from a DataFrame or an Arrow table."""
+    return frame.iloc[indices] if isinstance(frame, pd.DataFrame) else frame.take(indices)
+
+
+def read_frame(path, columns=None, keep_default_na=True):
+    """Read a posts file of any supported format into a DataFrame, loading only ``columns`` if given.
+
+    With ``keep_default_na=False``, CSV values such as ``NA`` or ``null`` are read as text and empty fields as empty
+    strings, so a file that is read and written back keeps its text as it was.
+    """
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        return pd.read_csv(path, usecols=columns, keep_default_na=keep_default_na)
+    return read_table(path, columns).to_pandas()
+
+
+def read_table(path, columns=None):
+    """Read a posts file into an Arrow table, loading only ``columns`` if given."""
+    output_format = detect_format(path)
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns)
+    if output_format == 'feather':
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=True)
+    return to_table(read_frame(path, columns))
+
+
+def write_frame(frame, path):
+    """Write a DataFrame or Arrow table in the format given by the file extension of ``path``."""
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        df = frame if isinstance(frame, pd.DataFrame) else frame.to_pandas()
+        df.to_csv(path, index=False)
+        _count_written(path)
+        return
+    with open_writer(path) as writer:
+        writer.write(frame)
+
+
+def append_frame(frame, path):
+    """Append rows to a posts file, creating it if needed.
+
+    CSV is appended in place. Parquet and Feather files cannot be appended to, so they are rewritten.
+    """
+    if not os.path.exists(path):
+        write_frame(frame, path)
+        return
+    if detect_format(path) == 'csv':
+        df = frame if isinstance(frame, pd.DataFrame) else frame.to_pandas()
+        size = os.path.getsize(path)
+        df.to_csv(path, mode='a', header=False, index=False)
+        _count_written(path, os.path.getsize(path) - size)
+        return
+    pa = _pyarrow()
+    combined = pa.concat_tables([read_table(path), to_table(frame)], promote_options='permissive')
+    write_frame(combined, path)
+
+
+def iter_frames(path, chunk_size, columns=None):
+    """Yield a posts file in chunks of at most ``chunk_size`` rows: DataFrames for CSV, Arrow tables
+    for columnar formats."""
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, dtype=str, keep_default_na=False,
+                               na_filter=False)
+        return
+    pa = _pyarrow()
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        table = read_table(path, columns)
+        batches = table.to_batches(max_chunksize=chunk_size)
+    for batch in batches:
+        yield pa.Table.from_batches([batch])
+
+
+class FrameWriter(ABC):
+    """Appends chunks of posts to one output file. Use as a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @abstractmethod
+    def write(self, frame):
+        """Append a DataFrame or Arrow table."""
+
+    def close(self):
+        _count_written(self.path)
+
+
+class CsvFrameWriter(FrameWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.header = True
+
+    def write(self, frame):
+        df = frame if isinstance(frame, pd.DataFrame) else frame.to_pandas()
+        df.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+        self.rows += len(df)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class ArrowFrameWriter(FrameWriter):
+    """Base class of the columnar writers; the schema is fixed by the first chunk."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.writer = None
+        self.dictionaries = {}
+
+    @abstractmethod
+    def _open(self, schema):
+        """Create the underlying writer for ``schema``."""
+
+    def _unify_dictionaries(self, table):
+        """Encode dictionary columns against the values seen so far, so later chunks only add to the
+        dictionary. The Arrow IPC file format cannot replace a dictionary between batches."""
+        pa = _pyarrow()
+        import pyarrow.compute as pc
+        for i, field in enumerate(table.schema):
+            if not pa.types.is_dictionary(field.type):
+                continue
+            values = table.column(i).cast(field.type.value_type)
+            known = self.dictionaries.get(field.name, pa.array([], type=field.type.value_type))
+            new_values = pc.unique(pc.filter(values, pc.invert(pc.is_in(values, value_set=known))).drop_null())
+            known = pa.concat_arrays([known, new_values])
+            self.dictionaries[field.name] = known
+            indices = pc.index_in(values, value_set=known).cast(field.type.index_type)
+            chunks = [pa.DictionaryArray.from_arrays(chunk, known) for chunk in indices.chunks]
+            table = table.set_column(i, field, pa.chunked_array(chunks, type=field.type))
+        return table
+
+    def write(self, frame):
+        table = self._unify_dictionaries(to_table(frame))
+        if self.writer is None:
+            self.writer = self._open(table.schema)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self.writer is None:
+            self.writer = self._open(to_table(pd.DataFrame()).schema)
+        self.writer.close()
+        super().close()
+
+
+class ParquetFrameWriter(ArrowFrameWriter):
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, schema, compression=Config.OUTPUT_COMPRESSION)
+
+
+class FeatherFrameWriter(ArrowFrameWriter):
+    def _open(self, schema):
+        pa = _pyarrow()
+        options = pa.ipc.IpcWriteOptions(compression=Config.OUTPUT_COMPRESSION, emit_dictionary_deltas=True)
+        return pa.ipc.new_file(self.path, schema, options=options)
+
+
+WRITERS = {'csv': CsvFrameWriter, 'parquet': ParquetFrameWriter, 'feather': FeatherFrameWriter}
+
+
+def open_writer(path):
+    """Open a chunk writer for ``path``, choosing the format from its file extension."""
+    return WRITERS[detect_format(path)](path)
@@ -0,0 +1,184 @@
+import threading
+from datetime import datetime
+
+from loguru import logger
+
+from app.config import Config
+from app.sqlite_connections import ThreadLocalConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    title TEXT,
+    content TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    url TEXT,
+    created_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS posts_subreddit ON posts (subreddit COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS posts_score ON posts (score);
+CREATE INDEX IF NOT EXISTS posts_created_at ON posts (created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, content, content='posts', content_rowid='rowid');
+
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE OF title, content ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+"""
+
+UPSERT = """
+INSERT INTO posts (id, subreddit, title, content, score, num_comments, url, created_at)
+VALUES (:id, :subreddit, :title, :content, :score, :num_comments, :url, :created_at)
+ON CONFLICT (id) DO UPDATE SET
+    subreddit = excluded.subreddit,
+    title = excluded.title,
+    content = excluded.content,
+    score = excluded.score,
+    num_comments = excluded.num_comments,
+    url = excluded.url,
+    created_at = excluded.created_at
+"""
+
+UPDATE_STATS = "UPDATE posts SET score = :score, num_comments = :num_comments WHERE id = :id"
+
+SORT_ORDERS = {
+    'relevance': 'bm25(posts_fts)',
+    'score': 'posts.score DESC',
+    'created_at': 'posts.created_at DESC',
+}
+
+
+def _to_epoch(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value) if value is not None else None
+
+
+def _fts_query(text):
+    """Quote every term, so user input is matched as keywords rather than parsed as FTS5 syntax."""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class PostIndex:
+    """Local SQLite store of scraped posts with an FTS5 index over title and content.
+
+    The database runs in WAL mode so searches are not blocked by writers. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, path=Config.INDEX_DB_PATH, batch_size=Config.INDEX_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._connections = ThreadLocalConnections(path, SCHEMA)
+
+    def connection(self):
+        return self._connections.get()
+
+    def upsert_posts(self, posts):
+        """Insert or update posts by id, one transaction per ``batch_size`` posts. Returns the count."""
+        conn = self.connection()
+        batch = []
+        count = 0
+        for post in posts:
+            batch.append({
+                'id': post['id'],
+                'subreddit': post['subreddit'],
+                'title': post['title'],
+                'content': post['content'],
+                'score': post['score'],
+                'num_comments': post['num_comments'],
+                'url': post['url'],
+                'created_at': _to_epoch(post['created_at']),
+            })
+            if len(batch) >= self.batch_size:
+                with conn:
+                    conn.executemany(UPSERT, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(UPSERT, batch)
+            count += len(batch)
+        logger.info(f"Indexed {count} posts in {self.path}.")
+        return count
+
+    def update_stats(self, stats):
+        """Update the score and comment count of indexed posts from ``{id: (score, num_comments)}``.
+
+        Posts that are not indexed are left out, and the full-text index is not touched. Returns the count.
+        """
+        rows = [{'id': post_id, 'score': score, 'num_comments': num_comments}
+                for post_id, (score, num_comments) in stats.items()]
+        conn = self.connection()
+        with conn:
+            count = conn.executemany(UPDATE_STATS, rows).rowcount
+        logger.info(f"Updated the stats of {count} indexed posts in {self.path}.")
+        return count
+
+    def search(self, query=None, subreddit=None, since=None, until=None, limit=50, offset=0, sort=None):
+        """Search the stored posts by keywords, subreddit and creation time range.
+
+        ``sort`` is 'relevance' (keyword searches only), 'score' or 'created_at'; by default keyword
+        searches are sorted by relevance and other searches by newest first.
+        """
+        clauses, params = [], []
+        if query:
+            source = 'posts_fts JOIN posts ON posts.rowid = posts_fts.rowid'
+            clauses.append('posts_fts MATCH ?')
+            params.append(_fts_query(query))
+        else:
+            source = 'posts'
+        if subreddit:
+            clauses.append('posts.subreddit = ? COLLATE NOCASE')
+            params.append(subreddit)
+        if since is not None:
+            clauses.append('posts.created_at >= ?')
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append('posts.created_at < ?')
+            params.append(_to_epoch(until))
+        sort = sort or ('relevance' if query else 'created_at')
+        if sort == 'relevance' and not query:
+            sort = 'created_at'
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = (f"SELECT posts.* FROM {source} {where} ORDER BY {SORT_ORDERS[sort]} LIMIT ? OFFSET ?")
+        rows = self.connection().execute(sql, [*params, limit, offset]).fetchall()
+        return [self._row_to_post(row) for row in rows]
+
+    @staticmethod
+    def _row_to_post(row):
+        return {
+            'subreddit': row['subreddit'],
+            'title': row['title'],
+            'score': row['score'],
+            'id': row['id'],
+            'url': row['url'],
+            'num_comments': row['num_comments'],
+            'created_at': datetime.fromtimestamp(row['created_at']) if row['created_at'] is not None else None,
+            'content': row['content'],
+        }
+
+    def count(self):
+        return self.connection().execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+
+_post_index = None
+_post_index_lock = threading.Lock()
+
+
+def get_post_index():
+    """Return the post index shared by the scraper pipeline and the FastAPI app."""
+    global _post_index
+    with _post_index_lock:
+        if _post_index is None:
+            _post_index = PostIndex()
+        return _post_index
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from asyncprawcore import Requestor
+from loguru import logger
+
+from app.config import Config
+from app.metrics import API_REQUEST_SECONDS, API_REQUESTS, RATE_LIMIT_DELAYED, RATE_LIMIT_WAIT_SECONDS
+
+
+class RateLimitScheduler:
+    """Token bucket that paces every Reddit API call made in the process.
+
+    The bucket refills at ``rate`` tokens per second up to ``burst`` tokens. Once Reddit reports its
+    budget through the ``X-Ratelimit-Remaining``/``X-Ratelimit-Reset`` headers, the refill rate is set so
+    the remaining requests are spread evenly over the rest of the window instead of being spent at once.
+    Callers reserve a token and sleep until their slot, so concurrent callers are queued in order.
+
+    When several processes share one Reddit budget, each one gets a ``share`` of it: the fraction of the
+    configured rate and of the reported remaining requests it may use.
+    """
+
+    def __init__(self, rate=Config.RATE_LIMIT_PER_SECOND, burst=Config.RATE_LIMIT_BURST, share=1.0):
+        self.share = float(share)
+        self.rate = float(rate) * self.share
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.remaining = None
+        self.reset_seconds = None
+        self._updated_at = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()  # Not an asyncio lock: the scheduler is shared across event loops.
+
+        self.requests = 0
+        self.delayed_requests = 0
+        self.throttled_responses = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller has to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self._resume_at - now)
+
+            self.requests += 1
+            if wait > 0:
+                self.delayed_requests += 1
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        if wait > 0:
+            RATE_LIMIT_DELAYED.inc()
+            RATE_LIMIT_WAIT_SECONDS.inc(wait)
+        return wait
+
+    async def acquire(self):
+        """Wait until the next request may be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def available(self):
+        """Requests that can be sent now without waiting; negative when callers are already queued."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+    def resume_in(self):
+        """Seconds until requests may be sent again after the budget ran out or a 429, or 0 if not paused."""
+        with self._lock:
+            return max(0.0, self._resume_at - time.monotonic())
+
+    def update(self, status, headers):
+        """Adjust the bucket from the status and rate-limit headers of a Reddit response."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            remaining = headers.get('x-ratelimit-remaining')
+            reset = headers.get('x-ratelimit-reset')
+            if remaining is not None and reset is not None:
+                self.remaining = float(remaining)
+                self.reset_seconds = max(float(reset), 1.0)
+                if self.remaining > 0:
+                    self.rate = self.remaining * self.share / self.reset_seconds
+                    self.tokens = min(self.tokens, self.remaining * self.share)
+                else:
+                    self.tokens = min(self.tokens, 0.0)
+                    self._resume_at = max(self._resume_at, now + self.reset_seconds)
+
+            if status == 429:
+                self.throttled_responses += 1
+                retry_after = float(headers.get('retry-after') or self.reset_seconds or 1.0)
+                self.tokens = min(self.tokens, 0.0)
+                self._resume_at = max(self._resume_at, now + retry_after)
+                logger.warning(f"Reddit rate limit hit, pausing requests for {retry_after:.1f}s.")
+
+    def stats(self):
+        """Return the scheduler counters."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'delayed_requests': self.delayed_requests,
+                'throttled_responses': self.throttled_responses,
+                'total_wait_seconds': round(self.total_wait_seconds, 3),
+                'max_wait_seconds': round(self.max_wait_seconds, 3),
+                'rate_per_second': round(self.rate, 3),
+                'remaining': self.remaining,
+                'reset_seconds': self.reset_seconds,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the scheduler shared by every scraper in the process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler()
+        return _scheduler
+
+
+def configure_scheduler(rate=Config.RATE_LIMIT_PER_SECOND, burst=Config.RATE_LIMIT_BURST, share=1.0):
+    """Replace the process-wide scheduler, e.g. to give a worker process its share of the budget."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = RateLimitScheduler(rate, burst, share)
+        return _scheduler
+
+
+class ScheduledRequestor(Requestor):
+    """asyncprawcore requestor that sends every request through a :class:`RateLimitScheduler`."""
+
+    def __init__(self, *args, scheduler=None, max_retries=Config.RATE_LIMIT_MAX_RETRIES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or get_scheduler()
+        self.max_retries = max_retries
+
+    @asynccontextmanager
+    async def request(self, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire()
+            start = time.perf_counter()
+            async with super().request(*args, **kwargs) as response:
+                API_REQUEST_SECONDS.observe(time.perf_counter() - start)
+                API_REQUESTS.labels(str(response.status)).inc()
+                self.scheduler.update(response.status, response.headers)
+                if response.status == 429 and attempt < self.max_retries:
+                    continue
+                yield response
+                return
@@ -0,0 +1,78 @@
+from array import array
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+
+def epochs_to_datetimes(epochs):
+    """Convert epoch seconds to naive local datetimes in one vectorized step, matching what
+    ``datetime.fromtimestamp`` returns for each value."""
+    return pd.to_datetime(epochs, unit='s', utc=True).tz_convert(tzlocal()).tz_localize(None)
+
+
+class PostAccumulator:
+    """Columnar store of fetched posts.
+
+    Each field is one list or typed array instead of one dict per post, and ``created_utc`` stays an
+    epoch integer until :meth:`to_frame` converts the whole column at once. The numeric arrays are
+    handed to pandas without a per-row copy.
+    """
+
+    __slots__ = ('subreddit', 'title', 'score', 'id', 'url', 'num_comments', 'created_utc', 'content')
+
+    def __init__(self):
+        self.subreddit = []
+        self.title = []
+        self.score = array('q')
+        self.id = []
+        self.url = []
+        self.num_comments = array('q')
+        self.created_utc = array('q')
+        self.content = []
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, subreddit_name, submission):
+        self.subreddit.append(subreddit_name)
+        self.title.append(submission.title)
+        self.score.append(submission.score)
+        self.id.append(submission.id)
+        self.url.append(submission.url)
+        self.num_comments.append(submission.num_comments)
+        self.created_utc.append(int(submission.created_utc))
+        self.content.append(submission.selftext or '')
+
+    def extend(self, other):
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def to_frame(self):
+        """Return the posts as a DataFrame with the columns of the post dicts."""
+        return pd.DataFrame({
+            'subreddit': self.subreddit,
+            'title': self.title,
+            'score': np.frombuffer(self.score, dtype=np.int64),
+            'id': self.id,
+            'url': self.url,
+            'num_comments': np.frombuffer(self.num_comments, dtype=np.int64),
+            'created_at': epochs_to_datetimes(np.frombuffer(self.created_utc, dtype=np.int64)),
+            'content': self.content,
+        }, copy=False)
+
+    def iter_records(self):
+        """Yield one post dict at a time, with ``created_at`` as epoch seconds."""
+        for row in zip(self.subreddit, self.title, self.score, self.id, self.url, self.num_comments,
+                       self.created_utc, self.content):
+            yield dict(zip(('subreddit', 'title', 'score', 'id', 'url', 'num_comments', 'created_at', 'content'),
+                           row))
+
+    def to_posts(self):
+        """Return the list of post dicts the API callers get, with ``created_at`` as a datetime."""
+        posts = []
+        for record in self.iter_records():
+            record['created_at'] = datetime.fromtimestamp(record['created_at'])
+            posts.append(record)
+        return posts
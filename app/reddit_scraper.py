@@ -1,14 +1,31 @@
-import re
-import string
+import json
+import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 import asyncio
+import numpy as np
 import pandas as pd
 import asyncpraw
 from halo import Halo
 from loguru import logger
 
+from app.checkpoints import CheckpointStore
+from app.comment_scraper import stream_comments_to_file
 from app.config import Config
+from app.credential_pool import create_credential_pool
+from app.deep_crawl import crawl_subreddits, open_listing
+from app.external_shuffle import shuffle_out_of_core
+from app.metrics import POSTS_FETCHED, RunMetrics
+from app.near_duplicates import dedupe_file
+from app.post_index import get_post_index
+from app.output_formats import COLUMNAR_FORMATS, append_frame, detect_format, open_writer, output_path, read_frame, \
+    read_table, write_frame
+from app.records import PostAccumulator
+from app.row_index import shuffle_csv_rows
+from app.rate_limiter import ScheduledRequestor, get_scheduler
+from app.result_cache import ResultCache, get_result_cache
+from app.text_cleaning import clean_frame, clean_table, clean_text
 
 # Reddit API credentials
 CLIENT_ID = Config.CLIENT_ID
@@ -21,19 +38,106 @@ CLEANED_CSV_PATH = Config.CLEANED_CSV_PATH
 SHUFFLED_CSV_PATH = Config.SHUFFLED_CSV_PATH
 LOG_FILE_PATH = Config.LOG_FILE_PATH
 
+# Output files in the configured format
+OUTPUT_FORMAT = Config.OUTPUT_FORMAT
+RAW_OUTPUT_PATH = output_path(RAW_CSV_PATH, OUTPUT_FORMAT)
+CLEANED_OUTPUT_PATH = output_path(CLEANED_CSV_PATH, OUTPUT_FORMAT)
+SHUFFLED_OUTPUT_PATH = output_path(SHUFFLED_CSV_PATH, OUTPUT_FORMAT)
+COMMENTS_OUTPUT_PATH = output_path(Config.COMMENTS_CSV_PATH, OUTPUT_FORMAT)
+
 # Reddit API parameters
 SEARCH_QUERY = Config.SEARCH_QUERY
 SUBREDDIT_LIMIT = Config.SUBREDDIT_LIMIT
 POST_LIMIT = Config.POST_LIMIT
 POSTS_SORT = Config.POSTS_SORT
+POSTS_TIME_FILTER = Config.POSTS_TIME_FILTER
+DEEP_CRAWL_LISTINGS = Config.DEEP_CRAWL_LISTINGS
 POSTS_FIELDS = Config.POSTS_FIELDS
+FETCH_CONCURRENCY = Config.FETCH_CONCURRENCY
+STREAM_BUFFER_SIZE = Config.STREAM_BUFFER_SIZE
+REFRESH_BATCH_SIZE = Config.REFRESH_BATCH_SIZE
+INFO_BATCH_LIMIT = 100  # Most fullnames Reddit's info endpoint accepts per request
+COMMENT_MAX_DEPTH = Config.COMMENT_MAX_DEPTH
+COMMENT_MAX_PER_POST = Config.COMMENT_MAX_PER_POST
+COMMENT_CONCURRENCY = Config.COMMENT_CONCURRENCY
+
+# Pipeline
+INDEX_ENABLED = Config.INDEX_ENABLED
+INCREMENTAL = Config.INCREMENTAL
+CHECKPOINT_PATH = Config.CHECKPOINT_PATH
+CRAWL_COVERAGE_PATH = Config.CRAWL_COVERAGE_PATH
+PIPELINE_MODE = Config.PIPELINE_MODE
+PIPELINE_CHUNK_SIZE = Config.PIPELINE_CHUNK_SIZE
+DEDUP_MODE = Config.DEDUP_MODE
+SHUFFLE_SEED = Config.SHUFFLE_SEED
+
+POST_COLUMNS = ['subreddit', 'title', 'score', 'id', 'url', 'num_comments', 'created_at', 'content']
 
 
 class RedditScraper:
-    def __init__(self, client_id, client_secret, user_agent):
+    logging_configured = False
+
+    def __init__(self, client_id, client_secret, user_agent, reddit=None, credential_pool=None):
+        """Create a scraper. An existing ``reddit`` client can be passed in, in which case it is left open.
+
+        Listings and post lookups are fetched with clients leased from ``credential_pool`` when there is one; the
+        ``reddit`` client is then used for the subreddit searches only. Without a ``credential_pool``, the scraper
+        creates one if several Reddit apps are configured (see :func:`app.credential_pool.create_credential_pool`)
+        and closes it like the client it creates.
+        """
         self.spinner = Halo(text='Processing', spinner='dots')
-        self.setup_logging()
-        self.reddit = asyncpraw.Reddit(client_id=client_id, client_secret=client_secret, user_agent=user_agent)
+        Config.ensure_directories()
+        if not RedditScraper.logging_configured:
+            self.setup_logging()
+            RedditScraper.logging_configured = True
+        self.scheduler = get_scheduler()
+        self.owns_reddit = reddit is None
+        if reddit is None:
+            reddit = self.create_reddit(client_id, client_secret, user_agent, self.scheduler)
+        self.reddit = reddit
+        self.owns_credential_pool = credential_pool is None
+        self.credential_pool = create_credential_pool() if credential_pool is None else credential_pool
+
+    @staticmethod
+    def create_reddit(client_id, client_secret, user_agent, scheduler=None, session=None):
+        """Create a Reddit client whose requests are paced by ``scheduler`` (the process-wide one by default).
+        An aiohttp ``session`` can be shared between clients; it is then not closed with the client."""
+        requestor_kwargs = {'scheduler': scheduler or get_scheduler()}
+        if session is not None:
+            requestor_kwargs['session'] = session
+        endpoints = {name: url for name, url in (('oauth_url', Config.REDDIT_OAUTH_URL),
+                                                 ('reddit_url', Config.REDDIT_URL)) if url}
+        return asyncpraw.Reddit(client_id=client_id, client_secret=client_secret, user_agent=user_agent,
+                                requestor_class=ScheduledRequestor, requestor_kwargs=requestor_kwargs, **endpoints)
+
+    async def close_owned(self):
+        """Close the Reddit client and the credential pool if this scraper created them."""
+        if self.owns_reddit:
+            await self.reddit.close()
+        if self.owns_credential_pool and self.credential_pool is not None:
+            await self.credential_pool.close()
+
+    @asynccontextmanager
+    async def lease_reddit(self):
+        """A client leased from the credential pool, or this scraper's own client when there is no pool."""
+        if self.credential_pool is None:
+            yield self.reddit
+            return
+        async with self.credential_pool.lease() as reddit:
+            yield reddit
+
+    @asynccontextmanager
+    async def lease_subreddit(self, subreddit):
+        """``subreddit`` bound to a client from :meth:`lease_reddit`, so its listings are fetched on that client."""
+        async with self.lease_reddit() as reddit:
+            yield subreddit if reddit is self.reddit else await reddit.subreddit(subreddit.display_name)
+
+    @asynccontextmanager
+    async def lease_submission(self, submission):
+        """``submission`` bound to a client from :meth:`lease_reddit`, so its comments are fetched on that client
+        while it is leased."""
+        async with self.lease_reddit() as reddit:
+            yield submission if reddit is self.reddit else await reddit.submission(submission.id, fetch=False)
 
     @staticmethod
     def setup_logging():
@@ -48,27 +152,269 @@ class RedditScraper:
             logger.error(f"Failed to initialize Reddit instance: {e}")
             raise
 
-    async def fetch_reddit_posts(self, search_query, subreddit_limit, post_limit):
-        posts = []
-        subreddits = self.reddit.subreddits.search(search_query, limit=subreddit_limit)
-        async for subreddit in subreddits:
-            subreddit_name = subreddit.display_name
-            subreddit_posts = subreddit.top(limit=post_limit)
-            async for submission in subreddit_posts:  # Use async for here
-                posts.append({
-                    'subreddit': subreddit_name,
-                    'title': submission.title,
-                    'score': submission.score,
-                    'id': submission.id,
-                    'url': submission.url,
-                    'num_comments': submission.num_comments,
-                    'created_at': datetime.fromtimestamp(submission.created_utc),
-                    'content': submission.selftext or ''
-                })
-        logger.info(f"Fetched {len(posts)} posts.")
-        await self.reddit.close() # Close the Reddit instance
+    async def fetch_reddit_posts(self, search_query, subreddit_limit, post_limit, concurrency=FETCH_CONCURRENCY):
+        """Fetch the posts of every subreddit matching the search query, as a list of post dicts."""
+        accumulator = await self.fetch_post_records(search_query, subreddit_limit, post_limit, concurrency)
+        return accumulator.to_posts()
+
+    async def fetch_reddit_frame(self, search_query, subreddit_limit, post_limit, concurrency=FETCH_CONCURRENCY):
+        """Fetch the same posts as :meth:`fetch_reddit_posts`, as a DataFrame built without per-post dicts."""
+        accumulator = await self.fetch_post_records(search_query, subreddit_limit, post_limit, concurrency)
+        return accumulator.to_frame()
+
+    async def fetch_post_records(self, search_query, subreddit_limit, post_limit, concurrency=FETCH_CONCURRENCY):
+        """Fetch the posts of every subreddit matching the search query into a :class:`PostAccumulator`.
+
+        Each subreddit listing is fetched as its own task, with at most ``concurrency`` listings in flight.
+        Posts are returned grouped by subreddit in search order, so the result does not depend on which
+        listing finished first.
+        """
+        subreddits = [subreddit async for subreddit in self.reddit.subreddits.search(search_query,
+                                                                                     limit=subreddit_limit)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_limited(subreddit):
+            async with semaphore:
+                return await self.fetch_subreddit_posts(subreddit, post_limit)
+
+        results = await asyncio.gather(*(fetch_limited(subreddit) for subreddit in subreddits))
+        posts = PostAccumulator()
+        for subreddit_posts in results:
+            posts.extend(subreddit_posts)
+        logger.info(f"Fetched {len(posts)} posts from {len(subreddits)} subreddits.")
+        await self.close_owned()
+        return posts
+
+    async def fetch_cached_posts(self, search_query, subreddit_limit, post_limit):
+        """Like :meth:`fetch_reddit_posts`, but served from the shared result cache when possible. The clients this
+        scraper created are closed on a cache hit as well. Callers get their own copy of the cached posts."""
+        key = ResultCache.make_key(search_query, subreddit_limit, post_limit, POSTS_SORT, POSTS_TIME_FILTER)
+
+        async def fetch():
+            posts = await self.fetch_reddit_posts(search_query, subreddit_limit, post_limit)
+            await asyncio.to_thread(self.index_posts, posts)
+            return posts
+
+        try:
+            posts = await get_result_cache().get_or_fetch(key, fetch)
+        finally:
+            await self.close_owned()  # Closing again after a fetch is harmless
+        return [dict(post) for post in posts]
+
+    async def fetch_listing_submissions(self, search_query, subreddit_limit, post_limit, concurrency=FETCH_CONCURRENCY):
+        """Fetch the submissions of the ``POSTS_SORT`` listing of every subreddit matching the search query, in
+        search order."""
+        subreddits = [subreddit async for subreddit in self.reddit.subreddits.search(search_query,
+                                                                                     limit=subreddit_limit)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_limited(subreddit):
+            async with semaphore, self.lease_subreddit(subreddit) as leased:
+                submissions = [submission async for submission in self.open_listing(leased, post_limit)]
+                POSTS_FETCHED.inc(len(submissions))
+                return submissions
+
+        results = await asyncio.gather(*(fetch_limited(subreddit) for subreddit in subreddits))
+        return [submission for submissions in results for submission in submissions]
+
+    async def scrape_comments(self, search_query, subreddit_limit, post_limit, file_path,
+                              max_depth=COMMENT_MAX_DEPTH, max_comments=COMMENT_MAX_PER_POST,
+                              concurrency=COMMENT_CONCURRENCY):
+        """Save the comment trees of the top posts of every subreddit matching the search query to one flat,
+        parent-linked table. See :func:`app.comment_scraper.stream_comments_to_file`."""
+        try:
+            submissions = await self.fetch_listing_submissions(search_query, subreddit_limit, post_limit)
+            return await stream_comments_to_file(submissions, file_path, max_depth, max_comments, concurrency,
+                                                 lease_submission=self.lease_submission)
+        except Exception as e:
+            logger.error(f"Failed to scrape comments: {e}")
+            raise
+        finally:
+            await self.close_owned()
+
+    @staticmethod
+    def open_listing(subreddit, post_limit):
+        """The configured listing (``POSTS_SORT`` and ``POSTS_TIME_FILTER``) of a subreddit."""
+        return open_listing(subreddit, POSTS_SORT, post_limit, POSTS_TIME_FILTER)
+
+    async def deep_crawl(self, search_query, subreddit_limit, post_limit, listings=None,
+                         concurrency=FETCH_CONCURRENCY):
+        """Fetch every listing in ``listings`` (``DEEP_CRAWL_LISTINGS`` by default) of every subreddit matching
+        the search query, merged by post id. Returns a :class:`PostAccumulator` and the coverage report of the
+        listings (see :class:`app.deep_crawl.CrawlCoverage`)."""
+        try:
+            subreddits = [subreddit async for subreddit in self.reddit.subreddits.search(search_query,
+                                                                                         limit=subreddit_limit)]
+            posts, coverage = await crawl_subreddits(subreddits, listings or DEEP_CRAWL_LISTINGS, post_limit,
+                                                     concurrency, self.lease_subreddit)
+            POSTS_FETCHED.inc(len(posts))
+            return posts, coverage.report()
+        except Exception as e:
+            logger.error(f"Failed to deep crawl: {e}")
+            raise
+        finally:
+            await self.close_owned()
+
+    async def fetch_subreddit_posts(self, subreddit, post_limit):
+        """Fetch the posts of a single subreddit into a :class:`PostAccumulator`."""
+        subreddit_name = subreddit.display_name
+        posts = PostAccumulator()
+        async with self.lease_subreddit(subreddit) as subreddit:
+            async for submission in self.open_listing(subreddit, post_limit):
+                posts.append(subreddit_name, submission)
+        POSTS_FETCHED.inc(len(posts))
         return posts
 
+    async def fetch_new_posts(self, search_query, subreddit_limit, post_limit, checkpoints,
+                              concurrency=FETCH_CONCURRENCY):
+        """Fetch only the posts that are newer than each subreddit's checkpoint.
+
+        Each subreddit's ``new`` listing is read newest first and paging stops at the first post that is
+        not newer than the checkpoint, so API calls scale with the amount of new content. Returns the
+        posts and the new high-water marks, which the caller saves once the posts are stored.
+        """
+        subreddits = [subreddit async for subreddit in self.reddit.subreddits.search(search_query,
+                                                                                     limit=subreddit_limit)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_limited(subreddit):
+            async with semaphore:
+                return await self.fetch_subreddit_new_posts(subreddit, post_limit,
+                                                            checkpoints.get(subreddit.display_name))
+
+        results = await asyncio.gather(*(fetch_limited(subreddit) for subreddit in subreddits))
+        posts = [post for subreddit_posts, _ in results for post in subreddit_posts]
+        marks = {subreddit.display_name: mark for subreddit, (_, mark) in zip(subreddits, results) if mark}
+        logger.info(f"Fetched {len(posts)} new posts from {len(subreddits)} subreddits.")
+        await self.close_owned()
+        return posts, marks
+
+    async def fetch_subreddit_new_posts(self, subreddit, post_limit, mark):
+        """Fetch the posts of a subreddit newer than ``mark``, and the mark of the newest one."""
+        subreddit_name = subreddit.display_name
+        posts = []
+        newest = None
+        async with self.lease_subreddit(subreddit) as subreddit:
+            async for submission in subreddit.new(limit=post_limit):
+                if mark and (submission.id == mark['id'] or submission.created_utc < mark['created_utc']):
+                    break
+                if newest is None:
+                    newest = {'created_utc': submission.created_utc, 'id': submission.id}
+                posts.append(self.build_post(subreddit_name, submission))
+        POSTS_FETCHED.inc(len(posts))
+        return posts, newest
+
+    async def fetch_post_stats(self, post_ids, concurrency=FETCH_CONCURRENCY, batch_size=REFRESH_BATCH_SIZE):
+        """Fetch the current score and comment count of posts by id.
+
+        Ids are looked up ``batch_size`` (at most 100) per info request, with at most ``concurrency`` requests in
+        flight, so refreshing N posts costs N / 100 requests. Returns ``{id: (score, num_comments)}``; posts
+        Reddit no longer returns are left out.
+        """
+        batch_size = max(1, min(batch_size, INFO_BATCH_LIMIT))
+        batches = [post_ids[start:start + batch_size] for start in range(0, len(post_ids), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_batch(batch):
+            async with semaphore, self.lease_reddit() as reddit:
+                fullnames = [f't3_{post_id}' for post_id in batch]
+                return [(submission.id, submission.score, submission.num_comments)
+                        async for submission in reddit.info(fullnames=fullnames)]
+
+        results = await asyncio.gather(*(fetch_batch(batch) for batch in batches))
+        stats = {post_id: (score, num_comments) for batch in results for post_id, score, num_comments in batch}
+        logger.info(f"Fetched the stats of {len(stats)} of {len(post_ids)} posts in {len(batches)} requests.")
+        await self.close_owned()
+        return stats
+
+    async def refresh_posts(self, file_paths, concurrency=FETCH_CONCURRENCY, batch_size=REFRESH_BATCH_SIZE):
+        """Update the score and num_comments of the posts stored in ``file_paths`` in place.
+
+        The posts are looked up by id with :meth:`fetch_post_stats` instead of re-crawling their listings. Ids
+        shared between files are fetched once, files that do not exist are skipped, and the search index is
+        updated too. Other columns are written back as they were read. Returns the number of posts refreshed.
+        """
+        try:
+            frames = {path: read_frame(path, keep_default_na=False) for path in file_paths
+                      if os.path.exists(path)}
+            post_ids = list(dict.fromkeys(post_id for frame in frames.values()
+                                          for post_id in frame['id'].astype(str)))
+            stats = await self.fetch_post_stats(post_ids, concurrency, batch_size)
+            for path, frame in frames.items():
+                self.replace_file(self.apply_post_stats(frame, stats), path)
+                logger.info(f"Refreshed the stats of the posts in {path}.")
+            if INDEX_ENABLED and stats:
+                await asyncio.to_thread(get_post_index().update_stats, stats)
+            return len(stats)
+        except Exception as e:
+            logger.error(f"Failed to refresh posts: {e}")
+            raise
+
+    async def iter_reddit_posts(self, search_query, subreddit_limit, post_limit, concurrency=FETCH_CONCURRENCY):
+        """Yield posts as soon as their listing page arrives instead of collecting them first.
+
+        Subreddit listings are fetched concurrently, like in :meth:`fetch_reddit_posts`, and feed a bounded
+        queue, so memory use does not grow with ``post_limit``. Posts are yielded in arrival order.
+        """
+        queue = asyncio.Queue(maxsize=STREAM_BUFFER_SIZE)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        done = object()
+
+        async def produce(subreddit):
+            async with semaphore, self.lease_subreddit(subreddit) as leased:
+                subreddit_name = subreddit.display_name
+                async for submission in self.open_listing(leased, post_limit):
+                    POSTS_FETCHED.inc()
+                    await queue.put(self.build_post(subreddit_name, submission))
+
+        async def cancel_all(tasks):
+            # Waited for, so no listing is still using a client when it is closed or its lease is given back
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        async def produce_all():
+            tasks = []
+            try:
+                async for subreddit in self.reddit.subreddits.search(search_query, limit=subreddit_limit):
+                    tasks.append(asyncio.create_task(produce(subreddit)))
+                await asyncio.gather(*tasks)
+            except asyncio.CancelledError:
+                await cancel_all(tasks)
+                raise
+            except Exception as e:
+                await cancel_all(tasks)
+                await queue.put(e)
+                return
+            await queue.put(done)
+
+        producer = asyncio.create_task(produce_all())
+        count = 0
+        try:
+            while (item := await queue.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                count += 1
+                yield item
+            logger.info(f"Streamed {count} posts.")
+        finally:
+            await cancel_all([producer])
+            await self.close_owned()
+
+    @staticmethod
+    def build_post(subreddit_name, submission):
+        """Convert a submission into the post dict returned by the scraper."""
+        return {
+            'subreddit': subreddit_name,
+            'title': submission.title,
+            'score': submission.score,
+            'id': submission.id,
+            'url': submission.url,
+            'num_comments': submission.num_comments,
+            'created_at': datetime.fromtimestamp(submission.created_utc),
+            'content': submission.selftext or ''
+        }
+
     @staticmethod
     def save_posts_to_csv(posts, filename):
         """Save posts to a CSV file."""
@@ -80,67 +426,286 @@ class RedditScraper:
             logger.error(f"Failed to save posts to CSV: {e}")
             raise
 
+    async def stream_posts_to_files(self, search_query, subreddit_limit, post_limit, raw_file_path,
+                                    cleaned_file_path, chunk_size=PIPELINE_CHUNK_SIZE):
+        """Fetch, save and clean posts in one pass, holding at most ``chunk_size`` posts in memory.
+
+        Posts from :meth:`iter_reddit_posts` are grouped into chunks; each chunk is appended to the raw
+        file and, once cleaned, to the cleaned file. Nothing is read back from disk. The file format
+        follows the file extensions.
+        """
+        try:
+            with open_writer(raw_file_path) as raw_writer, open_writer(cleaned_file_path) as cleaned_writer:
+                def write_chunk(posts):
+                    self.index_posts(posts)
+                    df = pd.DataFrame(posts, columns=POST_COLUMNS)
+                    raw_writer.write(df)
+                    cleaned_writer.write(clean_frame(df))
+
+                chunk = []
+                async for post in self.iter_reddit_posts(search_query, subreddit_limit, post_limit):
+                    chunk.append(post)
+                    if len(chunk) >= chunk_size:
+                        write_chunk(chunk)
+                        chunk = []
+                if chunk or raw_writer.rows == 0:
+                    write_chunk(chunk)
+            logger.info(f"Scraped {raw_writer.rows} posts and saved them to {raw_file_path} and "
+                        f"{cleaned_file_path}.")
+            return raw_writer.rows
+        except Exception as e:
+            logger.error(f"Failed to stream posts to files: {e}")
+            raise
+
+    @staticmethod
+    def index_posts(posts):
+        """Write posts (any iterable of post dicts) through to the local search index, if it is enabled."""
+        if not INDEX_ENABLED:
+            return
+        try:
+            get_post_index().upsert_posts(posts)
+        except Exception as e:
+            logger.error(f"Failed to index posts: {e}")
+            raise
+
+    @staticmethod
+    def save_posts(posts, filename):
+        """Save posts in the format given by the file extension of ``filename``."""
+        try:
+            df = pd.DataFrame(posts)
+            write_frame(df, filename)
+            logger.info(f"Scraped {len(df)} posts and saved to {filename}.")
+        except Exception as e:
+            logger.error(f"Failed to save posts: {e}")
+            raise
+
+    @staticmethod
+    def apply_post_stats(frame, stats):
+        """Overwrite the score and num_comments of the rows whose id is in ``{id: (score, num_comments)}``."""
+        if not stats:
+            return frame
+        fresh = pd.DataFrame.from_dict(stats, orient='index', columns=['score', 'num_comments'])
+        ids = frame['id'].astype(str)
+        for column in ('score', 'num_comments'):
+            frame[column] = ids.map(fresh[column]).fillna(frame[column]).astype(frame[column].dtype)
+        return frame
+
+    @staticmethod
+    def replace_file(frame, path):
+        """Write ``frame`` next to ``path`` and move it over ``path``, so readers never see a partial file."""
+        root, extension = os.path.splitext(path)
+        tmp_path = f'{root}.tmp{extension}'
+        write_frame(frame, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def save_coverage_report(coverage, file_path):
+        """Save a deep crawl coverage report as JSON and log it one listing per line."""
+        try:
+            with open(file_path, 'w') as f:
+                json.dump(coverage, f, indent=2)
+            for spec, counts in coverage['listings'].items():
+                logger.info(f"Listing {spec}: {counts['fetched']} fetched, {counts['new']} new, "
+                            f"{counts['exclusive']} exclusive in about {counts['estimated_requests']} requests.")
+            logger.info(f"Coverage report of {coverage['unique_posts']} unique posts saved to {file_path}.")
+        except Exception as e:
+            logger.error(f"Failed to save coverage report: {e}")
+            raise
+
+    @staticmethod
+    def append_new_posts(posts, file_path, cleaned_file_path):
+        """Append the posts whose id is not stored yet to the raw file and, cleaned, to the cleaned file.
+
+        Only the ``id`` column of the existing raw file is read. Returns the number of posts appended.
+        """
+        try:
+            df = pd.DataFrame(posts, columns=POST_COLUMNS).drop_duplicates('id')
+            try:
+                existing_ids = read_frame(file_path, columns=['id'])['id']
+            except FileNotFoundError:
+                existing_ids = pd.Series([], dtype=object)
+            new_posts = df[~df['id'].isin(existing_ids)]
+            if not new_posts.empty or not os.path.exists(file_path):
+                append_frame(new_posts, file_path)
+                append_frame(clean_frame(new_posts.copy()), cleaned_file_path)
+            logger.info(f"Appended {len(new_posts)} new posts to {file_path}; "
+                        f"skipped {len(df) - len(new_posts)} already stored.")
+            return len(new_posts)
+        except Exception as e:
+            logger.error(f"Failed to append new posts: {e}")
+            raise
+
     @staticmethod
     def clean_text(text):
         """Convert text to lowercase, remove punctuation and emojis."""
-        if isinstance(text, str):
-            text = text.lower()
-            text = text.translate(str.maketrans('', '', string.punctuation))
-            text = re.sub(r'[^\w\s]', '', text)
-        return text
-
-    def clean_dataframe(self, file_path, cleaned_file_path):
-        """Clean the data in the DataFrame and save it to a new CSV file."""
-        try:
-            df = pd.read_csv(file_path)
-            df.columns = [col.lower() for col in df.columns]
-            for col in df.columns:
-                df[col] = df[col].map(self.clean_text)
-            df.to_csv(cleaned_file_path, index=False)
+        return clean_text(text)
+
+    def clean_dataframe(self, file_path, cleaned_file_path, columns=None):
+        """Clean the text columns of the DataFrame and save it to a new file.
+
+        Parquet and Feather input is cleaned as an Arrow table, so only the text columns are converted to
+        Python strings. CSV text such as ``NA`` or ``null`` is read as text, as the streaming pipeline keeps it.
+        ``columns`` limits which columns are loaded and written.
+        """
+        try:
+            if detect_format(file_path) in COLUMNAR_FORMATS:
+                write_frame(clean_table(read_table(file_path, columns)), cleaned_file_path)
+            else:
+                df = read_frame(file_path, columns, keep_default_na=False)
+                clean_frame(df)
+                write_frame(df, cleaned_file_path)
             logger.info(f"Data cleaned and saved to {cleaned_file_path}.")
         except Exception as e:
             logger.error(f"Failed to clean DataFrame: {e}")
             raise
 
     @staticmethod
-    def shuffle_and_save_dataframe(file_path, shuffled_file_path):
-        """Shuffle the DataFrame and save it to a new CSV file."""
+    def dedupe_dataframe(file_path, deduped_file_path, mode=DEDUP_MODE):
+        """Tag or collapse near-duplicate posts of a cleaned file. See :func:`app.near_duplicates.dedupe_file`."""
         try:
-            df = pd.read_csv(file_path)
-            shuffled_df = df.sample(frac=1).reset_index(drop=True)
-            shuffled_df.to_csv(shuffled_file_path, index=False)
+            return dedupe_file(file_path, deduped_file_path, mode)
+        except Exception as e:
+            logger.error(f"Failed to dedupe DataFrame: {e}")
+            raise
+
+    @staticmethod
+    def shuffle_and_save_dataframe(file_path, shuffled_file_path, columns=None, seed=SHUFFLE_SEED):
+        """Shuffle the DataFrame and save it to a new file. ``columns`` limits which columns are loaded.
+
+        A CSV file shuffled into a CSV file with all its columns is not parsed: its rows are copied as raw bytes
+        through a :class:`app.row_index.RowIndex`. The same ``seed`` gives the same order.
+        """
+        try:
+            rng = np.random.default_rng(seed)
+            if columns is None and detect_format(file_path) == detect_format(shuffled_file_path) == 'csv':
+                shuffle_csv_rows(file_path, shuffled_file_path, seed)
+            elif detect_format(file_path) in COLUMNAR_FORMATS:
+                table = read_table(file_path, columns)
+                write_frame(table.take(rng.permutation(table.num_rows)), shuffled_file_path)
+            else:
+                df = read_frame(file_path, columns)
+                shuffled_df = df.sample(frac=1, random_state=rng).reset_index(drop=True)
+                write_frame(shuffled_df, shuffled_file_path)
             logger.info(f"Shuffled file saved to {shuffled_file_path}.")
         except Exception as shuffle_error:
             logger.error(f"Failed to shuffle and save DataFrame: {shuffle_error}")
             raise
 
-    async def run(self):
+    def run_dedupe(self, metrics):
+        """The dedupe stage of the batch and streaming pipelines, when ``DEDUP_MODE`` is set."""
+        if not DEDUP_MODE:
+            return
+        with metrics.stage('dedupe'):
+            self.spinner.start('Finding near-duplicate posts...')
+            duplicates = self.dedupe_dataframe(CLEANED_OUTPUT_PATH, CLEANED_OUTPUT_PATH)
+            self.spinner.succeed(f'{duplicates} near-duplicate posts found.')
+
+    async def run(self, search_query=None, subreddit_limit=None, post_limit=None):
+        """Run the configured pipeline. The search parameters default to the ones in ``Config``.
+
+        Errors are logged rather than raised; returns True if the pipeline completed and False if it failed.
+        """
+        search_query = SEARCH_QUERY if search_query is None else search_query
+        subreddit_limit = SUBREDDIT_LIMIT if subreddit_limit is None else subreddit_limit
+        post_limit = POST_LIMIT if post_limit is None else post_limit
+        metrics = RunMetrics()
         try:
-            self.spinner.start('Initializing Reddit instance...')
-            self.initialize_reddit()
-            self.spinner.succeed('Reddit instance initialized.')
+            with metrics.stage('initialize'):
+                self.spinner.start('Initializing Reddit instance...')
+                self.initialize_reddit()
+                self.spinner.succeed('Reddit instance initialized.')
+
+            if INCREMENTAL:
+                with metrics.stage('fetch'):
+                    self.spinner.start('Fetching new Reddit posts...')
+                    checkpoints = CheckpointStore(CHECKPOINT_PATH)
+                    new_posts, marks = await self.fetch_new_posts(search_query, subreddit_limit, post_limit,
+                                                                  checkpoints)
+                    self.spinner.succeed('New Reddit posts fetched.')
+
+                with metrics.stage('save'):
+                    self.spinner.start('Appending new posts...')
+                    self.append_new_posts(new_posts, RAW_OUTPUT_PATH, CLEANED_OUTPUT_PATH)
+                    self.index_posts(new_posts)
+                    checkpoints.update(marks)
+                    checkpoints.save()
+                    self.spinner.succeed('New posts appended.')
+
+                with metrics.stage('shuffle'):
+                    self.spinner.start('Shuffling DataFrame...')
+                    self.shuffle_and_save_dataframe(CLEANED_OUTPUT_PATH, SHUFFLED_OUTPUT_PATH)
+                    self.spinner.succeed('DataFrame shuffled.')
+                return True
+
+            if PIPELINE_MODE == 'refresh':
+                with metrics.stage('refresh'):
+                    self.spinner.start('Refreshing stored posts...')
+                    refreshed = await self.refresh_posts([RAW_OUTPUT_PATH, CLEANED_OUTPUT_PATH])
+                    self.spinner.succeed(f'{refreshed} stored posts refreshed.')
+                return True
+
+            if PIPELINE_MODE == 'comments':
+                with metrics.stage('comments'):
+                    self.spinner.start('Fetching comment trees...')
+                    await self.scrape_comments(search_query, subreddit_limit, post_limit, COMMENTS_OUTPUT_PATH)
+                    self.spinner.succeed(f'Comments saved to {COMMENTS_OUTPUT_PATH}.')
+                return True
+
+            if PIPELINE_MODE == 'streaming':
+                # Fetching, saving and cleaning are interleaved, so they are timed as one stage
+                with metrics.stage('fetch_save_clean'):
+                    self.spinner.start('Fetching, saving and cleaning Reddit posts...')
+                    await self.stream_posts_to_files(search_query, subreddit_limit, post_limit, RAW_OUTPUT_PATH,
+                                                     CLEANED_OUTPUT_PATH)
+                    self.spinner.succeed('Posts fetched, saved and cleaned.')
+
+                self.run_dedupe(metrics)
+
+                with metrics.stage('shuffle'):
+                    self.spinner.start('Shuffling cleaned posts on disk...')
+                    shuffle_out_of_core(CLEANED_OUTPUT_PATH, SHUFFLED_OUTPUT_PATH, seed=SHUFFLE_SEED)
+                    self.spinner.succeed('Cleaned posts shuffled.')
+                return True
 
-            self.spinner.start('Fetching Reddit posts...')
-            fetched_posts = await self.fetch_reddit_posts(SEARCH_QUERY, SUBREDDIT_LIMIT, POST_LIMIT)
-            self.spinner.succeed('Reddit posts fetched.')
+            with metrics.stage('fetch'):
+                self.spinner.start('Fetching Reddit posts...')
+                if PIPELINE_MODE == 'deep':
+                    fetched_posts, coverage = await self.deep_crawl(search_query, subreddit_limit, post_limit)
+                    self.save_coverage_report(coverage, CRAWL_COVERAGE_PATH)
+                else:
+                    fetched_posts = await self.fetch_post_records(search_query, subreddit_limit, post_limit)
+                self.spinner.succeed('Reddit posts fetched.')
 
-            self.spinner.start('Saving posts to CSV...')
-            self.save_posts_to_csv(fetched_posts, RAW_CSV_PATH)
-            self.spinner.succeed('Posts saved to CSV.')
+            with metrics.stage('save'):
+                self.spinner.start(f'Saving posts to {OUTPUT_FORMAT}...')
+                self.save_posts(fetched_posts.to_frame(), RAW_OUTPUT_PATH)
+                self.index_posts(fetched_posts.iter_records())
+                self.spinner.succeed(f'Posts saved to {OUTPUT_FORMAT}.')
 
-            self.spinner.start('Cleaning DataFrame...')
-            self.clean_dataframe(RAW_CSV_PATH, CLEANED_CSV_PATH)
-            self.spinner.succeed('DataFrame cleaned.')
+            with metrics.stage('clean'):
+                self.spinner.start('Cleaning DataFrame...')
+                self.clean_dataframe(RAW_OUTPUT_PATH, CLEANED_OUTPUT_PATH)
+                self.spinner.succeed('DataFrame cleaned.')
 
-            self.spinner.start('Shuffling DataFrame...')
-            self.shuffle_and_save_dataframe(CLEANED_CSV_PATH, SHUFFLED_CSV_PATH)
-            self.spinner.succeed('DataFrame shuffled.')
+            self.run_dedupe(metrics)
 
+            with metrics.stage('shuffle'):
+                self.spinner.start('Shuffling DataFrame...')
+                self.shuffle_and_save_dataframe(CLEANED_OUTPUT_PATH, SHUFFLED_OUTPUT_PATH)
+                self.spinner.succeed('DataFrame shuffled.')
+            return True
         except Exception as error:
             self.spinner.fail(f"An error occurred: {error}")
             logger.exception("Exception occurred")
+            return False
         finally:
             self.spinner.stop()
+            logger.info(f"Rate limit stats: {self.scheduler.stats()}")
+            if self.credential_pool is not None:
+                logger.info(f"Credential stats: {self.credential_pool.stats()}")
+            if self.owns_credential_pool and self.credential_pool is not None:
+                await self.credential_pool.close()
+            logger.info(f"Run summary: {metrics.summary()}")
             logger.info("Process completed.")
 
 
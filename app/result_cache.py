@@ -0,0 +1,195 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+from app.config import Config
+
+
+class ResultCache:
+    """TTL and LRU bounded cache for scrape results, with single-flight fetching.
+
+    Entries live in memory up to ``max_entries`` and are evicted least recently used first. When
+    ``disk_dir`` is set, entries are also written there and survive eviction and restarts until they
+    expire. Concurrent :meth:`get_or_fetch` calls for the same key share one upstream fetch, including
+    calls made from different threads and event loops.
+    """
+
+    def __init__(self, ttl=Config.CACHE_TTL_SECONDS, max_entries=Config.CACHE_MAX_ENTRIES,
+                 disk_dir=Config.CACHE_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query, subreddit_limit, post_limit, sort=Config.POSTS_SORT, time_filter=Config.POSTS_TIME_FILTER):
+        return query, subreddit_limit, post_limit, sort, time_filter
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.pkl')
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+            return None
+        if expires_at <= time.time():
+            self.expirations += 1
+            os.remove(path)
+            return None
+        return expires_at, value
+
+    def _write_disk(self, key, expires_at, value):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((expires_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache file {path}: {e}")
+
+    def _store(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key):
+        """Return ``(True, value)`` for a live entry, checking memory then disk. Call with the lock held."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            del self._entries[key]
+            self.expirations += 1
+        if self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._store(key, *entry)
+                self.disk_hits += 1
+                return True, entry[1]
+        return False, None
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+        return value if found else default
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires_at, value)
+        if self.disk_dir:
+            self._write_disk(key, expires_at, value)
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for ``key``, or await ``fetch()`` once for all concurrent callers.
+
+        A cancelled caller that started the fetch leaves it running for the others, but only returns once it has
+        finished, since ``fetch`` may use resources the caller holds, such as a leased client."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        # The fetch runs as its own task so that a cancelled leader does not cancel it for the followers.
+        task = asyncio.ensure_future(fetch())
+        try:
+            value = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            task.add_done_callback(lambda done: self._finish(key, future, done))
+            await asyncio.wait({task})
+            raise
+        except Exception as e:
+            self._fail(key, future, e)
+            raise
+        self.set(key, value)
+        self._resolve(key, future, value)
+        return value
+
+    def _finish(self, key, future, task):
+        if task.cancelled():
+            self._fail(key, future, concurrent.futures.CancelledError())
+        elif task.exception() is not None:
+            self._fail(key, future, task.exception())
+        else:
+            self.set(key, task.result())
+            self._resolve(key, future, task.result())
+
+    def _resolve(self, key, future, value):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+    def _fail(self, key, future, error):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(error)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the result cache shared by the FastAPI app, the Streamlit app and the CLI."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.reddit_scraper import POST_COLUMNS
+
+SORT_COLUMNS = ('score', 'num_comments', 'created_at', 'subreddit', 'title')
+
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+
+class ResultTable:
+    """Scrape results prepared for filtered, sorted and paginated views.
+
+    The lowercased search text and the row order of every sort are computed once and reused, so a view only
+    costs a boolean mask and a slice however many rows there are. Only the requested page is materialized.
+    """
+
+    def __init__(self, posts):
+        frame = posts if isinstance(posts, pd.DataFrame) else pd.DataFrame(posts, columns=POST_COLUMNS)
+        self.frame = frame.reset_index(drop=True)
+        self._search_text = None
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def subreddits(self):
+        return sorted(self.frame['subreddit'].dropna().unique())
+
+    def _order(self, sort_by, ascending):
+        key = (sort_by, ascending)
+        if key not in self._orders:
+            self._orders[key] = self.frame.sort_values(sort_by, ascending=ascending, kind='stable',
+                                                       na_position='last').index.to_numpy()
+        return self._orders[key]
+
+    def _mask(self, text, subreddits, min_score):
+        mask = np.ones(len(self.frame), dtype=bool)
+        if text:
+            if self._search_text is None:
+                titles, contents = self.frame['title'].fillna(''), self.frame['content'].fillna('')
+                self._search_text = (titles + '\n' + contents).str.lower()
+            mask &= self._search_text.str.contains(text.lower(), regex=False).to_numpy()
+        if subreddits:
+            mask &= self.frame['subreddit'].isin(subreddits).to_numpy()
+        if min_score is not None:
+            mask &= (self.frame['score'] >= min_score).to_numpy()
+        return mask
+
+    def view(self, text=None, subreddits=None, min_score=None, sort_by=None, ascending=False, page=1, page_size=50):
+        """Return the rows of ``page`` (1-based) among the rows matching the filters, and the number of matches.
+
+        ``text`` matches title or content case-insensitively; ``subreddits`` keeps only the listed ones.
+        """
+        if sort_by is not None and sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort_by!r}; expected one of {', '.join(SORT_COLUMNS)}")
+        mask = self._mask(text, subreddits, min_score)
+        if sort_by is None:
+            positions = np.flatnonzero(mask)
+        else:
+            order = self._order(sort_by, ascending)
+            positions = order[mask[order]]
+        start = (max(page, 1) - 1) * page_size
+        return self.frame.take(positions[start:start + page_size]), len(positions)
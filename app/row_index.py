@@ -0,0 +1,142 @@
+import mmap
+import os
+
+import numpy as np
+from loguru import logger
+
+from app.config import Config
+from app.output_formats import detect_format
+
+QUOTE = ord('"')
+NEWLINE = ord('\n')
+SCAN_BLOCK_BYTES = 64 * 1024 * 1024
+WRITE_BUFFER_BYTES = 1024 * 1024
+ROWS_PER_BATCH = 100_000  # Row offsets converted to Python ints at a time while copying rows
+
+
+def index_path(csv_path):
+    return f'{csv_path}.offsets.npz'
+
+
+def scan_row_offsets(csv_path, block_size=SCAN_BLOCK_BYTES):
+    """Find the byte offset of every row of a CSV file in one sequential scan.
+
+    Returns ``offsets`` with ``offsets[0]`` the end of the header and row ``i`` spanning
+    ``offsets[i]:offsets[i + 1]``. A newline ends a row only outside quotes, so quoted fields may contain
+    newlines; doubled quotes inside quoted fields keep the quote count even, as the CSV format requires.
+    """
+    size = os.path.getsize(csv_path)
+    boundaries = []
+    quotes_before = 0
+    with open(csv_path, 'rb') as f:
+        for start in range(0, size, block_size):
+            block = np.frombuffer(f.read(block_size), dtype=np.uint8)
+            quote_positions = np.flatnonzero(block == QUOTE)
+            newline_positions = np.flatnonzero(block == NEWLINE)
+            parity = (quotes_before + np.searchsorted(quote_positions, newline_positions)) % 2
+            boundaries.append(newline_positions[parity == 0] + start + 1)
+            quotes_before += len(quote_positions)
+    offsets = np.concatenate(boundaries) if boundaries else np.empty(0, dtype=np.int64)
+    if not len(offsets) or offsets[-1] != size:
+        offsets = np.append(offsets, size)  # The header or last row does not end with a newline
+    return offsets.astype(np.int64)
+
+
+class RowIndex:
+    """Byte offsets of the rows of a CSV file, for reordering and selecting rows without parsing them.
+
+    The offsets are saved next to the file (see :func:`index_path`) together with the file's size and
+    modification time, and rebuilt when those no longer match. Rows are copied as raw bytes from a
+    memory map of the file, so the output contains exactly the input's rows.
+    """
+
+    def __init__(self, csv_path, offsets):
+        self.csv_path = csv_path
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def load(cls, csv_path, persist=True):
+        """Load the saved offsets of ``csv_path``, scanning the file if they are missing or stale."""
+        if detect_format(csv_path) != 'csv':
+            raise ValueError(f"Row indexes are only built for CSV files, not {csv_path}")
+        stat = os.stat(csv_path)
+        path = index_path(csv_path)
+        try:
+            with np.load(path) as saved:
+                if int(saved['size']) == stat.st_size and int(saved['mtime_ns']) == stat.st_mtime_ns:
+                    return cls(csv_path, saved['offsets'])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable row index {path}: {e}")
+        offsets = scan_row_offsets(csv_path)
+        if persist:
+            tmp_path = f'{path}.tmp.npz'
+            np.savez(tmp_path, offsets=offsets, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            os.replace(tmp_path, path)
+            logger.info(f"Indexed {len(offsets) - 1} rows of {csv_path} in {path}.")
+        return cls(csv_path, offsets)
+
+    def write_rows(self, rows, output_path):
+        """Write the header and then the rows at positions ``rows`` (an integer array), in that order."""
+        with open(self.csv_path, 'rb') as f, open(output_path, 'wb', buffering=WRITE_BUFFER_BYTES) as out:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = memoryview(mapped)
+                try:
+                    out.write(data[:self.offsets[0]])
+                    # A last row without a newline gets one, so that other rows can follow it
+                    unterminated = size if mapped[size - 1] != NEWLINE else None
+                    for first in range(0, len(rows), ROWS_PER_BATCH):
+                        batch = rows[first:first + ROWS_PER_BATCH]
+                        for start, end in zip(self.offsets[batch].tolist(), self.offsets[batch + 1].tolist()):
+                            out.write(data[start:end])
+                            if end == unterminated:
+                                out.write(b'\n')
+                finally:
+                    data.release()
+
+
+def shuffle_csv_rows(csv_path, shuffled_path, seed=Config.SHUFFLE_SEED):
+    """Write the rows of a CSV file in a random order, which is the same for the same ``seed``."""
+    index = RowIndex.load(csv_path)
+    index.write_rows(np.random.default_rng(seed).permutation(len(index)), shuffled_path)
+    return len(index)
+
+
+def sample_csv_rows(csv_path, sample_path, size=None, fraction=None, seed=Config.SHUFFLE_SEED):
+    """Write a random sample of ``size`` rows (or ``fraction`` of the rows) without replacement, in file order."""
+    index = RowIndex.load(csv_path)
+    if size is None:
+        size = round(len(index) * fraction)
+    size = min(size, len(index))
+    rows = np.sort(np.random.default_rng(seed).choice(len(index), size=size, replace=False))
+    index.write_rows(rows, sample_path)
+    return size
+
+
+def split_csv_rows(csv_path, outputs, seed=Config.SHUFFLE_SEED):
+    """Split the rows of a CSV file at random into files, each given as ``{path: fraction}``.
+
+    Every row goes to exactly one file, the last file taking the rounding remainder; rows are in random
+    order within each file. Returns the number of rows written to each path.
+    """
+    fractions = np.array(list(outputs.values()), dtype=float)
+    if (fractions < 0).any() or not np.isclose(fractions.sum(), 1.0):
+        raise ValueError(f"Split fractions must be non-negative and sum to 1, got {list(fractions)}")
+    index = RowIndex.load(csv_path)
+    permutation = np.random.default_rng(seed).permutation(len(index))
+    bounds = np.round(np.cumsum(fractions) * len(index)).astype(np.int64)
+    bounds[-1] = len(index)
+    counts = {}
+    start = 0
+    for path, end in zip(outputs, bounds):
+        index.write_rows(permutation[start:end], path)
+        counts[path] = int(end - start)
+        start = end
+    return counts
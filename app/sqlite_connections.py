@@ -0,0 +1,31 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnections:
+    """SQLite connections to the database at ``path``, one per thread, since a connection cannot be shared
+    between threads.
+
+    The database runs in WAL mode so readers are not blocked by a writer. The directory of ``path`` is created
+    and ``schema`` is run when the connections are set up.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if schema:
+            with self.get() as conn:
+                conn.executescript(schema)
+
+    def get(self):
+        """Return the connection of the calling thread, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
@@ -1,19 +1,84 @@
+import os
+import sys
+
 import streamlit as st
-from reddit_scraper import RedditScraper, CLIENT_ID, CLIENT_SECRET, USER_AGENT, SUBREDDIT_LIMIT, POST_LIMIT
-import asyncio
+
+# `streamlit run app/streamlit_app.py` puts app/ rather than the project root on the import path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.background_loop import BackgroundLoop  # noqa: E402
+from app.client_pool import RedditClientPool  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.credential_pool import create_credential_pool  # noqa: E402
+from app.reddit_scraper import (  # noqa: E402
+    RedditScraper, CLIENT_ID, CLIENT_SECRET, USER_AGENT, SUBREDDIT_LIMIT, POST_LIMIT)
+from app.result_table import SORT_COLUMNS, ResultTable, page_count  # noqa: E402
+
+
+@st.cache_resource
+def get_client_pool():
+    """The event loop and Reddit clients of this server process, shared by every session and rerun."""
+    return (BackgroundLoop('streamlit-reddit'), RedditClientPool(CLIENT_ID, CLIENT_SECRET, USER_AGENT),
+            create_credential_pool())
+
+
+@st.cache_resource(ttl=Config.CACHE_TTL_SECONDS, max_entries=Config.CACHE_MAX_ENTRIES, show_spinner=False)
+def load_results(query):
+    """Fetch the results of ``query`` once per TTL for all sessions. The table is shared, not copied per rerun."""
+    return ResultTable(StreamlitRedditScraper.fetch_posts(query))
 
 
 class StreamlitRedditScraper:
     @staticmethod
     def fetch_posts(query):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reddit_scraper = RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
-        reddit_scraper.initialize_reddit()
-        return loop.run_until_complete(reddit_scraper.fetch_reddit_posts(query, SUBREDDIT_LIMIT, POST_LIMIT))
+        loop, pool, credential_pool = get_client_pool()
+
+        async def fetch():
+            async with pool.lease() as reddit:
+                reddit_scraper = RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT, reddit=reddit,
+                                               credential_pool=credential_pool)
+                return await reddit_scraper.fetch_cached_posts(query, SUBREDDIT_LIMIT, POST_LIMIT)
+
+        return loop.run(fetch(), timeout=Config.UI_FETCH_TIMEOUT)
+
+    @staticmethod
+    def render_results(query):
+        try:
+            with st.spinner('Fetching posts... :hourglass_flowing_sand:'):
+                table = load_results(query)
+        except Exception as e:
+            st.error(f'Failed to fetch posts: {e} :x:')
+            return
+        if not len(table):
+            st.error('No posts found for the provided query. :x:')
+            return
+        st.success(f'Found {len(table)} posts for the query "{query}"! :tada:')
+
+        text_col, subreddit_col = st.columns(2)
+        text = text_col.text_input('Filter by title or content:')
+        subreddits = subreddit_col.multiselect('Subreddits:', table.subreddits())
+        sort_col, order_col, score_col, page_col = st.columns(4)
+        sort_by = sort_col.selectbox('Sort by:', SORT_COLUMNS)
+        ascending = order_col.radio('Order:', ['Descending', 'Ascending'], horizontal=True) == 'Ascending'
+        min_score = score_col.number_input('Minimum score:', value=None, step=1)
+        page = page_col.number_input('Page:', min_value=1, value=1, step=1)
+
+        filters = dict(text=text, subreddits=subreddits, min_score=min_score, sort_by=sort_by, ascending=ascending,
+                       page_size=Config.UI_PAGE_SIZE)
+        rows, total = table.view(page=page, **filters)
+        pages = page_count(total, Config.UI_PAGE_SIZE)
+        if page > pages:
+            page = pages
+            rows, total = table.view(page=page, **filters)
+
+        st.caption(f'{total} matching posts, page {page} of {pages}')
+        st.dataframe(rows, hide_index=True, use_container_width=True, column_config={
+            'url': st.column_config.LinkColumn('URL'),
+            'content': st.column_config.TextColumn('Content', width='large'),
+        })
 
     def run(self):
-        st.set_page_config(page_title="Reddit Scraper", page_icon=":mag:")
+        st.set_page_config(page_title="Reddit Scraper", page_icon=":mag:", layout='wide')
 
         st.title(':mag: Reddit Scraper')
 
@@ -23,23 +88,11 @@ class StreamlitRedditScraper:
         query = st.text_input('Enter a search query:', 'fastapi')
 
         if st.button('Fetch posts'):
-            with st.spinner('Fetching posts... :hourglass_flowing_sand:'):
-                posts = self.fetch_posts(query)
-                if posts:
-                    st.success(f'Found {len(posts)} posts for the query "{query}"! :tada:')
-                    for post in posts:
-                        st.markdown(f"""
-                            **Subreddit:** {post['subreddit']}
-                            **Title:** {post['title']}
-                            **Score:** {post['score']} :star:
-                            **Comments:** {post['num_comments']} :speech_balloon:
-                            **URL:** [Link]({post['url']})
-                            **Created At:** {post['created_at']}
-                            **Content:** {post['content']}
-                            ---
-                            """)
-                else:
-                    st.error('No posts found for the provided query. :x:')
+            st.session_state['query'] = query
+
+        # Kept in the session so the results stay on screen while they are filtered, sorted and paged
+        if 'query' in st.session_state:
+            self.render_results(st.session_state['query'])
         else:
             st.info('Enter a query and click the "Fetch posts" button to get results. :information_source:')
 
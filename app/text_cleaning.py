@@ -0,0 +1,78 @@
+import re
+import string
+
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+from app.config import Config
+
+TEXT_COLUMNS = Config.TEXT_COLUMNS
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+# Removing string.punctuation and then NON_WORD_PATTERN in one regex pass: '_' is the only punctuation
+# character that \w matches. str.translate is slow on non-ASCII strings, so those take this route.
+PUNCTUATION_OR_NON_WORD_PATTERN = re.compile(r'[^\w\s]|_')
+# For ASCII text both steps reduce to deleting a fixed set of characters, which str.translate does
+# faster than the regex engine.
+ASCII_DELETE_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if c in string.punctuation or NON_WORD_PATTERN.match(c)))
+
+
+def clean_text(text):
+    """Convert text to lowercase, remove punctuation and emojis."""
+    if isinstance(text, str):
+        text = text.lower()
+        text = text.translate(PUNCTUATION_TABLE)
+        text = NON_WORD_PATTERN.sub('', text)
+    return text
+
+
+def clean_text_column(series):
+    """Apply :func:`clean_text` to a whole column with pandas string operations.
+
+    Non-string values are left unchanged, like :func:`clean_text` does. The column is processed as
+    Python objects so lowercasing and ``\\w`` follow Python's Unicode rules exactly.
+    """
+    if not (is_object_dtype(series) or is_string_dtype(series)):
+        return series
+    values = series.astype(object)
+    is_ascii = values.str.isascii()
+    is_str = is_ascii.notna()
+    ascii_rows = is_str & is_ascii.eq(True)
+    other_rows = is_str & ~ascii_rows
+
+    cleaned = values.copy()
+    lowered = values[is_str].str.lower()
+    cleaned[ascii_rows] = lowered[ascii_rows[is_str]].str.translate(ASCII_DELETE_TABLE)
+    cleaned[other_rows] = lowered[other_rows[is_str]].str.replace(PUNCTUATION_OR_NON_WORD_PATTERN, '', regex=True)
+    return cleaned
+
+
+def clean_frame(df, text_columns=TEXT_COLUMNS):
+    """Lowercase the column names and clean the text columns of a posts DataFrame in place."""
+    df.columns = [col.lower() for col in df.columns]
+    for col in text_columns:
+        if col in df.columns:
+            df[col] = clean_text_column(df[col])
+    return df
+
+
+def clean_table(table, text_columns=TEXT_COLUMNS):
+    """Arrow counterpart of :func:`clean_frame`. Only the text columns are converted to Python strings;
+    dictionary-encoded columns are cleaned once per distinct value."""
+    import pyarrow as pa
+
+    table = table.rename_columns([name.lower() for name in table.column_names])
+    for col in text_columns:
+        if col not in table.column_names:
+            continue
+        i = table.column_names.index(col)
+        field = table.schema.field(i)
+        column = table.column(i).combine_chunks()
+        if pa.types.is_dictionary(field.type):
+            dictionary = pa.array(clean_text_column(column.dictionary.to_pandas()), type=field.type.value_type)
+            cleaned = dictionary.take(column.indices).dictionary_encode().cast(field.type)
+        else:
+            cleaned = pa.array(clean_text_column(column.to_pandas()), type=field.type, from_pandas=True)
+        table = table.set_column(i, field, cleaned)
+    return table
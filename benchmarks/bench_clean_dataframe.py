@@ -0,0 +1,78 @@
+"""Compare the column-aware cleaning engine with the previous per-cell ``map(clean_text)`` approach.
+
+Usage: python -m benchmarks.bench_clean_dataframe --rows 1000000
+"""
+import argparse
+import re
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.text_cleaning import TEXT_COLUMNS, clean_frame
+
+WORDS = ['Hello,', 'World!', 'FastAPI', 'is', 'great...', 'Python', '#python', '(test)', 'data-science', "I'm",
+         '100%', 'under_score', 'Café', '🚀', 'déjà-vu?']
+
+
+def legacy_clean_text(text):
+    if isinstance(text, str):
+        text = text.lower()
+        text = text.translate(str.maketrans('', '', string.punctuation))
+        text = re.sub(r'[^\w\s]', '', text)
+    return text
+
+
+def legacy_clean_frame(df):
+    df.columns = [col.lower() for col in df.columns]
+    for col in df.columns:
+        df[col] = df[col].map(legacy_clean_text)
+    return df
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+
+    def sentences(length):
+        return [' '.join(chunk) for chunk in words[rng.integers(0, len(words), size=(rows, length))]]
+
+    return pd.DataFrame({
+        'subreddit': rng.choice(['Python', 'FastAPI', 'DataScience', 'learnpython'], size=rows),
+        'title': sentences(8),
+        'score': rng.integers(0, 10_000, size=rows),
+        'id': [f'{i:x}' for i in range(rows)],
+        'url': [f'https://www.reddit.com/r/Python/comments/{i:x}/' for i in range(rows)],
+        'num_comments': rng.integers(0, 1_000, size=rows),
+        'created_at': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 10 ** 7, size=rows), unit='s'),
+        'content': sentences(20),
+    })
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    legacy_seconds, legacy = timed(legacy_clean_frame, df)
+    engine_seconds, cleaned = timed(clean_frame, df)
+
+    for col in TEXT_COLUMNS:
+        assert legacy[col].tolist() == cleaned[col].tolist(), f"column {col} differs"
+
+    print(f"rows: {args.rows}")
+    print(f"map(clean_text) over all columns: {legacy_seconds:.2f}s")
+    print(f"clean_frame over text columns:    {engine_seconds:.2f}s")
+    print(f"speedup: {legacy_seconds / engine_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Local stand-in for the Reddit API, for offline benchmarks.
+
+Serves the endpoints the scraper calls: the OAuth token, subreddit search and subreddit listings. The
+listings are either synthetic or recorded: a JSON file with ``subreddits`` (a list of subreddit objects)
+and ``posts`` (subreddit name -> list of submission objects, as in the ``data`` of Reddit's ``t3`` things).
+Latency, page size, the rate-limit budget and random HTTP 429 responses are configurable.
+
+Point a client at it with ``REDDIT_OAUTH_URL=<url> REDDIT_URL=<url>`` (see ``Config``), or run it on its own:
+python -m benchmarks.fake_reddit --port 8765
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+
+from aiohttp import web
+
+LISTINGS = ('hot', 'new', 'top', 'rising', 'controversial')
+WORDS = ['fastapi', 'python', 'async', 'pandas', 'scraper', 'reddit', 'benchmark', 'latency', 'Hello,', 'World!',
+         'déjà-vu?', '🚀']
+
+
+class SyntheticListings:
+    """Deterministic subreddits and posts: every query matches ``subreddits`` subreddits with
+    ``posts_per_subreddit`` posts each."""
+
+    def __init__(self, subreddits=10, posts_per_subreddit=100, seed=0):
+        self.subreddits = subreddits
+        self.posts_per_subreddit = posts_per_subreddit
+        self.seed = seed
+
+    def search(self, query):
+        return [{'display_name': f'{query or "all"}_{i}', 'name': f't5_{i:x}', 'subscribers': 1000 * (i + 1)}
+                for i in range(self.subreddits)]
+
+    def posts(self, subreddit):
+        rng = random.Random(f'{self.seed}:{subreddit}')
+        base = 1_700_000_000
+        posts = []
+        for i in range(self.posts_per_subreddit):
+            post_id = f'{zlib.crc32(f"{self.seed}:{subreddit}".encode()):08x}{i:05x}'
+            posts.append({
+                'id': post_id,
+                'name': f't3_{post_id}',
+                'subreddit': subreddit,
+                'title': ' '.join(rng.choices(WORDS, k=8)),
+                'selftext': ' '.join(rng.choices(WORDS, k=40)),
+                'score': rng.randint(0, 10_000),
+                'num_comments': rng.randint(0, 500),
+                'created_utc': float(base - i * 600),
+                'url': f'https://www.reddit.com/r/{subreddit}/comments/{post_id}/',
+                'author': f'user{rng.randint(0, 999)}',
+            })
+        return posts
+
+
+class RecordedListings:
+    """Listings loaded from a JSON file; every query returns the recorded subreddits."""
+
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.recorded_subreddits = data['subreddits']
+        self.recorded_posts = data['posts']
+
+    def search(self, query):
+        return self.recorded_subreddits
+
+    def posts(self, subreddit):
+        return self.recorded_posts.get(subreddit, [])
+
+
+class FakeReddit:
+    """aiohttp application serving the fake Reddit API. Use :meth:`start`/:meth:`stop` or a ``with`` block
+    to run it on a background thread."""
+
+    def __init__(self, listings=None, latency=0.0, jitter=0.0, page_size=100, throttle_rate=0.0,
+                 retry_after=0.1, budget=None, window=600, seed=0):
+        self.listings = listings or SyntheticListings()
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.budget = budget
+        self.window = window
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self._posts = {}
+        self._window_start = time.monotonic()
+        self._used = 0
+        self._thread = None
+        self._loop = None
+        self._runner = None
+        self.url = None
+
+        self.app = web.Application()
+        self.app.router.add_post('/api/v1/access_token', self.access_token)
+        for slash in ('', '/'):  # asyncpraw requests some paths with a trailing slash
+            self.app.router.add_get('/subreddits/search' + slash, self.search)
+            self.app.router.add_get('/r/{subreddit}/{listing}' + slash, self.listing)
+
+    def _posts_of(self, subreddit, listing):
+        key = (subreddit, listing)
+        if key not in self._posts:
+            posts = self.listings.posts(subreddit)
+            if listing == 'top':
+                posts = sorted(posts, key=lambda post: post['score'], reverse=True)
+            elif listing == 'new':
+                posts = sorted(posts, key=lambda post: post['created_utc'], reverse=True)
+            self._posts[key] = posts
+        return self._posts[key]
+
+    def _rate_limit_headers(self):
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._used = 0
+        self._used += 1
+        reset = max(1, int(self.window - (now - self._window_start)))
+        budget = self.budget if self.budget is not None else 10 ** 6
+        return {'x-ratelimit-used': str(self._used), 'x-ratelimit-remaining': str(max(0, budget - self._used)),
+                'x-ratelimit-reset': str(reset)}
+
+    async def _respond(self, payload):
+        self.requests += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        headers = self._rate_limit_headers()
+        over_budget = self.budget is not None and self._used > self.budget
+        if over_budget or (self.throttle_rate and self.rng.random() < self.throttle_rate):
+            self.throttled += 1
+            headers['retry-after'] = str(self.retry_after)
+            return web.json_response({'message': 'Too Many Requests', 'error': 429}, status=429, headers=headers)
+        return web.json_response(payload, headers=headers)
+
+    def _page(self, request, items, kind):
+        limit = min(int(request.query.get('limit', 25)), self.page_size)
+        after = request.query.get('after')
+        start = 0
+        if after:
+            names = [item['name'] for item in items]
+            start = names.index(after) + 1 if after in names else len(items)
+        page = items[start:start + limit]
+        next_after = page[-1]['name'] if page and start + limit < len(items) else None
+        return {'kind': 'Listing', 'data': {'after': next_after, 'before': None, 'dist': len(page),
+                                            'children': [{'kind': kind, 'data': item} for item in page]}}
+
+    async def access_token(self, request):
+        self.requests += 1
+        return web.json_response({'access_token': 'fake-token', 'token_type': 'bearer', 'expires_in': 86400,
+                                  'scope': '*'})
+
+    async def search(self, request):
+        subreddits = self.listings.search(request.query.get('q', ''))
+        return await self._respond(self._page(request, subreddits, 't5'))
+
+    async def listing(self, request):
+        listing = request.match_info['listing']
+        if listing not in LISTINGS:
+            raise web.HTTPNotFound()
+        posts = self._posts_of(request.match_info['subreddit'], listing)
+        return await self._respond(self._page(request, posts, 't3'))
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve on a background thread and return the base URL."""
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, host, port)
+            self._loop.run_until_complete(site.start())
+            bound_port = self._runner.addresses[0][1]
+            self.url = f'http://{host}:{bound_port}'
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name='fake-reddit', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--recorded', help='JSON file of recorded listings')
+    parser.add_argument('--subreddits', type=int, default=10)
+    parser.add_argument('--posts-per-subreddit', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every API response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency, up to this many seconds')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of responses that are 429s')
+    args = parser.parse_args()
+
+    listings = (RecordedListings(args.recorded) if args.recorded
+                else SyntheticListings(args.subreddits, args.posts_per_subreddit))
+    server = FakeReddit(listings, latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+                        throttle_rate=args.throttle_rate)
+    print(f"Fake Reddit API on {server.start(port=args.port)}, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""Offline benchmark suite: fetching against the fake Reddit API, the /scrape endpoint and the file pipeline.
+
+Every case runs in a fresh process, so its peak RSS is its own. Results are written as JSON; pass an earlier
+result file to --compare to print the change of every metric.
+
+Usage: python -m benchmarks.run --sizes 1000 10000 100000 --output results.json [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.fake_reddit import FakeReddit, SyntheticListings
+
+CASES = ('fetch', 'scrape_endpoint', 'save_csv', 'clean', 'shuffle')
+FILE_CASES = ('save_csv', 'clean', 'shuffle')
+SUBREDDITS = 10
+# Metrics shown by --compare; for the ones in HIGHER_IS_BETTER a larger value is better, for the rest smaller
+COMPARED_METRICS = ('seconds', 'posts_per_second', 'requests_per_second', 'rows_per_second', 'mb_per_second',
+                    'api_p50_ms', 'api_p99_ms', 'p50_ms', 'p99_ms', 'throttled_responses', 'errors', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('posts_per_second', 'requests_per_second', 'rows_per_second', 'mb_per_second')
+
+
+def _proc_status_mb(field):
+    with open('/proc/self/status', encoding='ascii') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def reset_peak_rss():
+    """Return the current RSS and restart peak tracking from it, where the platform allows."""
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return _proc_status_mb('VmRSS')
+    except OSError:
+        return None
+
+
+def peak_rss_mb():
+    # ru_maxrss survives the exec of a spawned process, so it can report the parent's peak; VmHWM does not
+    try:
+        return _proc_status_mb('VmHWM')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def percentiles_ms(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p99_ms': None}
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def unthrottled_scheduler():
+    """Pace requests only by the fake server's budget, so the benchmarks measure the scraper itself."""
+    from app.rate_limiter import configure_scheduler
+    return configure_scheduler(rate=10_000, burst=10_000)
+
+
+def bench_fetch(size, workdir):
+    """Fetch ``size`` posts from the fake API with :meth:`RedditScraper.fetch_reddit_posts`."""
+    import asyncpraw
+    from app.config import Config
+    from app.rate_limiter import ScheduledRequestor
+    from app.reddit_scraper import RedditScraper
+
+    latencies = []
+
+    class TimedRequestor(ScheduledRequestor):
+        @asynccontextmanager
+        async def request(self, *args, **kwargs):
+            start = time.perf_counter()
+            async with super().request(*args, **kwargs) as response:
+                latencies.append(time.perf_counter() - start)
+                yield response
+
+    scheduler = unthrottled_scheduler()
+
+    async def fetch():
+        reddit = asyncpraw.Reddit(client_id='bench', client_secret='bench', user_agent='bench',
+                                  oauth_url=Config.REDDIT_OAUTH_URL, reddit_url=Config.REDDIT_URL,
+                                  requestor_class=TimedRequestor, requestor_kwargs={'scheduler': scheduler})
+        scraper = RedditScraper('bench', 'bench', 'bench', reddit=reddit)
+        scraper.owns_reddit = True
+        start = time.perf_counter()
+        posts = await scraper.fetch_reddit_posts('bench', SUBREDDITS, size // SUBREDDITS)
+        return posts, time.perf_counter() - start
+
+    posts, seconds = asyncio.run(fetch())
+    return {'seconds': round(seconds, 4), 'posts': len(posts), 'posts_per_second': round(len(posts) / seconds, 1),
+            'api_calls': len(latencies), 'throttled_responses': scheduler.throttled_responses,
+            **{f'api_{name}': value for name, value in percentiles_ms(latencies).items()}}
+
+
+def bench_scrape_endpoint(size, workdir, requests=20, concurrency=8):
+    """Send ``requests`` distinct queries to /scrape, each answered with ``size`` posts."""
+    import httpx
+    import app.fast_api_scraper as fast_api_scraper
+    import app.reddit_scraper as reddit_scraper
+    from app.fast_api_scraper import app, client_pool
+    from app.result_cache import get_result_cache
+
+    reddit_scraper.INDEX_ENABLED = False
+    fast_api_scraper.SUBREDDIT_LIMIT = SUBREDDITS
+    fast_api_scraper.POST_LIMIT = max(1, size // SUBREDDITS)
+    unthrottled_scheduler()
+    get_result_cache().clear()
+    latencies = []
+    errors = 0
+
+    async def scrape_all():
+        nonlocal errors
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+            async def scrape(i):
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(f'/scrape/query{i}')
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code != 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(scrape(i) for i in range(requests)))
+            seconds = time.perf_counter() - start
+        await client_pool.close()
+        return seconds
+
+    seconds = asyncio.run(scrape_all())
+    return {'seconds': round(seconds, 4), 'requests': requests, 'concurrency': concurrency, 'errors': errors,
+            'requests_per_second': round(requests / seconds, 1), **percentiles_ms(latencies)}
+
+
+def file_metrics(rows, seconds, path):
+    mb = os.path.getsize(path) / 2 ** 20
+    return {'seconds': round(seconds, 4), 'rows': rows, 'rows_per_second': round(rows / seconds, 1),
+            'output_mb': round(mb, 2), 'mb_per_second': round(mb / seconds, 2)}
+
+
+def bench_save_csv(size, workdir):
+    """Write ``size`` posts to CSV with :meth:`RedditScraper.save_posts`."""
+    from app.output_formats import read_frame
+    from app.reddit_scraper import RedditScraper
+
+    df = read_frame(os.path.join(workdir, 'input.csv'))
+    path = os.path.join(workdir, f'saved-{size}.csv')
+    start = time.perf_counter()
+    RedditScraper.save_posts(df, path)
+    return file_metrics(size, time.perf_counter() - start, path)
+
+
+def bench_clean(size, workdir):
+    """Clean a CSV of ``size`` posts with :meth:`RedditScraper.clean_dataframe`."""
+    from app.reddit_scraper import RedditScraper
+
+    path = os.path.join(workdir, f'cleaned-{size}.csv')
+    scraper = RedditScraper('bench', 'bench', 'bench')  # Building the client is not part of the measured work
+    start = time.perf_counter()
+    scraper.clean_dataframe(os.path.join(workdir, 'input.csv'), path)
+    return file_metrics(size, time.perf_counter() - start, path)
+
+
+def bench_shuffle(size, workdir):
+    """Shuffle a CSV of ``size`` posts with :meth:`RedditScraper.shuffle_and_save_dataframe`."""
+    from app.reddit_scraper import RedditScraper
+
+    path = os.path.join(workdir, f'shuffled-{size}.csv')
+    start = time.perf_counter()
+    RedditScraper.shuffle_and_save_dataframe(os.path.join(workdir, 'input.csv'), path)
+    return file_metrics(size, time.perf_counter() - start, path)
+
+
+BENCHMARKS = {'fetch': bench_fetch, 'scrape_endpoint': bench_scrape_endpoint, 'save_csv': bench_save_csv,
+              'clean': bench_clean, 'shuffle': bench_shuffle}
+
+
+def run_case(case, size, workdir, options):
+    """Run one benchmark in the current (fresh) process."""
+    rss_before = reset_peak_rss()
+    metrics = BENCHMARKS[case](size, workdir, **options.get(case, {}))
+    peak_rss = peak_rss_mb()
+    return {'case': case, 'size': size, **metrics,
+            'rss_before_mb': round(rss_before, 1) if rss_before is not None else None,
+            'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None}
+
+
+def run_isolated(case, size, workdir, options):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, case, size, workdir, options).result()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results):
+    """Print the change of every metric against a baseline result file."""
+    previous = {(result['case'], result['size']): result for result in baseline['results']}
+    for result in results:
+        old = previous.get((result['case'], result['size']))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            value = result.get(metric)
+            if value is None or not old.get(metric):
+                continue
+            change = (value - old[metric]) / old[metric] * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            flag = '' if abs(change) < 5 else (' better' if better else ' WORSE')
+            print(f"{result['case']:>16} {result['size']:>9} {metric:<22} {old[metric]:>12} -> {value:>12} "
+                  f"({change:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='Posts fetched, posts per /scrape response, or rows in the file cases')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds added to every fake API response')
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of fake API responses that are 429s')
+    parser.add_argument('--scrape-requests', type=int, default=20, help='Requests sent to /scrape per size')
+    parser.add_argument('--scrape-concurrency', type=int, default=8)
+    parser.add_argument('--output', help='Write the results to this JSON file instead of stdout')
+    parser.add_argument('--compare', help='Earlier result file to compare with')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = os.path.abspath(args.output) if args.output else None
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='reddit-bench-') as workdir:
+        os.chdir(workdir)  # Keeps the data/ and logs/ directories the app creates out of the repository
+        try:
+            run_sizes(args, workdir, results)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'meta': {'commit': commit, 'timestamp': datetime.now(timezone.utc).isoformat(),
+                 'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                 'args': vars(args)},
+        'results': results,
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+def run_sizes(args, workdir, results):
+    options = {'scrape_endpoint': {'requests': args.scrape_requests, 'concurrency': args.scrape_concurrency}}
+    for size in args.sizes:
+        server = FakeReddit(SyntheticListings(SUBREDDITS, max(1, size // SUBREDDITS)), latency=args.latency,
+                            jitter=args.jitter, page_size=args.page_size, throttle_rate=args.throttle_rate)
+        url = server.start()
+        os.environ.update(REDDIT_OAUTH_URL=url, REDDIT_URL=url, CLIENT_ID='bench', CLIENT_SECRET='bench',
+                          USER_AGENT='bench')
+        try:
+            if any(case in FILE_CASES for case in args.cases):
+                from benchmarks.bench_clean_dataframe import make_frame
+                make_frame(size).to_csv(os.path.join(workdir, 'input.csv'), index=False)
+            for case in args.cases:
+                result = run_isolated(case, size, workdir, options)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
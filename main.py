@@ -1,25 +1,186 @@
-from halo import Halo
-from loguru import logger
+"""Reddit Scraper command line.
+
+Every subcommand imports the modules it needs when it runs, so ``--help`` and light subcommands start fast.
+Without a subcommand, the interactive menu opens when running in a terminal.
+"""
+import argparse
+import os
 import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_logging_configured = False
+
+
+def setup_logging():
+    """Add the app.log sink once per process, however often :func:`main` runs."""
+    global _logging_configured
+    from loguru import logger
+    from app.config import Config
+
+    if not _logging_configured:
+        Config.ensure_directories()
+        logger.add(os.path.join(Config.LOG_DIR, 'app.log'), rotation="10 MB", level="INFO", backtrace=True,
+                   diagnose=True)
+        _logging_configured = True
+    return logger
+
+
+def print_posts(posts):
+    for post in posts:
+        print(f"Subreddit: {post['subreddit']}")
+        print(f"Title: {post['title']}")
+        print(f"Score: {post['score']}")
+        print(f"URL: {post['url']}")
+        print(f"Number of comments: {post['num_comments']}")
+        print(f"Created at: {post['created_at']}")
+        print(f"Content: {post['content']}")
+        print("\n" + "-" * 50 + "\n")
+
+
+def command_scrape(args):
+    """Run the scrape pipeline configured in Config, or print the posts of a query with --print."""
+    import asyncio
+    from app.reddit_scraper import (CLIENT_ID, CLIENT_SECRET, USER_AGENT, SEARCH_QUERY, SUBREDDIT_LIMIT, POST_LIMIT,
+                                    RedditScraper)
+
+    if args.print:
+        from app.fast_api_scraper import FastApiRedditScraper
+
+        scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
+        subreddit_limit = SUBREDDIT_LIMIT if args.subreddit_limit is None else args.subreddit_limit
+        post_limit = POST_LIMIT if args.post_limit is None else args.post_limit
+        posts = asyncio.run(scraper.fetch_posts(args.query or SEARCH_QUERY, subreddit_limit, post_limit))
+        if not posts:
+            print("No posts found for the provided query.")
+            return 1
+        print_posts(posts)
+        return 0
+
+    scraper = RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
+    succeeded = asyncio.run(scraper.run(args.query, args.subreddit_limit, args.post_limit))
+    return 0 if succeeded else 1
+
+
+def command_refresh(args):
+    import asyncio
+    from app.reddit_scraper import (CLIENT_ID, CLIENT_SECRET, USER_AGENT, RAW_OUTPUT_PATH, CLEANED_OUTPUT_PATH,
+                                    RedditScraper)
+
+    scraper = RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
+    scraper.initialize_reddit()
+    refreshed = asyncio.run(scraper.refresh_posts(args.files or [RAW_OUTPUT_PATH, CLEANED_OUTPUT_PATH]))
+    print(f"Refreshed the score and comment count of {refreshed} posts.")
+    return 0
+
+
+def command_clean(args):
+    from app.reddit_scraper import CLIENT_ID, CLIENT_SECRET, USER_AGENT, RedditScraper
+
+    RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT).clean_dataframe(args.input, args.output)
+    return 0
+
+
+def command_dedupe(args):
+    from app.reddit_scraper import RedditScraper
+
+    duplicates = RedditScraper.dedupe_dataframe(args.input, args.output, args.mode)
+    print(f"Found {duplicates} near-duplicate posts.")
+    return 0
+
+
+def seed_option(args):
+    """The --seed option as keyword arguments, so that Config.SHUFFLE_SEED applies when it is not given."""
+    return {} if args.seed is None else {'seed': args.seed}
+
+
+def command_shuffle(args):
+    if args.out_of_core:
+        from app.external_shuffle import shuffle_out_of_core
+
+        shuffle_out_of_core(args.input, args.output, **seed_option(args))
+    else:
+        from app.reddit_scraper import RedditScraper
+
+        RedditScraper.shuffle_and_save_dataframe(args.input, args.output, **seed_option(args))
+    return 0
+
+
+def command_sample(args):
+    from app.row_index import sample_csv_rows
+
+    size = sample_csv_rows(args.input, args.output, size=args.size, fraction=args.fraction, **seed_option(args))
+    print(f"Sampled {size} rows into {args.output}.")
+    return 0
 
-from app.fast_api_scraper import FastApiRedditScraper
-from app.reddit_scraper import CLIENT_ID, CLIENT_SECRET, USER_AGENT, SUBREDDIT_LIMIT, POST_LIMIT, RedditScraper
 
-logger.add("logs/app.log", rotation="10 MB", level="INFO", backtrace=True, diagnose=True)
-spinner = Halo(text='Processing', spinner='dots')
+def command_split(args):
+    from app.row_index import split_csv_rows
 
+    outputs = {}
+    for spec in args.outputs:
+        path, _, fraction = spec.rpartition(':')
+        try:
+            outputs[path] = float(fraction)
+        except ValueError:
+            print(f"Invalid split {spec!r}; expected PATH:FRACTION.")
+            return 2
+    for path, count in split_csv_rows(args.input, outputs, **seed_option(args)).items():
+        print(f"{count} rows saved to {path}.")
+    return 0
 
-def main():
+
+def command_serve(args):
+    import uvicorn
+
+    uvicorn.run("app.fast_api_scraper:app", host=args.host, port=args.port)
+    return 0
+
+
+def command_ui(args):
+    try:
+        subprocess.run(["streamlit", "run", os.path.join(PROJECT_DIR, "app", "streamlit_app.py")], check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Streamlit app failed to start: {str(e)}")
+        return 1
+    return 0
+
+
+def command_batch(args):
+    from app.batch_scraper import BATCH_OUTPUT_PATH, run_batch
+
+    output = args.output or BATCH_OUTPUT_PATH
+    kwargs = {'workers': args.workers} if args.workers else {}
+    summary = run_batch(args.query_file, output, **kwargs)
+    print(f"Batch done: {summary['rows']} unique posts saved to {output}.")
+    if summary['failed']:
+        print(f"{len(summary['failed'])} queries failed; run the batch again to retry them.")
+        return 1
+    return 0
+
+
+def command_menu(args):
+    """The interactive menu of earlier versions."""
+    from halo import Halo
+    from app.reddit_scraper import CLIENT_ID, CLIENT_SECRET, USER_AGENT, SUBREDDIT_LIMIT, POST_LIMIT
+
+    from loguru import logger
+
+    spinner = Halo(text='Processing', spinner='dots')
     while True:
         print("\nMenu:")
         print("1. Run FastApiRedditScraper")
         print("2. Run RedditScraper")
         print("3. Run Streamlit app")
-        print("4. Exit")
+        print("4. Batch scrape a query file")
+        print("5. Exit")
 
         choice = input("Enter your choice: ")
 
         if choice == '1':
+            import asyncio
+            from app.fast_api_scraper import FastApiRedditScraper
+
             # Initialize the scraper
             scraper = FastApiRedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
 
@@ -29,7 +190,7 @@ def main():
             try:
                 spinner.start('Fetching posts...')
                 # Fetch the posts
-                posts = scraper.fetch_posts(query, SUBREDDIT_LIMIT, POST_LIMIT)
+                posts = asyncio.run(scraper.fetch_posts(query, SUBREDDIT_LIMIT, POST_LIMIT))
                 spinner.stop()
 
                 # Check if any posts were found
@@ -37,30 +198,112 @@ def main():
                     print("No posts found for the provided query.")
                     continue
 
-                # Print the posts
-                for post in posts:
-                    print(f"Subreddit: {post['subreddit']}")
-                    print(f"Title: {post['title']}")
-                    print(f"Score: {post['score']}")
-                    print(f"URL: {post['url']}")
-                    print(f"Number of comments: {post['num_comments']}")
-                    print(f"Created at: {post['created_at']}")
-                    print(f"Content: {post['content']}")
-                    print("\n" + "-" * 50 + "\n")
+                print_posts(posts)
             except Exception as e:
                 spinner.stop()
                 logger.error(f"An error occurred while fetching posts: {str(e)}")
         elif choice == '2':
-            scraper = RedditScraper(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
-            scraper.run()
+            command_scrape(argparse.Namespace(query=None, subreddit_limit=None, post_limit=None, print=False))
         elif choice == '3':
+            command_ui(args)
+        elif choice == '4':
+            from app.config import Config
+
+            query_file = input(f"Enter the query file path [{Config.BATCH_QUERY_FILE}]: ") or Config.BATCH_QUERY_FILE
             try:
-                subprocess.run(["streamlit", "run", "app/streamlit_app.py"], check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"Streamlit app failed to start: {str(e)}")
+                spinner.start('Scraping queries...')
+                command_batch(argparse.Namespace(query_file=query_file, output=None, workers=None))
+            except Exception as e:
+                spinner.fail(f"Batch scrape failed: {str(e)}")
+                logger.error(f"An error occurred while batch scraping: {str(e)}")
+            finally:
+                spinner.stop()
+        elif choice == '5':
+            return 0
         else:
-            print("Invalid choice. Please enter 1, 2 or 3.")
+            print("Invalid choice. Please enter 1, 2, 3, 4 or 5.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description="Scrape, process and serve Reddit posts.")
+    subcommands = parser.add_subparsers(dest='command', metavar='command')
+
+    scrape = subcommands.add_parser('scrape', help="Run the scrape pipeline (mode and output set in Config)")
+    scrape.add_argument('--query', help="Search query (default: Config.SEARCH_QUERY)")
+    scrape.add_argument('--subreddit-limit', type=int, help="Subreddits to scrape (default: Config.SUBREDDIT_LIMIT)")
+    scrape.add_argument('--post-limit', type=int, help="Posts per subreddit (default: Config.POST_LIMIT)")
+    scrape.add_argument('--print', action='store_true', help="Print the posts of --query instead of saving them")
+    scrape.set_defaults(func=command_scrape)
+
+    refresh = subcommands.add_parser('refresh', help="Update the scores and comment counts of stored posts")
+    refresh.add_argument('files', nargs='*', help="Posts files to update (default: the raw and cleaned files)")
+    refresh.set_defaults(func=command_refresh)
+
+    clean = subcommands.add_parser('clean', help="Clean the text columns of a posts file")
+    clean.add_argument('input')
+    clean.add_argument('output')
+    clean.set_defaults(func=command_clean)
+
+    dedupe = subcommands.add_parser('dedupe', help="Tag or collapse near-duplicate posts of a cleaned posts file")
+    dedupe.add_argument('input')
+    dedupe.add_argument('output')
+    dedupe.add_argument('--mode', choices=['tag', 'collapse'], default='tag',
+                        help="Tag duplicates with duplicate_of and cluster_size, or keep one post per cluster")
+    dedupe.set_defaults(func=command_dedupe)
+
+    shuffle = subcommands.add_parser('shuffle', help="Shuffle the rows of a posts file")
+    shuffle.add_argument('input')
+    shuffle.add_argument('output')
+    shuffle.add_argument('--out-of-core', action='store_true', help="Shuffle through on-disk buckets")
+    shuffle.add_argument('--seed', type=int, help="Seed for a reproducible order (default: Config.SHUFFLE_SEED)")
+    shuffle.set_defaults(func=command_shuffle)
+
+    sample = subcommands.add_parser('sample', help="Save a random sample of the rows of a CSV posts file")
+    sample.add_argument('input')
+    sample.add_argument('output')
+    sample_size = sample.add_mutually_exclusive_group(required=True)
+    sample_size.add_argument('--size', type=int, help="Rows to sample")
+    sample_size.add_argument('--fraction', type=float, help="Fraction of the rows to sample")
+    sample.add_argument('--seed', type=int, help="Seed for a reproducible sample (default: Config.SHUFFLE_SEED)")
+    sample.set_defaults(func=command_sample)
+
+    split = subcommands.add_parser('split', help="Split the rows of a CSV posts file at random, e.g. "
+                                                 "train.csv:0.8 validation.csv:0.1 test.csv:0.1")
+    split.add_argument('input')
+    split.add_argument('outputs', nargs='+', metavar='PATH:FRACTION')
+    split.add_argument('--seed', type=int, help="Seed for a reproducible split (default: Config.SHUFFLE_SEED)")
+    split.set_defaults(func=command_split)
+
+    serve = subcommands.add_parser('serve', help="Serve the FastAPI app")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.set_defaults(func=command_serve)
+
+    ui = subcommands.add_parser('ui', help="Run the Streamlit app")
+    ui.set_defaults(func=command_ui)
+
+    batch = subcommands.add_parser('batch', help="Scrape every query of a query file across worker processes")
+    batch.add_argument('query_file')
+    batch.add_argument('--output', help="Merged output file (default: Config.BATCH_CSV_PATH)")
+    batch.add_argument('--workers', type=int, help="Worker processes (default: Config.BATCH_WORKERS)")
+    batch.set_defaults(func=command_batch)
+
+    menu = subcommands.add_parser('menu', help="Interactive menu")
+    menu.set_defaults(func=command_menu)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        if not sys.stdin.isatty():
+            parser.print_help()
+            return 2
+        args.func = command_menu
+    setup_logging()
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
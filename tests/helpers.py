@@ -0,0 +1,18 @@
+import asyncio
+
+
+class AsyncIterator:
+    """Async iterator over ``items``, standing in for asyncpraw listings; waits ``delay`` seconds before each item."""
+
+    def __init__(self, items, delay=0):
+        self.items = list(items)
+        self.delay = delay
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        return self.items.pop(0)
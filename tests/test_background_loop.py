@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.background_loop import BackgroundLoop
+
+
+def test_run_reuses_one_loop_across_threads():
+    background = BackgroundLoop()
+    loops = []
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    threads = [threading.Thread(target=lambda: loops.append(background.run(current_loop()))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    background.close()
+
+    assert loops == [background.loop] * 3
+    assert not background.is_running
+
+
+def test_run_times_out_and_cancels():
+    background = BackgroundLoop()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        background.run(slow(), timeout=0.05)
+    background.run(asyncio.wait_for(cancelled.wait(), 1))
+    background.close()
+    background.close()
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pandas as pd
+
+from app.batch_scraper import ProgressJournal, merge_shards, read_queries, run_batch
+from app.rate_limiter import RateLimitScheduler
+
+
+def write_posts(path, ids):
+    pd.DataFrame({'subreddit': 'python', 'title': [f"Post {i}" for i in ids], 'score': 1, 'id': ids,
+                  'url': 'http://example.com', 'num_comments': 0, 'created_at': '2021-03-24 10:37:03',
+                  'content': ''}).to_csv(path, index=False)
+
+
+def thread_pool(max_workers, mp_context, initializer, initargs):
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def test_read_queries(tmp_path):
+    query_file = tmp_path / 'queries.txt'
+    query_file.write_text("fastapi\n\n# comment\n  django  \nfastapi\n", encoding='utf-8')
+
+    assert read_queries(query_file) == ["fastapi", "django"]
+
+
+def test_progress_journal_ignores_truncated_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = ProgressJournal(path)
+    journal.record("fastapi", "a.csv", 3)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"query": "dja')
+
+    assert set(ProgressJournal(path).done) == {"fastapi"}
+
+
+def test_merge_shards_deduplicates_by_id(tmp_path):
+    write_posts(tmp_path / 'a.csv', ["p1", "p2"])
+    write_posts(tmp_path / 'b.csv', ["p2", "p3", "p3"])
+
+    rows = merge_shards([tmp_path / 'a.csv', tmp_path / 'b.csv'], tmp_path / 'merged.csv', chunk_size=2)
+
+    assert rows == 3
+    assert list(pd.read_csv(tmp_path / 'merged.csv')['id']) == ["p1", "p2", "p3"]
+
+
+def test_run_batch_resumes_from_journal(tmp_path):
+    query_file = tmp_path / 'queries.txt'
+    query_file.write_text("one\ntwo\nthree\n", encoding='utf-8')
+    scraped = []
+
+    def scrape(query, path, subreddit_limit, post_limit):
+        scraped.append(query)
+        if query == "two" and scraped.count("two") == 1:
+            raise RuntimeError("connection reset")
+        write_posts(path, [f"{query}1", "shared"])
+        return 2
+
+    kwargs = {'merged_path': str(tmp_path / 'merged.csv'), 'workers': 2, 'journal_path': tmp_path / 'journal.jsonl',
+              'shard_dir': str(tmp_path / 'shards')}
+    with patch('app.batch_scraper.ProcessPoolExecutor', thread_pool), \
+            patch('app.batch_scraper._scrape_query', scrape):
+        first = run_batch(query_file, **kwargs)
+        second = run_batch(query_file, **kwargs)
+
+    assert first['failed'] == ["two"] and first['rows'] == 3
+    assert second == {'queries': 3, 'scraped': 1, 'skipped': 2, 'failed': [], 'rows': 4}
+    assert sorted(scraped) == ["one", "three", "two", "two"]
+    assert list(pd.read_csv(tmp_path / 'merged.csv')['id']) == ["one1", "shared", "two1", "three1"]
+
+
+def test_scheduler_share_splits_budget():
+    scheduler = RateLimitScheduler(rate=2.0, burst=5, share=0.25)
+    assert scheduler.rate == 0.5
+
+    scheduler.update(200, {'x-ratelimit-remaining': '400', 'x-ratelimit-reset': '100'})
+    assert scheduler.rate == 1.0
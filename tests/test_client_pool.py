@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.client_pool import RedditClientPool
+from app.fast_api_scraper import app, client_pool
+from app.result_cache import get_result_cache
+from tests.helpers import AsyncIterator
+
+
+@pytest.fixture
+def mock_reddit_class():
+    with patch('app.reddit_scraper.asyncpraw.Reddit') as MockReddit:
+        MockReddit.side_effect = lambda **kwargs: MagicMock()
+        yield MockReddit
+
+
+def test_pool_leases_and_reuses_clients(mock_reddit_class):
+    pool = RedditClientPool("fake_client_id", "fake_client_secret", "fake_user_agent", size=2)
+
+    async def use_pool():
+        await pool.open()
+        async with pool.lease() as first:
+            async with pool.lease() as second:
+                assert first is not second
+        async with pool.lease() as again:
+            assert again in (first, second)
+        session = pool.session
+        await pool.close()
+        return session
+
+    session = asyncio.run(use_pool())
+
+    assert mock_reddit_class.call_count == 2
+    assert all(call.kwargs['requestor_kwargs']['session'] is session for call in mock_reddit_class.call_args_list)
+    assert session.closed
+    assert not pool.is_open
+
+
+def test_pool_lease_waits_for_free_client(mock_reddit_class):
+    pool = RedditClientPool("fake_client_id", "fake_client_secret", "fake_user_agent", size=1)
+    order = []
+
+    async def worker(name):
+        async with pool.lease():
+            order.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} end")
+
+    async def use_pool():
+        await asyncio.gather(worker("a"), worker("b"))
+        await pool.close()
+
+    asyncio.run(use_pool())
+
+    assert order == ["a start", "a end", "b start", "b end"]
+
+
+def test_scrape_endpoint_uses_pooled_client(mock_reddit_class):
+    submission = MagicMock(title="Test Post", score=10, id="test_id", url="http://example.com", num_comments=5,
+                           created_utc=1616582223, selftext="This is a test post")
+    subreddit = MagicMock(display_name="testsub")
+    subreddit.top.side_effect = lambda limit, time_filter: AsyncIterator([submission])
+
+    get_result_cache().clear()
+    with TestClient(app) as client, patch('app.reddit_scraper.INDEX_ENABLED', False):
+        for reddit in client_pool.clients:
+            reddit.subreddits.search.side_effect = lambda query, limit: AsyncIterator([subreddit])
+        first = client.get("/scrape/fastapi")
+        second = client.get("/scrape/fastapi")
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()['posts'][0]['title'] == "Test Post"
+    # Clients are created once at startup, not per request, and are not closed by the handler.
+    assert mock_reddit_class.call_count == client_pool.size
+    get_result_cache().clear()
@@ -0,0 +1,131 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import pandas as pd
+from asyncpraw.models import MoreComments
+
+from app.comment_scraper import COMMENT_COLUMNS, iter_comment_tree, stream_comments_to_file
+from app.reddit_scraper import RedditScraper
+from tests.helpers import AsyncIterator
+
+
+def make_comment(comment_id, parent_id, replies=()):
+    return MagicMock(id=comment_id, parent_id=parent_id, author=f"user_{comment_id}", body=f"Body {comment_id}",
+                     score=1, created_utc=1616582223, replies=list(replies))
+
+
+def make_more(children):
+    more = MagicMock(spec=MoreComments)
+    more.comments = AsyncMock(return_value=children)
+    return more
+
+
+def make_submission(submission_id, comments):
+    return MagicMock(id=submission_id, _fetched=True, comments=comments)
+
+
+def make_thread():
+    """s1: a -> (b -> d), c, and a placeholder that expands to e (under a) and f (under e)."""
+    more = make_more([make_comment("e", "t1_a"), make_comment("f", "t1_e")])
+    d = make_comment("d", "t1_b")
+    b = make_comment("b", "t1_a", [d])
+    a = make_comment("a", "t3_s1", [b, more])
+    return make_submission("s1", [a, make_comment("c", "t3_s1")]), more
+
+
+async def collect(submission, **kwargs):
+    return [row async for row in iter_comment_tree(submission, **kwargs)]
+
+
+def test_iter_comment_tree_breadth_first_with_depths():
+    submission, more = make_thread()
+
+    rows = asyncio.run(collect(submission, max_depth=10, max_comments=100))
+
+    assert [(row['id'], row['depth']) for row in rows] == [("a", 0), ("c", 0), ("b", 1), ("d", 2), ("e", 1),
+                                                           ("f", 2)]
+    assert rows[0]['parent_id'] == "t3_s1" and rows[2]['parent_id'] == "t1_a"
+    assert {row['submission_id'] for row in rows} == {"s1"}
+    more.comments.assert_awaited_once_with(update=False)
+
+
+def test_iter_comment_tree_caps_depth_and_count():
+    submission, more = make_thread()
+    rows = asyncio.run(collect(submission, max_depth=0, max_comments=100))
+    assert [row['id'] for row in rows] == ["a", "c"]
+    more.comments.assert_not_awaited()
+
+    submission, more = make_thread()
+    rows = asyncio.run(collect(submission, max_depth=10, max_comments=3))
+    assert [row['id'] for row in rows] == ["a", "c", "b"]
+    more.comments.assert_not_awaited()
+
+
+def test_iter_comment_tree_loads_unfetched_submission():
+    submission = MagicMock(id="s1", _fetched=False, comments=[])
+    submission.load = AsyncMock()
+
+    assert asyncio.run(collect(submission, max_depth=3, max_comments=50)) == []
+    assert submission.comment_limit == 50
+    submission.load.assert_awaited_once()
+
+
+def test_stream_comments_to_file_writes_flat_table(tmp_path):
+    file_path = tmp_path / 'comments.csv'
+    submissions = [make_thread()[0], make_submission("s2", [make_comment("x", "t3_s2")])]
+
+    count = asyncio.run(stream_comments_to_file(submissions, file_path, max_depth=10, max_comments=100,
+                                                concurrency=2, chunk_size=2))
+
+    df = pd.read_csv(file_path)
+    assert count == 7
+    assert list(df.columns) == COMMENT_COLUMNS
+    assert sorted(df['id']) == ["a", "b", "c", "d", "e", "f", "x"]
+    assert set(df.loc[df['submission_id'] == "s2", 'id']) == {"x"}
+
+
+def test_stream_comments_to_file_without_comments(tmp_path):
+    file_path = tmp_path / 'comments.csv'
+    assert asyncio.run(stream_comments_to_file([], file_path)) == 0
+    assert list(pd.read_csv(file_path).columns) == COMMENT_COLUMNS
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_scrape_comments(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    subreddit = MagicMock(display_name="python")
+    subreddit.top.return_value = AsyncIterator([make_thread()[0]])
+    scraper.reddit.subreddits.search.return_value = AsyncIterator([subreddit])
+    file_path = tmp_path / 'comments.csv'
+
+    assert asyncio.run(scraper.scrape_comments("python", 1, 1, file_path)) == 6
+    scraper.reddit.close.assert_awaited_once()
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_scrape_comments_holds_the_pool_lease_while_loading_trees(mock_reddit, tmp_path):
+    events = []
+    thread, more = make_thread()
+    more.comments.side_effect = lambda update: events.append('expand') or [make_comment("e", "t1_a")]
+    listed = MagicMock(id="s1")
+    pooled = MagicMock()
+    pooled.subreddit = AsyncMock(return_value=MagicMock(top=lambda limit, time_filter: AsyncIterator([listed])))
+    pooled.submission = AsyncMock(return_value=thread)
+
+    @asynccontextmanager
+    async def lease():
+        events.append('lease')
+        yield pooled
+        events.append('release')
+
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent",
+                            credential_pool=MagicMock(lease=lease))
+    scraper.reddit.close = AsyncMock()
+    scraper.reddit.subreddits.search.return_value = AsyncIterator([MagicMock(display_name="python")])
+
+    assert asyncio.run(scraper.scrape_comments("python", 1, 1, tmp_path / 'comments.csv')) == 5
+
+    pooled.submission.assert_awaited_once_with("s1", fetch=False)
+    assert events == ['lease', 'release', 'lease', 'expand', 'release']
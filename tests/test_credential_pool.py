@@ -0,0 +1,201 @@
+import asyncio
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import pytest
+from asyncprawcore.exceptions import ResponseException
+
+from app.credential_pool import CredentialPool, is_auth_error, parse_credentials
+from app.rate_limiter import get_scheduler
+from app.reddit_scraper import RedditScraper
+from tests.helpers import AsyncIterator
+
+
+@pytest.fixture
+def mock_reddit_class():
+    with patch('app.reddit_scraper.asyncpraw.Reddit') as MockReddit:
+        MockReddit.side_effect = lambda **kwargs: MagicMock(client_id=kwargs['client_id'])
+        yield MockReddit
+
+
+def make_pool(count=3, **kwargs):
+    return CredentialPool([(f"id{i}", f"secret{i}") for i in range(count)], "fake_user_agent", **kwargs)
+
+
+def test_parse_credentials_puts_primary_first_and_drops_duplicates():
+    credentials = parse_credentials(" id1:secret1, id2:secret2,id1:other ", "id0", "secret0")
+
+    assert credentials == [("id0", "secret0"), ("id1", "secret1"), ("id2", "secret2")]
+    assert parse_credentials("", "id0", "secret0") == [("id0", "secret0")]
+    with pytest.raises(ValueError):
+        parse_credentials("id1")
+
+
+def test_is_auth_error():
+    assert is_auth_error(ResponseException(MagicMock(status=401)))
+    assert not is_auth_error(ResponseException(MagicMock(status=500)))
+    assert not is_auth_error(ValueError("boom"))
+
+
+def test_concurrent_leases_spread_across_apps(mock_reddit_class):
+    pool = make_pool(3)
+
+    async def use_pool():
+        leased = []
+
+        async def worker():
+            async with pool.lease() as reddit:
+                leased.append(reddit.client_id)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(6)))
+        session = pool.session
+        await pool.close()
+        return leased, session
+
+    leased, session = asyncio.run(use_pool())
+
+    assert sorted(leased) == ["id0", "id0", "id1", "id1", "id2", "id2"]
+    assert mock_reddit_class.call_count == 3
+    assert all(call.kwargs['requestor_kwargs']['session'] is session for call in mock_reddit_class.call_args_list)
+    assert session.closed
+
+
+def test_lease_prefers_app_with_most_quota(mock_reddit_class):
+    pool = make_pool(2)
+    for _ in range(4):
+        pool.credentials[0].scheduler.reserve()
+
+    async def use_pool():
+        async with pool.lease() as reddit:
+            await pool.close()
+            return reddit.client_id
+
+    assert asyncio.run(use_pool()) == "id1"
+
+
+def test_rejected_credentials_are_taken_out_of_rotation(mock_reddit_class):
+    pool = make_pool(2, auth_cooldown=60)
+
+    async def use_pool():
+        with pytest.raises(ResponseException):
+            async with pool.lease() as reddit:
+                first = reddit.client_id
+                raise ResponseException(MagicMock(status=401))
+        leased = []
+        for _ in range(3):
+            async with pool.lease() as reddit:
+                leased.append(reddit.client_id)
+        await pool.close()
+        return first, leased
+
+    first, leased = asyncio.run(use_pool())
+
+    assert set(leased) == {"id0", "id1"} - {first}
+    stats = {entry['client_id']: entry for entry in pool.stats()}
+    assert stats[first]['auth_failures'] == 1 and stats[first]['cooldowns'] == 1
+    assert stats[first]['cooldown_seconds'] > 59
+    assert all('secret' not in key and 'client_secret' not in entry for entry in stats.values() for key in entry)
+
+
+def test_throttled_app_cools_down_and_lease_waits_when_all_are_out(mock_reddit_class):
+    pool = make_pool(1, throttle_cooldown=0.05)
+
+    async def use_pool():
+        async with pool.lease():
+            pool.credentials[0].scheduler.update(429, {'retry-after': '0'})
+        start = asyncio.get_running_loop().time()
+        async with pool.lease():
+            waited = asyncio.get_running_loop().time() - start
+        await pool.close()
+        return waited
+
+    assert asyncio.run(use_pool()) >= 0.04
+    assert pool.stats()[0]['cooldowns'] == 1 and pool.stats()[0]['throttled_responses'] == 1
+
+
+def test_throttling_of_other_clients_does_not_cool_down_an_app(mock_reddit_class):
+    pool = make_pool(1)
+
+    async def use_pool():
+        async with pool.lease():
+            get_scheduler().update(429, {'retry-after': '0'})  # The search client of the same app was throttled
+        await pool.close()
+
+    asyncio.run(use_pool())
+
+    assert pool.credentials[0].scheduler is not get_scheduler()
+    assert pool.stats()[0]['cooldowns'] == 0
+
+
+def test_scraper_fetches_listings_with_pooled_clients(mock_reddit_class):
+    submission = MagicMock(title="Test Post", score=10, id="test_id", url="http://example.com", num_comments=5,
+                           created_utc=1616582223, selftext="This is a test post")
+    subreddits = [MagicMock(display_name=f"sub{i}") for i in range(4)]
+    pool = make_pool(2)
+    listed_by = []
+
+    async def subreddit(name, reddit):
+        bound = MagicMock(display_name=name)
+        bound.top.side_effect = lambda limit, time_filter: listed_by.append(reddit.client_id) or \
+            AsyncIterator([submission])
+        return bound
+
+    async def fetch():
+        await pool.open()
+        for credential in pool.credentials:
+            reddit = credential.reddit
+            reddit.subreddit.side_effect = lambda name, reddit=reddit: subreddit(name, reddit)
+        scraper = RedditScraper("fake_client_id", "fake_client_secret", "fake_user_agent", credential_pool=pool)
+        scraper.reddit.subreddits.search.side_effect = lambda query, limit: AsyncIterator(subreddits)
+        scraper.reddit.close = AsyncMock()
+        posts = await scraper.fetch_reddit_posts("test_query", 4, 1, concurrency=4)
+        await pool.close()
+        return posts
+
+    posts = asyncio.run(fetch())
+
+    assert [post['subreddit'] for post in posts] == ["sub0", "sub1", "sub2", "sub3"]
+    assert sorted(listed_by) == ["id0", "id0", "id1", "id1"]
+    for subreddit_mock in subreddits:
+        subreddit_mock.top.assert_not_called()
+
+
+def test_scraper_closes_only_the_pool_it_created(mock_reddit_class):
+    def fetch(scraper):
+        scraper.reddit.subreddits.search.side_effect = lambda query, limit: AsyncIterator([])
+        scraper.reddit.close = AsyncMock()
+        return scraper.fetch_reddit_posts("test_query", 1, 1)
+
+    async def run():
+        given = make_pool(2)
+        await given.open()
+        await fetch(RedditScraper("fake_client_id", "fake_client_secret", "fake_user_agent", credential_pool=given))
+        assert given.is_open
+        await given.close()
+
+        with patch('app.reddit_scraper.create_credential_pool', return_value=make_pool(2)):
+            scraper = RedditScraper("fake_client_id", "fake_client_secret", "fake_user_agent")
+        assert scraper.owns_credential_pool
+        await scraper.credential_pool.open()
+        await fetch(scraper)
+        assert not scraper.credential_pool.is_open
+
+    asyncio.run(run())
+
+
+def test_pool_used_on_a_new_event_loop_reopens_and_reports_the_old_session(mock_reddit_class):
+    pool = make_pool(2)
+
+    async def lease():
+        async with pool.lease():
+            return pool.session
+
+    first = asyncio.run(lease())
+    with patch('app.credential_pool.logger') as mock_logger:
+        second = asyncio.run(lease())
+
+    assert second is not first
+    mock_logger.warning.assert_called_once()
+    assert 'Abandoned' in mock_logger.warning.call_args.args[0]
+    asyncio.run(pool.close())  # Opened on a finished loop as well, so it is abandoned rather than closed
+    assert not pool.is_open
@@ -0,0 +1,72 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.deep_crawl import CrawlCoverage, crawl_subreddits, open_listing, parse_listing
+from tests.helpers import AsyncIterator
+
+
+def make_submission(submission_id):
+    return MagicMock(id=submission_id, title=f"Post {submission_id}", score=1, url="http://example.com",
+                     num_comments=0, created_utc=1616582223, selftext="")
+
+
+def make_subreddit(name, listings):
+    """A subreddit whose listings return the given ids, keyed by sort or by 'sort:time_filter'."""
+    subreddit = MagicMock(display_name=name)
+
+    def listing(sort):
+        def open_listing(limit, time_filter=None):
+            ids = listings.get(f'{sort}:{time_filter}' if time_filter else sort, [])
+            return AsyncIterator([make_submission(submission_id) for submission_id in ids[:limit]], delay=0.001)
+        return open_listing
+
+    for sort in ('hot', 'new', 'rising', 'top', 'controversial'):
+        setattr(subreddit, sort, MagicMock(side_effect=listing(sort)))
+    return subreddit
+
+
+def test_parse_listing():
+    assert parse_listing('hot') == ('hot', None)
+    assert parse_listing('top:year') == ('top', 'year')
+    for spec in ('best', 'new:year', 'top:decade'):
+        with pytest.raises(ValueError):
+            parse_listing(spec)
+
+
+def test_open_listing_passes_time_filter_to_timed_sorts():
+    subreddit = MagicMock()
+
+    open_listing(subreddit, 'controversial', 10)
+    open_listing(subreddit, 'new', 10, 'week')
+
+    subreddit.controversial.assert_called_once_with(time_filter='all', limit=10)
+    subreddit.new.assert_called_once_with(limit=10)
+
+
+def test_crawl_dedupes_listings_and_reports_coverage():
+    subreddits = [
+        make_subreddit("python", {'hot': ['a', 'b'], 'new': ['b', 'c', 'd'], 'top:all': ['a', 'e']}),
+        make_subreddit("rust", {'hot': ['r1'], 'new': ['r1']}),
+    ]
+
+    posts, coverage = asyncio.run(crawl_subreddits(subreddits, ['hot', 'new', 'top:all'], 100, concurrency=2))
+
+    assert sorted(posts.id) == ['a', 'b', 'c', 'd', 'e', 'r1']
+    report = coverage.report()
+    assert report['unique_posts'] == 6
+    assert {spec: counts['exclusive'] for spec, counts in report['listings'].items()} == \
+        {'hot': 0, 'new': 2, 'top:all': 1}
+    assert {spec: counts['fetched'] for spec, counts in report['listings'].items()} == \
+        {'hot': 3, 'new': 4, 'top:all': 2}
+    assert sum(counts['new'] for counts in report['listings'].values()) == 6
+    assert report['listings']['hot']['estimated_requests'] == 2
+
+
+def test_coverage_estimates_requests_from_pages():
+    coverage = CrawlCoverage(['top:all'])
+
+    coverage.finish_listing('top:all', 250)
+
+    assert coverage.report()['listings']['top:all']['estimated_requests'] == 3
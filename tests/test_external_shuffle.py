@@ -0,0 +1,48 @@
+import pandas as pd
+
+from app.external_shuffle import shuffle_out_of_core
+
+
+def write_posts(path, rows):
+    pd.DataFrame({
+        'id': [f'id{i}' for i in range(rows)],
+        'title': [f'title {i}' for i in range(rows)],
+        'content': ['' if i % 3 == 0 else f'line one\nline "two" of {i}' for i in range(rows)],
+        'score': list(range(rows)),
+    }).to_csv(path, index=False)
+
+
+def read_rows(path):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return list(df.columns), sorted(map(tuple, df.values.tolist()))
+
+
+def test_shuffle_keeps_every_csv_row(tmp_path):
+    source, shuffled = tmp_path / 'cleaned.csv', tmp_path / 'shuffled.csv'
+    write_posts(source, 500)
+
+    shuffle_out_of_core(source, shuffled, chunk_size=64, bucket_bytes=4096, seed=1)
+
+    assert read_rows(shuffled) == read_rows(source)
+    assert pd.read_csv(shuffled)['id'].tolist() != pd.read_csv(source)['id'].tolist()
+    # CSV is shuffled through a row index, saved next to the input
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['cleaned.csv', 'cleaned.csv.offsets.npz', 'shuffled.csv']
+
+
+def test_shuffle_is_reproducible_with_seed(tmp_path):
+    source = tmp_path / 'cleaned.csv'
+    write_posts(source, 200)
+
+    shuffle_out_of_core(source, tmp_path / 'a.csv', chunk_size=50, bucket_bytes=2048, seed=7)
+    shuffle_out_of_core(source, tmp_path / 'b.csv', chunk_size=50, bucket_bytes=2048, seed=7)
+
+    assert (tmp_path / 'a.csv').read_bytes() == (tmp_path / 'b.csv').read_bytes()
+
+
+def test_shuffle_header_only_file(tmp_path):
+    source, shuffled = tmp_path / 'cleaned.csv', tmp_path / 'shuffled.csv'
+    write_posts(source, 0)
+
+    shuffle_out_of_core(source, shuffled)
+
+    assert shuffled.read_text() == source.read_text()
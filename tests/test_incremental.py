@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import pandas as pd
+
+from app.checkpoints import CheckpointStore
+from app.reddit_scraper import RedditScraper
+
+
+class CountingListing:
+    def __init__(self, submissions):
+        self.submissions = list(submissions)
+        self.consumed = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.consumed == len(self.submissions):
+            raise StopAsyncIteration
+        self.consumed += 1
+        return self.submissions[self.consumed - 1]
+
+
+def make_submission(submission_id, created_utc):
+    return MagicMock(title=f"Post {submission_id}", score=1, id=submission_id, url="http://example.com",
+                     num_comments=0, created_utc=created_utc, selftext="")
+
+
+def test_checkpoint_store_round_trip(tmp_path):
+    path = tmp_path / 'checkpoints.json'
+    store = CheckpointStore(path)
+    store.advance('python', 200, 'b')
+    store.advance('python', 100, 'a')
+    store.save()
+
+    assert CheckpointStore(path).get('python') == {'created_utc': 200, 'id': 'b'}
+    assert CheckpointStore(path).get('fastapi') is None
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_fetch_new_posts_stops_at_checkpoint(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    listing = CountingListing([make_submission(f"p{i}", 1000 - i) for i in range(100)])
+    subreddit = MagicMock(display_name="python")
+    subreddit.new.return_value = listing
+    scraper.reddit.subreddits.search.return_value = CountingListing([subreddit])
+    checkpoints = CheckpointStore(tmp_path / 'checkpoints.json')
+    checkpoints.advance('python', 997, 'p3')
+
+    posts, marks = asyncio.run(scraper.fetch_new_posts("python", 1, 100, checkpoints))
+
+    assert [post['id'] for post in posts] == ['p0', 'p1', 'p2']
+    assert listing.consumed == 4
+    assert marks == {'python': {'created_utc': 1000, 'id': 'p0'}}
+
+
+def test_append_new_posts_skips_stored_ids(tmp_path):
+    raw, cleaned = tmp_path / 'raw.csv', tmp_path / 'cleaned.csv'
+    first = [RedditScraper.build_post("Python", make_submission(f"p{i}", 1616582223 + i)) for i in range(3)]
+    second = [RedditScraper.build_post("Python", make_submission(f"p{i}", 1616582223 + i)) for i in range(2, 5)]
+
+    assert RedditScraper.append_new_posts(first, raw, cleaned) == 3
+    assert RedditScraper.append_new_posts(second + second, raw, cleaned) == 2
+
+    assert pd.read_csv(raw)['id'].tolist() == ['p0', 'p1', 'p2', 'p3', 'p4']
+    assert pd.read_csv(cleaned)['title'].tolist() == [f'post p{i}' for i in range(5)]
+
+
+def test_append_new_posts_parquet(tmp_path):
+    raw, cleaned = tmp_path / 'raw.parquet', tmp_path / 'cleaned.parquet'
+    posts = [RedditScraper.build_post("Python", make_submission(f"p{i}", 1616582223 + i)) for i in range(4)]
+
+    RedditScraper.append_new_posts(posts[:2], raw, cleaned)
+    RedditScraper.append_new_posts(posts[1:], raw, cleaned)
+
+    assert pd.read_parquet(raw)['id'].tolist() == ['p0', 'p1', 'p2', 'p3']
+    assert pd.read_parquet(cleaned)['subreddit'].astype(str).tolist() == ['python'] * 4
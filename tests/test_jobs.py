@@ -0,0 +1,169 @@
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.fast_api_scraper import app, client_pool, job_queue, run_scrape_job
+from app.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobQueueFull, MemoryJobStore, SQLiteJobStore
+
+
+def make_posts(count):
+    return [{'id': f'id{i}', 'title': f'Post {i}', 'created_at': datetime(2024, 1, 1)} for i in range(count)]
+
+
+async def fake_runner(job, report_progress):
+    if job['query'] == 'broken':
+        raise RuntimeError("API error")
+    await asyncio.sleep(0.01)
+    await report_progress(job['post_limit'])
+    return make_posts(job['post_limit'])
+
+
+async def wait_for(store, job_id, statuses=(SUCCEEDED, FAILED)):
+    for _ in range(200):
+        job = store.get(job_id)
+        if job['status'] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return MemoryJobStore() if request.param == 'memory' else SQLiteJobStore(str(tmp_path / 'jobs.db'))
+
+
+def test_jobs_run_in_background_and_page_results(store):
+    async def scenario():
+        queue = JobQueue(fake_runner, store, workers=2)
+        await queue.start()
+        ok = await queue.submit('fastapi', 5, 7)
+        broken = await queue.submit('broken', 5, 7)
+        assert ok['status'] == QUEUED
+        done, failed = await wait_for(store, ok['id']), await wait_for(store, broken['id'])
+        await queue.stop()
+        return done, failed
+
+    done, failed = asyncio.run(scenario())
+
+    assert (done['status'], done['progress'], done['result_count']) == (SUCCEEDED, 7, 7)
+    assert [post['id'] for post in store.results(done['id'], 5, 10)] == ['id5', 'id6']
+    assert (failed['status'], failed['error']) == (FAILED, "API error")
+
+
+def test_submit_rejects_when_queue_is_full(store):
+    async def scenario():
+        queue = JobQueue(fake_runner, store, workers=1, max_queued=2)
+        await queue.start()
+        await queue.stop()  # No workers, so submitted jobs stay queued
+        await queue.submit('a', 1, 1)
+        await queue.submit('b', 1, 1)
+        with pytest.raises(JobQueueFull):
+            await queue.submit('c', 1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_store_resumes_interrupted_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+
+    async def interrupted():
+        started = asyncio.Event()
+
+        async def hanging_runner(job, report_progress):
+            started.set()
+            await asyncio.sleep(10)
+
+        queue = JobQueue(hanging_runner, SQLiteJobStore(path), workers=1)
+        await queue.start()
+        job = await queue.submit('fastapi', 5, 3)
+        await started.wait()
+        await queue.stop()
+        return job
+
+    job = asyncio.run(interrupted())
+    assert SQLiteJobStore(path).get(job['id'])['status'] == RUNNING
+
+    async def restarted():
+        store = SQLiteJobStore(path)
+        queue = JobQueue(fake_runner, store, workers=1)
+        await queue.start()
+        finished = await wait_for(store, job['id'])
+        await queue.stop()
+        return finished
+
+    finished = asyncio.run(restarted())
+    assert finished['status'] == SUCCEEDED
+    assert SQLiteJobStore(path).results(job['id'], 0, 10)[0] == {'id': 'id0', 'title': 'Post 0',
+                                                                 'created_at': '2024-01-01T00:00:00'}
+
+
+def test_memory_store_forgets_oldest_finished_jobs():
+    store = MemoryJobStore(max_finished=1)
+    for name in ('a', 'b'):
+        store.add({'id': name, 'status': QUEUED})
+        store.finish(name, SUCCEEDED, make_posts(1))
+
+    assert store.get('a') is None
+    assert store.results('b', 0, 10) == make_posts(1)
+
+
+def test_job_endpoints():
+    with patch('app.reddit_scraper.asyncpraw.Reddit', side_effect=lambda **kwargs: MagicMock()), \
+            patch.object(job_queue, 'runner', fake_runner), TestClient(app) as client:
+        created = client.post("/jobs", json={'query': 'fastapi', 'post_limit': 150})
+        job_id = created.json()['id']
+        for _ in range(200):
+            job = client.get(f"/jobs/{job_id}", params={'offset': 100, 'limit': 40}).json()
+            if job['status'] == SUCCEEDED:
+                break
+            time.sleep(0.01)
+        last_page = client.get(f"/jobs/{job_id}", params={'offset': 140}).json()
+        invalid = client.post("/jobs", json={'query': ''})
+        missing = client.get("/jobs/unknown")
+
+    assert created.status_code == 202
+    assert job['status'] == SUCCEEDED and job['progress'] == 150
+    assert [post['id'] for post in job['results']] == [f'id{i}' for i in range(100, 140)]
+    assert job['next_offset'] == 140
+    assert len(last_page['results']) == 10 and last_page['next_offset'] is None
+    assert invalid.status_code == 422
+    assert missing.status_code == 404
+
+
+def test_job_endpoint_rejects_when_queue_is_full():
+    with patch('app.reddit_scraper.asyncpraw.Reddit', side_effect=lambda **kwargs: MagicMock()), \
+            patch.object(job_queue, 'submit', side_effect=JobQueueFull("100 jobs are already queued")), \
+            TestClient(app) as client:
+        response = client.post("/jobs", json={'query': 'fastapi'})
+
+    assert response.status_code == 429
+
+
+def test_scrape_job_succeeds_when_indexing_fails():
+    async def iter_posts(query, subreddit_limit, post_limit):
+        for post in make_posts(post_limit):
+            yield post
+
+    progress = []
+
+    async def report_progress(count):
+        progress.append(count)
+
+    async def run():
+        posts = await run_scrape_job({'id': 'job', 'query': 'fastapi', 'subreddit_limit': 1, 'post_limit': 3},
+                                     report_progress)
+        await client_pool.close()
+        return posts
+
+    with patch('app.reddit_scraper.asyncpraw.Reddit', side_effect=lambda **kwargs: MagicMock()), \
+            patch('app.fast_api_scraper.FastApiRedditScraper') as MockScraper, \
+            patch('app.reddit_scraper.RedditScraper.index_posts', side_effect=RuntimeError("disk full")):
+        MockScraper.return_value.iter_posts = iter_posts
+        posts = asyncio.run(run())
+
+    assert posts == make_posts(3)
+    assert progress == [3]
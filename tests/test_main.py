@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch, AsyncMock
+
+import pytest
+
+import main
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'asyncpraw', 'fastapi', 'halo', 'streamlit', 'pyarrow')
+# Generous for slow CI machines; importing pandas or asyncpraw alone takes a large share of it
+HELP_BUDGET_SECONDS = 1.0
+
+
+def test_importing_main_skips_heavy_modules():
+    code = "import sys, main; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True,
+                            check=True)
+
+    assert result.stdout.strip() == ''
+
+
+def test_help_starts_within_budget():
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, 'main.py', '--help'], cwd=PROJECT_DIR, capture_output=True,
+                                text=True)
+        timings.append(time.perf_counter() - start)
+        assert result.returncode == 0
+        assert 'scrape' in result.stdout
+
+    assert min(timings) < HELP_BUDGET_SECONDS
+
+
+def test_no_command_without_terminal_prints_help(capsys, monkeypatch):
+    monkeypatch.setattr(sys.stdin, 'isatty', lambda: False, raising=False)
+
+    assert main.main([]) == 2
+    assert 'batch' in capsys.readouterr().out
+
+
+def test_subcommands_parse_their_arguments():
+    args = main.build_parser().parse_args(['shuffle', 'in.csv', 'out.csv', '--out-of-core'])
+
+    assert args.func is main.command_shuffle
+    assert (args.input, args.output, args.out_of_core) == ('in.csv', 'out.csv', True)
+
+
+def test_unknown_command_exits():
+    with pytest.raises(SystemExit):
+        main.build_parser().parse_args(['unknown'])
+
+
+def test_failed_scrape_exits_nonzero():
+    with patch('app.reddit_scraper.RedditScraper') as MockScraper:
+        MockScraper.return_value.run = AsyncMock(return_value=False)
+        assert main.main(['scrape']) == 1
+        MockScraper.return_value.run = AsyncMock(return_value=True)
+        assert main.main(['scrape']) == 0
+
+
+def test_print_scrape_keeps_explicit_zero_limits(capsys):
+    with patch('app.fast_api_scraper.FastApiRedditScraper') as MockScraper:
+        MockScraper.return_value.fetch_posts = AsyncMock(return_value=[])
+        assert main.main(['scrape', '--print', '--query', 'q', '--subreddit-limit', '0', '--post-limit', '0']) == 1
+
+    MockScraper.return_value.fetch_posts.assert_awaited_once_with('q', 0, 0)
+
+
+def test_logging_sink_is_added_once(monkeypatch):
+    monkeypatch.setattr(main, '_logging_configured', False)
+
+    with patch('loguru.logger.add') as mock_add:
+        main.setup_logging()
+        main.setup_logging()
+
+    mock_add.assert_called_once()
+
+
+def test_menu_survives_failed_batch(monkeypatch):
+    answers = iter(['4', 'missing_queries.txt', '5'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+
+    with patch('halo.Halo') as MockHalo, patch('app.batch_scraper.run_batch', side_effect=FileNotFoundError("nope")):
+        assert main.command_menu(None) == 0
+
+    MockHalo.return_value.fail.assert_called_once()
+    MockHalo.return_value.stop.assert_called()
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.fast_api_scraper import app
+from app.metrics import RunMetrics
+from app.output_formats import open_writer, write_frame
+from app.rate_limiter import RateLimitScheduler
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_run_metrics_times_stages_and_counts_deltas(tmp_path):
+    metrics = RunMetrics()
+    with metrics.stage('save'):
+        write_frame(pd.DataFrame({'id': ['a', 'b']}), tmp_path / 'posts.csv')
+    with metrics.stage('save'):
+        pass
+
+    summary = metrics.summary()
+
+    assert set(summary['stage_seconds']) == {'save'}
+    assert summary['bytes_written'] == (tmp_path / 'posts.csv').stat().st_size
+    assert summary['posts_fetched'] == 0
+    assert sample('reddit_scraper_stage_seconds_count', stage='save') >= 2
+
+
+def test_frame_writers_count_bytes_written(tmp_path):
+    before = sample('reddit_scraper_bytes_written_total', format='parquet')
+
+    with open_writer(tmp_path / 'posts.parquet') as writer:
+        writer.write(pd.DataFrame({'id': ['a'], 'score': [1]}))
+
+    written = sample('reddit_scraper_bytes_written_total', format='parquet') - before
+    assert written == (tmp_path / 'posts.parquet').stat().st_size
+
+
+def test_scheduler_counts_rate_limit_waits():
+    before = sample('reddit_rate_limit_delayed_requests_total')
+    scheduler = RateLimitScheduler(rate=1.0, burst=1)
+
+    scheduler.reserve()
+    wait = scheduler.reserve()
+
+    assert wait > 0
+    assert sample('reddit_rate_limit_delayed_requests_total') - before == 1
+
+
+def test_metrics_endpoint_exposes_scrape_latency():
+    before = sample('http_request_seconds_count', path='/scrape/{query}', method='GET', status='404')
+    with patch('app.fast_api_scraper.FastApiRedditScraper.fetch_posts', return_value=_no_posts()), \
+            patch('app.reddit_scraper.asyncpraw.Reddit', return_value=MagicMock()), TestClient(app) as client:
+        client.get("/scrape/fastapi")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'http_request_seconds_bucket{le="0.005",method="GET",path="/scrape/{query}",status="404"}' in response.text
+    assert sample('http_request_seconds_count', path='/scrape/{query}', method='GET', status='404') - before == 1
+
+
+def _no_posts():
+    async def fetch():
+        return []
+    return fetch()
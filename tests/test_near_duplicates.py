@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.near_duplicates import NearDuplicateIndex, dedupe_file, minhash_signatures, shingle_hashes
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def random_text(rng, words=30):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def test_shingle_hashes_offsets():
+    hashes, offsets = shingle_hashes(np.array(['a b c d', '', 'a b', None, 'b c d'], dtype=object), size=3)
+
+    assert list(np.diff(offsets)) == [2, 0, 1, 0, 1]
+    assert hashes[1] == hashes[3]  # 'b c d' appears in the first and the last text
+
+
+def test_signature_agreement_estimates_jaccard():
+    rng = random.Random(0)
+    words = [rng.choice(WORDS) + str(i) for i in range(200)]
+    # 150 shared shingles of 1 word out of 250 in total
+    texts = np.array([' '.join(words[:200]), ' '.join(words[50:])], dtype=object)
+
+    signatures = minhash_signatures(*shingle_hashes(texts, size=1), num_perm=512)
+
+    assert abs((signatures[0] == signatures[1]).mean() - 150 / 200) < 0.06
+
+
+def test_index_clusters_near_duplicates_across_batches():
+    rng = random.Random(1)
+    originals = [random_text(rng) for _ in range(500)]
+    texts = originals + [text + ' crosspost' for text in originals[:50]] + ['', '']
+
+    with NearDuplicateIndex() as index:
+        for start in range(0, len(texts), 128):
+            index.add(np.array(texts[start:start + 128], dtype=object))
+        labels = index.clusters()
+
+    assert list(labels[500:550]) == list(range(50))
+    assert list(labels[:500]) == list(range(500))
+    assert list(labels[-2:]) == [550, 551]
+
+
+def test_index_requires_whole_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=100, bands=16)
+
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet'])
+def test_dedupe_file_tags_and_collapses(tmp_path, extension):
+    rng = random.Random(2)
+    stories = [random_text(rng) for _ in range(3)]
+    frame = pd.DataFrame({
+        'id': ['a', 'b', 'c', 'd', 'e'],
+        'subreddit': ['python', 'python', 'learnpython', 'rust', 'programming'],
+        'title': stories[0:1] + stories[1:2] + stories[0:1] + stories[2:3] + stories[0:1],
+        'content': ['', 'text', '', 'more', ''],
+    })
+    path = tmp_path / f'cleaned.{extension}'
+    frame.to_csv(path, index=False) if extension == 'csv' else frame.to_parquet(path)
+
+    tagged_path, collapsed_path = tmp_path / f'tagged.{extension}', tmp_path / f'collapsed.{extension}'
+    assert dedupe_file(path, tagged_path, 'tag', chunk_size=2) == 2
+    assert dedupe_file(path, collapsed_path, 'collapse', chunk_size=2) == 2
+
+    if extension == 'csv':
+        tagged, collapsed = pd.read_csv(tagged_path, keep_default_na=False), pd.read_csv(collapsed_path)
+    else:
+        tagged, collapsed = pd.read_parquet(tagged_path), pd.read_parquet(collapsed_path)
+    assert list(tagged['duplicate_of']) == ['', '', 'a', '', 'a']
+    assert list(tagged['cluster_size']) == [3, 1, 3, 1, 3]
+    assert list(collapsed['id']) == ['a', 'b', 'd']
+    assert list(collapsed['cluster_size']) == [3, 1, 1]
+
+
+def test_dedupe_file_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        dedupe_file(tmp_path / 'in.csv', tmp_path / 'out.csv', 'drop')
@@ -0,0 +1,112 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.external_shuffle import shuffle_out_of_core
+from app.output_formats import ArrowFrameWriter, detect_format, open_writer, output_path, read_frame, read_table, \
+    write_frame
+from app.reddit_scraper import RedditScraper
+
+
+def make_posts(start, count, subreddits=('Python', 'FastAPI')):
+    return pd.DataFrame({
+        'subreddit': [subreddits[i % len(subreddits)] for i in range(count)],
+        'title': [f'Post #{start + i}!' for i in range(count)],
+        'score': list(range(start, start + count)),
+        'id': [f'id{start + i}' for i in range(count)],
+        'url': ['https://example.com/A'] * count,
+        'num_comments': [i % 7 for i in range(count)],
+        'created_at': [datetime(2024, 1, 1, 12, 0, i % 60) for i in range(count)],
+        'content': ['Hello, World!' if i % 2 else '' for i in range(count)],
+    })
+
+
+def test_output_path_and_detect_format():
+    assert output_path('data/cleaned_file.csv', 'parquet') == 'data/cleaned_file.parquet'
+    assert detect_format('data/cleaned_file.feather') == 'feather'
+    assert detect_format('data/cleaned_file.csv') == 'csv'
+
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather'])
+def test_columnar_output_uses_explicit_schema(tmp_path, suffix):
+    path = tmp_path / f'posts{suffix}'
+    write_frame(make_posts(0, 10), path)
+
+    schema = read_table(path).schema
+    assert schema.field('subreddit').type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field('score').type == pa.int32()
+    assert schema.field('num_comments').type == pa.int32()
+    assert schema.field('created_at').type == pa.timestamp('ms')
+    df = read_frame(path)
+    assert df['created_at'].iloc[0] == pd.Timestamp(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather'])
+def test_chunked_writer_grows_dictionaries(tmp_path, suffix):
+    path = tmp_path / f'posts{suffix}'
+    with open_writer(path) as writer:
+        writer.write(make_posts(0, 5, subreddits=('Python',)))
+        writer.write(make_posts(5, 5, subreddits=('FastAPI', 'Python')))
+
+    df = read_frame(path)
+    assert df['id'].tolist() == [f'id{i}' for i in range(10)]
+    assert df['subreddit'].astype(str).tolist() == ['Python'] * 5 + ['FastAPI', 'Python'] * 2 + ['FastAPI']
+
+
+def test_read_frame_loads_only_requested_columns(tmp_path):
+    path = tmp_path / 'posts.parquet'
+    write_frame(make_posts(0, 3), path)
+
+    assert list(read_frame(path, columns=['id', 'score']).columns) == ['id', 'score']
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_clean_dataframe_parquet_matches_csv(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    posts = make_posts(0, 20)
+    write_frame(posts, tmp_path / 'raw.parquet')
+    write_frame(posts, tmp_path / 'raw.csv')
+
+    scraper.clean_dataframe(tmp_path / 'raw.parquet', tmp_path / 'cleaned.parquet')
+    scraper.clean_dataframe(tmp_path / 'raw.csv', tmp_path / 'cleaned.csv')
+
+    cleaned = read_frame(tmp_path / 'cleaned.parquet')
+    expected = pd.read_csv(tmp_path / 'cleaned.csv', keep_default_na=False)
+    for col in ['subreddit', 'title', 'url', 'content']:
+        assert cleaned[col].astype(str).tolist() == expected[col].astype(str).tolist()
+    assert cleaned['score'].dtype == 'int32'
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_shuffle_and_save_dataframe_parquet(mock_reddit, tmp_path):
+    write_frame(make_posts(0, 50), tmp_path / 'cleaned.parquet')
+
+    RedditScraper.shuffle_and_save_dataframe(tmp_path / 'cleaned.parquet', tmp_path / 'shuffled.parquet')
+
+    shuffled = read_frame(tmp_path / 'shuffled.parquet')
+    assert sorted(shuffled['id']) == sorted(f'id{i}' for i in range(50))
+    assert shuffled['score'].dtype == 'int32'
+
+
+def test_shuffle_out_of_core_parquet(tmp_path):
+    with open_writer(tmp_path / 'cleaned.parquet') as writer:
+        for start in range(0, 300, 100):
+            writer.write(make_posts(start, 100))
+
+    shuffle_out_of_core(tmp_path / 'cleaned.parquet', tmp_path / 'shuffled.parquet', chunk_size=40,
+                        bucket_bytes=1024, seed=3)
+
+    shuffled = read_frame(tmp_path / 'shuffled.parquet')
+    assert sorted(shuffled['id']) == sorted(f'id{i}' for i in range(300))
+    assert shuffled['id'].tolist() != [f'id{i}' for i in range(300)]
+
+
+def test_incomplete_writer_fails_when_created(tmp_path):
+    class IncompleteWriter(ArrowFrameWriter):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteWriter(tmp_path / 'posts.parquet')
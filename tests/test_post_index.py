@@ -0,0 +1,71 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.fast_api_scraper import app
+from app.post_index import PostIndex
+
+client = TestClient(app)
+
+
+def make_post(post_id, title, subreddit='Python', score=1, created_at=datetime(2024, 1, 1), content=''):
+    return {'subreddit': subreddit, 'title': title, 'score': score, 'id': post_id, 'url': 'http://example.com',
+            'num_comments': 0, 'created_at': created_at, 'content': content}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PostIndex(str(tmp_path / 'posts.db'), batch_size=2)
+    index.upsert_posts([
+        make_post('a', 'FastAPI tips', score=5, created_at=datetime(2024, 1, 1)),
+        make_post('b', 'Pandas tricks', content='Use FastAPI with pandas', score=9, created_at=datetime(2024, 2, 1)),
+        make_post('c', 'Rust news', subreddit='rust', score=3, created_at=datetime(2024, 3, 1)),
+    ])
+    return index
+
+
+def test_upsert_updates_existing_posts(index):
+    index.upsert_posts([make_post('a', 'FastAPI tips', score=50)])
+
+    assert index.count() == 3
+    assert index.search('fastapi', sort='score')[0] == make_post('a', 'FastAPI tips', score=50)
+
+
+def test_update_stats_changes_only_score_and_comments(index):
+    assert index.update_stats({'a': (42, 7), 'missing': (1, 1)}) == 1
+
+    post = index.search('fastapi', sort='score')[0]
+    assert (post['id'], post['score'], post['num_comments'], post['title']) == ('a', 42, 7, 'FastAPI tips')
+
+
+def test_keyword_search_covers_title_and_content(index):
+    assert {post['id'] for post in index.search('fastapi')} == {'a', 'b'}
+    assert [post['id'] for post in index.search('fastapi', sort='score')] == ['b', 'a']
+
+
+def test_keyword_search_escapes_fts_syntax(index):
+    assert index.search('"fastapi" OR -(') == []
+    assert [post['id'] for post in index.search('rust news')] == ['c']
+
+
+def test_updated_text_is_reindexed(index):
+    index.upsert_posts([make_post('c', 'Go news', subreddit='rust')])
+
+    assert index.search('rust') == []
+    assert [post['id'] for post in index.search('go')] == ['c']
+
+
+def test_filter_by_subreddit_and_time_range(index):
+    assert [post['id'] for post in index.search(subreddit='PYTHON')] == ['b', 'a']
+    assert [post['id'] for post in index.search(since=datetime(2024, 1, 15), until=datetime(2024, 3, 1))] == ['b']
+
+
+def test_search_endpoint(index):
+    with patch('app.fast_api_scraper.get_post_index', return_value=index):
+        response = client.get("/search", params={'q': 'fastapi', 'subreddit': 'python', 'sort': 'score'})
+
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json()['posts']] == ['b', 'a']
+    assert response.json()['posts'][0]['created_at'] == '2024-02-01T00:00:00'
@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import patch, MagicMock
+
+from app.rate_limiter import RateLimitScheduler, ScheduledRequestor, get_scheduler
+
+
+def test_reserve_uses_burst_then_paces():
+    scheduler = RateLimitScheduler(rate=10, burst=2)
+    waits = [scheduler.reserve() for _ in range(4)]
+
+    assert waits[0] == 0 and waits[1] == 0
+    assert 0.09 < waits[2] <= 0.1
+    assert 0.19 < waits[3] <= 0.2
+    assert scheduler.stats()['delayed_requests'] == 2
+
+
+def test_update_spreads_remaining_budget_over_window():
+    scheduler = RateLimitScheduler(rate=10, burst=5)
+    scheduler.update(200, {'x-ratelimit-remaining': '60', 'x-ratelimit-reset': '120'})
+
+    assert scheduler.rate == 0.5
+    assert scheduler.stats()['remaining'] == 60
+
+
+def test_exhausted_budget_pauses_until_reset():
+    scheduler = RateLimitScheduler(rate=10, burst=5)
+    scheduler.update(200, {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '30'})
+
+    assert scheduler.reserve() > 29
+
+
+def test_throttled_response_is_counted():
+    scheduler = RateLimitScheduler(rate=10, burst=5)
+    scheduler.update(429, {'retry-after': '2'})
+
+    assert scheduler.stats()['throttled_responses'] == 1
+    assert scheduler.reserve() > 1.9
+
+
+def test_get_scheduler_is_shared():
+    assert get_scheduler() is get_scheduler()
+
+
+def test_scheduled_requestor_retries_throttled_request():
+    statuses = [429, 200]
+    responses = []
+
+    @asynccontextmanager
+    async def fake_request(self, *args, **kwargs):
+        response = MagicMock(status=statuses.pop(0), headers={'retry-after': '0'})
+        responses.append(response)
+        yield response
+
+    scheduler = RateLimitScheduler(rate=1000, burst=5)
+    with patch('app.rate_limiter.Requestor.request', fake_request):
+        requestor = ScheduledRequestor(user_agent='test_user_agent', scheduler=scheduler)
+
+        async def send():
+            async with requestor.request('GET', 'https://oauth.reddit.com/api') as response:
+                return response.status
+
+        assert asyncio.run(send()) == 200
+
+    assert len(responses) == 2
+    assert scheduler.stats()['requests'] == 2
+    assert scheduler.stats()['throttled_responses'] == 1
@@ -0,0 +1,50 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from app.records import PostAccumulator
+from app.reddit_scraper import RedditScraper
+
+
+def make_submission(submission_id, created_utc, selftext=""):
+    return MagicMock(title=f"Post {submission_id}", score=7, id=submission_id, url="http://example.com",
+                     num_comments=3, created_utc=created_utc, selftext=selftext)
+
+
+SUBMISSIONS = [make_submission("a", 1616582223), make_submission("b", 1700000000.0, "body"),
+               make_submission("c", 0, None)]
+
+
+def make_accumulator():
+    posts = PostAccumulator()
+    for submission in SUBMISSIONS:
+        posts.append("Python", submission)
+    return posts
+
+
+def test_to_posts_matches_build_post():
+    expected = [RedditScraper.build_post("Python", submission) for submission in SUBMISSIONS]
+    assert make_accumulator().to_posts() == expected
+
+
+def test_to_frame_matches_frame_of_post_dicts(tmp_path):
+    expected = pd.DataFrame([RedditScraper.build_post("Python", submission) for submission in SUBMISSIONS])
+    frame = make_accumulator().to_frame()
+
+    assert list(frame.columns) == list(expected.columns)
+    assert list(frame['created_at']) == [datetime.fromtimestamp(s.created_utc) for s in SUBMISSIONS]
+    frame.to_csv(tmp_path / 'records.csv', index=False)
+    expected.to_csv(tmp_path / 'dicts.csv', index=False)
+    assert (tmp_path / 'records.csv').read_text() == (tmp_path / 'dicts.csv').read_text()
+
+
+def test_extend_and_iter_records():
+    posts = make_accumulator()
+    posts.extend(make_accumulator())
+
+    records = list(posts.iter_records())
+    assert len(posts) == 6
+    assert [record['id'] for record in records] == ["a", "b", "c"] * 2
+    assert records[1]['created_at'] == 1700000000
+    assert records[2]['content'] == ''
@@ -1,11 +1,15 @@
+import asyncio
 from datetime import datetime
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 import pandas as pd
 import pytest
 
 from app.reddit_scraper import RedditScraper, CLIENT_ID, CLIENT_SECRET, USER_AGENT, RAW_CSV_PATH, CLEANED_CSV_PATH, \
     SHUFFLED_CSV_PATH, LOG_FILE_PATH
+from app.records import PostAccumulator
+from app.result_cache import ResultCache
+from tests.helpers import AsyncIterator
 
 
 @pytest.fixture
@@ -66,16 +70,20 @@ def test_clean_dataframe_failure():
             scraper.clean_dataframe(RAW_CSV_PATH, CLEANED_CSV_PATH)
 
 
-def test_shuffle_and_save_dataframe_success():
-    df = pd.DataFrame({'col1': [1, 2, 3], 'col2': [4, 5, 6]})
-    with patch('app.reddit_scraper.pd.read_csv', return_value=df), \
-            patch('app.reddit_scraper.pd.DataFrame.to_csv') as mock_to_csv:
-        RedditScraper.shuffle_and_save_dataframe(CLEANED_CSV_PATH, SHUFFLED_CSV_PATH)
-        mock_to_csv.assert_called_once_with(SHUFFLED_CSV_PATH, index=False)
+def test_shuffle_and_save_dataframe_success(tmp_path):
+    df = pd.DataFrame({'col1': [1, 2, 3], 'col2': ["a", "multi\nline, \"quoted\"", "c"]})
+    df.to_csv(tmp_path / 'cleaned.csv', index=False)
+
+    RedditScraper.shuffle_and_save_dataframe(tmp_path / 'cleaned.csv', tmp_path / 'shuffled.csv', seed=7)
+    RedditScraper.shuffle_and_save_dataframe(tmp_path / 'cleaned.csv', tmp_path / 'again.csv', seed=7)
+
+    shuffled = pd.read_csv(tmp_path / 'shuffled.csv')
+    assert shuffled.sort_values('col1').reset_index(drop=True).equals(df)
+    assert (tmp_path / 'shuffled.csv').read_bytes() == (tmp_path / 'again.csv').read_bytes()
 
 
 def test_shuffle_and_save_dataframe_failure():
-    with patch('app.reddit_scraper.pd.read_csv', side_effect=Exception("Read error")):
+    with patch('app.reddit_scraper.shuffle_csv_rows', side_effect=Exception("Read error")):
         with pytest.raises(Exception, match="Read error"):
             RedditScraper.shuffle_and_save_dataframe(CLEANED_CSV_PATH, SHUFFLED_CSV_PATH)
 
@@ -88,6 +96,16 @@ def test_run_failure(mock_scraper):
     mock_scraper.spinner.fail.assert_called_once_with("An error occurred: Initialization error")
 
 
+def test_run_reports_failure():
+    with patch('app.reddit_scraper.asyncpraw.Reddit'):
+        scraper = RedditScraper("fake_client_id", "fake_client_secret", "fake_user_agent")
+    scraper.spinner = MagicMock()
+    scraper.initialize_reddit = MagicMock(side_effect=Exception("Initialization error"))
+
+    assert asyncio.run(scraper.run()) is False
+    scraper.spinner.fail.assert_called_once_with("An error occurred: Initialization error")
+
+
 @patch('app.reddit_scraper.praw.Reddit')
 def test_initialize_reddit_success(mock_reddit, mock_reddit_instance):
     mock_scraper = RedditScraper(
@@ -164,3 +182,232 @@ def test_run_success(mock_reddit, mock_reddit_instance):
 
     mock_scraper.spinner.start.assert_any_call('Initializing Reddit instance...')
     mock_scraper.spinner.start.assert_any_call('Fetching Reddit posts...')
+
+
+def make_submission(submission_id, created_utc=1616582223):
+    submission = MagicMock()
+    submission.title = f"Post {submission_id}"
+    submission.score = 10
+    submission.id = submission_id
+    submission.url = "http://example.com"
+    submission.num_comments = 5
+    submission.created_utc = created_utc
+    submission.selftext = ""
+    return submission
+
+
+def make_subreddit(name, submission_ids, delay=0):
+    subreddit = MagicMock(display_name=name)
+    subreddit.top.side_effect = lambda limit, time_filter: AsyncIterator(
+        [make_submission(i) for i in submission_ids], delay)
+    return subreddit
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_fetch_reddit_posts_concurrent_order(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    # The first subreddit is the slowest, but its posts must still come first.
+    subreddits = [make_subreddit("slow", ["a1", "a2"], delay=0.05), make_subreddit("fast", ["b1"])]
+    scraper.reddit.subreddits.search.return_value = AsyncIterator(subreddits)
+
+    posts = asyncio.run(scraper.fetch_reddit_posts("fastapi", 2, 2, concurrency=2))
+
+    assert [post['id'] for post in posts] == ["a1", "a2", "b1"]
+    assert [post['subreddit'] for post in posts] == ["slow", "slow", "fast"]
+    scraper.reddit.close.assert_awaited_once()
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_fetch_reddit_posts_respects_concurrency(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    in_flight = 0
+    peak = 0
+
+    async def tracked_fetch(subreddit, post_limit):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        posts = PostAccumulator()
+        posts.append(subreddit.display_name, make_submission(subreddit.display_name))
+        return posts
+
+    scraper.fetch_subreddit_posts = tracked_fetch
+    scraper.reddit.subreddits.search.return_value = AsyncIterator(
+        [MagicMock(display_name=str(i)) for i in range(10)])
+
+    posts = asyncio.run(scraper.fetch_reddit_posts("fastapi", 10, 1, concurrency=3))
+
+    assert [post['id'] for post in posts] == [str(i) for i in range(10)]
+    assert peak == 3
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_iter_reddit_posts_yields_every_post(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    subreddits = [make_subreddit("slow", ["a1", "a2"], delay=0.05), make_subreddit("fast", ["b1"])]
+    scraper.reddit.subreddits.search.return_value = AsyncIterator(subreddits)
+
+    async def collect():
+        return [post['id'] async for post in scraper.iter_reddit_posts("fastapi", 2, 2, concurrency=2)]
+
+    ids = asyncio.run(collect())
+
+    # Posts arrive as listings produce them, so the fast subreddit comes first.
+    assert ids == ["b1", "a1", "a2"]
+    scraper.reddit.close.assert_awaited_once()
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_iter_reddit_posts_raises_listing_errors(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    broken = MagicMock(display_name="broken")
+    broken.top.side_effect = Exception("API error")
+    scraper.reddit.subreddits.search.return_value = AsyncIterator([broken])
+
+    async def collect():
+        return [post async for post in scraper.iter_reddit_posts("fastapi", 1, 1)]
+
+    with pytest.raises(Exception, match="API error"):
+        asyncio.run(collect())
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_iter_reddit_posts_stops_listings_before_closing(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    events = []
+    scraper.reddit.close = AsyncMock(side_effect=lambda: events.append('client closed'))
+
+    async def slow_listing():
+        try:
+            await asyncio.sleep(10)
+            yield make_submission("never")
+        finally:
+            events.append('listing stopped')
+
+    slow = MagicMock(display_name="slow")
+    slow.top.side_effect = lambda limit, time_filter: slow_listing()
+    scraper.reddit.subreddits.search.return_value = AsyncIterator([make_subreddit("fast", ["b1"]), slow])
+
+    async def take_first():
+        posts = scraper.iter_reddit_posts("fastapi", 2, 1, concurrency=2)
+        first = await posts.__anext__()
+        await posts.aclose()
+        return first['id']
+
+    assert asyncio.run(take_first()) == "b1"
+    assert events == ['listing stopped', 'client closed']
+
+
+@patch('app.reddit_scraper.INDEX_ENABLED', False)
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_stream_posts_to_files_matches_batch_pipeline(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    posts = [RedditScraper.build_post("Python", make_submission(f"id{i}", 1616582223 + i)) for i in range(25)]
+    posts[3]['content'] = "Multi-line\nContent, with \"quotes\"!"
+    posts[4]['title'], posts[5]['content'] = "NA", "null"
+
+    async def fake_iter(*args, **kwargs):
+        for post in posts:
+            yield post
+
+    scraper.iter_reddit_posts = fake_iter
+    raw, cleaned = tmp_path / 'raw.csv', tmp_path / 'cleaned.csv'
+
+    count = asyncio.run(scraper.stream_posts_to_files("python", 1, 25, raw, cleaned, chunk_size=10))
+
+    batch_raw, batch_cleaned = tmp_path / 'batch_raw.csv', tmp_path / 'batch_cleaned.csv'
+    RedditScraper.save_posts_to_csv(posts, batch_raw)
+    scraper.clean_dataframe(batch_raw, batch_cleaned)
+    assert count == 25
+    assert raw.read_text() == batch_raw.read_text()
+    assert cleaned.read_text() == batch_cleaned.read_text()
+
+
+def make_info(stats):
+    """Fake ``reddit.info`` serving submissions from ``{id: (score, num_comments)}`` and recording each call."""
+    calls = []
+
+    def info(fullnames):
+        calls.append(fullnames)
+        return AsyncIterator([MagicMock(id=name[3:], score=stats[name[3:]][0], num_comments=stats[name[3:]][1])
+                              for name in fullnames if name[3:] in stats], delay=0.01)
+
+    return info, calls
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_fetch_post_stats_batches_ids(mock_reddit):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    post_ids = [f"id{i}" for i in range(250)]
+    scraper.reddit.info, calls = make_info({post_id: (i, i * 2) for i, post_id in enumerate(post_ids[:-1])})
+
+    stats = asyncio.run(scraper.fetch_post_stats(post_ids, concurrency=3, batch_size=500))
+
+    assert [len(fullnames) for fullnames in calls] == [100, 100, 50]
+    assert calls[0][0] == "t3_id0"
+    assert len(stats) == 249 and stats["id10"] == (10, 20)
+    scraper.reddit.close.assert_awaited_once()
+
+
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_fetch_cached_posts_closes_owned_client_on_cache_hit(mock_reddit):
+    cache = ResultCache(disk_dir=None)
+    cache.set(ResultCache.make_key("test_query", 1, 1), [{'id': "cached"}])
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+
+    with patch('app.reddit_scraper.get_result_cache', return_value=cache):
+        posts = asyncio.run(scraper.fetch_cached_posts("test_query", 1, 1))
+
+    assert posts == [{'id': "cached"}]
+    posts[0]['id'] = "changed"
+    assert cache.get(ResultCache.make_key("test_query", 1, 1)) == [{'id': "cached"}]
+    scraper.reddit.subreddits.search.assert_not_called()
+    scraper.reddit.close.assert_awaited_once()
+
+
+@patch('app.reddit_scraper.INDEX_ENABLED', False)
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_refresh_posts_updates_files_in_place(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    posts = [RedditScraper.build_post("Python", make_submission(f"id{i}", 1616582223 + i)) for i in range(3)]
+    raw, cleaned = tmp_path / 'raw.csv', tmp_path / 'cleaned.parquet'
+    RedditScraper.save_posts(posts, raw)
+    RedditScraper.save_posts(posts[:2], cleaned)
+    scraper.reddit.info, calls = make_info({"id0": (100, 7), "id2": (300, 9)})
+
+    refreshed = asyncio.run(scraper.refresh_posts([raw, cleaned, tmp_path / 'missing.csv']))
+
+    assert refreshed == 2
+    assert len(calls) == 1
+    raw_frame, cleaned_frame = pd.read_csv(raw), pd.read_parquet(cleaned)
+    assert list(raw_frame['score']) == [100, posts[1]['score'], 300]
+    assert list(raw_frame['num_comments']) == [7, posts[1]['num_comments'], 9]
+    assert list(raw_frame['title']) == [post['title'] for post in posts]
+    assert list(cleaned_frame['score']) == [100, posts[1]['score']]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['cleaned.parquet', 'raw.csv']
+
+
+@patch('app.reddit_scraper.INDEX_ENABLED', False)
+@patch('app.reddit_scraper.asyncpraw.Reddit')
+def test_refresh_posts_keeps_na_like_text(mock_reddit, tmp_path):
+    scraper = RedditScraper("test_client_id", "test_client_secret", "test_user_agent")
+    scraper.reddit.close = AsyncMock()
+    path = tmp_path / 'cleaned.csv'
+    path.write_text("subreddit,title,score,id,url,num_comments,created_at,content\n"
+                    "python,null,1,id0,http://example.com,2,2021-03-24 10:37:03,na\n"
+                    "python,NA,3,id1,http://example.com,4,2021-03-24 10:37:04,\n")
+    scraper.reddit.info, _ = make_info({"id0": (100, 7)})
+
+    asyncio.run(scraper.refresh_posts([path]))
+
+    assert path.read_text().splitlines()[1:] == ["python,null,100,id0,http://example.com,7,2021-03-24 10:37:03,na",
+                                                 "python,NA,3,id1,http://example.com,4,2021-03-24 10:37:04,"]
@@ -1,7 +1,9 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from app.fast_api_scraper import app, FastApiRedditScraper
+from tests.helpers import AsyncIterator
 client = TestClient(app)
 
 
@@ -77,3 +79,58 @@ def test_scrape_endpoint_error(mock_reddit_instance):
 
     assert response.status_code == 500
     assert response.json() == {"detail": "An error occurred while scraping: API error"}
+
+
+@pytest.fixture
+def pooled_reddit():
+    reddit = MagicMock()
+    with patch('app.reddit_scraper.asyncpraw.Reddit', return_value=reddit):
+        yield reddit
+
+
+def make_stream_subreddit():
+    submission = MagicMock(title="Test Post", score=10, id="test_id", url="http://example.com", num_comments=5,
+                           created_utc=1616582223, selftext="This is a test post")
+    subreddit = MagicMock(display_name="testsub")
+    subreddit.top.side_effect = lambda limit, time_filter: AsyncIterator([submission, submission])
+    return subreddit
+
+
+def test_scrape_stream_ndjson(pooled_reddit):
+    pooled_reddit.subreddits.search.side_effect = lambda query, limit: AsyncIterator([make_stream_subreddit()])
+
+    with TestClient(app) as stream_client:
+        response = stream_client.get("/scrape/fastapi/stream")
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])['title'] == "Test Post"
+
+
+def test_scrape_stream_sse(pooled_reddit):
+    pooled_reddit.subreddits.search.side_effect = lambda query, limit: AsyncIterator([make_stream_subreddit()])
+
+    with TestClient(app) as stream_client:
+        response = stream_client.get("/scrape/fastapi/stream?format=sse")
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = [event for event in response.text.split("\n\n") if event]
+    assert len(events) == 2
+    assert json.loads(events[0].removeprefix("data: "))['id'] == "test_id"
+
+
+def test_scrape_stream_reports_errors_in_band(pooled_reddit):
+    pooled_reddit.subreddits.search.side_effect = Exception("API error")
+
+    with TestClient(app) as stream_client:
+        response = stream_client.get("/scrape/fastapi/stream")
+
+    assert response.status_code == 200
+    assert json.loads(response.text) == {"error": "An error occurred while scraping: API error"}
+
+
+def test_scrape_stream_rejects_unknown_format():
+    response = client.get("/scrape/fastapi/stream?format=xml")
+    assert response.status_code == 422
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.result_cache import ResultCache, get_result_cache
+
+
+def test_get_or_fetch_caches_result():
+    cache = ResultCache(ttl=60, max_entries=10)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return ['post']
+
+    key = ResultCache.make_key('fastapi', 5, 10, 'hot')
+    assert asyncio.run(cache.get_or_fetch(key, fetch)) == ['post']
+    assert asyncio.run(cache.get_or_fetch(key, fetch)) == ['post']
+
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache(ttl=60, max_entries=10)
+    cache.set('key', 'value')
+
+    with patch('app.result_cache.time.time', return_value=10 ** 12):
+        assert cache.get('key') is None
+
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_concurrent_requests_are_coalesced():
+    cache = ResultCache(ttl=60, max_entries=10)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['post']
+
+    async def run_many():
+        return await asyncio.gather(*(cache.get_or_fetch('key', fetch) for _ in range(10)))
+
+    results = asyncio.run(run_many())
+
+    assert results == [['post']] * 10
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 9
+
+
+def test_cancelled_leader_returns_after_the_fetch_it_started():
+    cache = ResultCache(ttl=60, max_entries=10)
+    events = []
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        events.append('fetched')
+        return ['post']
+
+    async def cancel_leader():
+        leader = asyncio.ensure_future(cache.get_or_fetch('key', fetch))
+        follower = asyncio.ensure_future(cache.get_or_fetch('key', fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        events.append('leader returned')
+        return await follower
+
+    assert asyncio.run(cancel_leader()) == ['post']
+    assert events == ['fetched', 'leader returned']
+    assert cache.get('key') == ['post']
+
+
+def test_requests_are_coalesced_across_event_loops():
+    cache = ResultCache(ttl=60, max_entries=10)
+    calls = []
+    started = threading.Event()
+
+    async def slow_fetch():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.05)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(asyncio.run(cache.get_or_fetch('key', slow_fetch))))
+    leader.start()
+    started.wait()
+    results.append(asyncio.run(cache.get_or_fetch('key', slow_fetch)))
+    leader.join()
+
+    assert results == ['value', 'value']
+    assert len(calls) == 1
+
+
+def test_failed_fetch_is_not_cached():
+    cache = ResultCache(ttl=60, max_entries=10)
+
+    async def failing_fetch():
+        raise Exception("API error")
+
+    with pytest.raises(Exception, match="API error"):
+        asyncio.run(cache.get_or_fetch('key', failing_fetch))
+
+    assert cache.get('key') is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    ResultCache(ttl=60, max_entries=10, disk_dir=str(tmp_path)).set('key', ['post'])
+    cache = ResultCache(ttl=60, max_entries=10, disk_dir=str(tmp_path))
+
+    assert cache.get('key') == ['post']
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_get_result_cache_is_shared():
+    assert get_result_cache() is get_result_cache()
+
+
+def test_key_depends_on_listing_time_filter():
+    assert ResultCache.make_key('fastapi', 5, 10, 'top', 'all') != ResultCache.make_key('fastapi', 5, 10, 'top', 'day')
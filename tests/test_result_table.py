@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from app.result_table import ResultTable, page_count
+
+
+def make_posts(count):
+    return [{'subreddit': f'sub{i % 3}', 'title': f'Title {i}', 'score': i, 'id': f'id{i}', 'url': f'https://x/{i}',
+             'num_comments': count - i, 'created_at': datetime(2024, 1, 1 + i % 28), 'content': 'FastAPI' * (i % 2)}
+            for i in range(count)]
+
+
+def test_view_paginates_sorted_rows():
+    table = ResultTable(make_posts(120))
+
+    rows, total = table.view(sort_by='score', ascending=False, page=2, page_size=50)
+
+    assert total == 120
+    assert list(rows['score']) == list(range(69, 19, -1))
+
+
+def test_view_filters_before_paginating():
+    table = ResultTable(make_posts(120))
+
+    rows, total = table.view(text='fastapi', subreddits=['sub0'], min_score=30, sort_by='score', ascending=True,
+                             page=1, page_size=5)
+
+    expected = [i for i in range(30, 120) if i % 2 and i % 3 == 0]
+    assert total == len(expected)
+    assert list(rows['score']) == expected[:5]
+
+
+def test_view_without_sort_keeps_fetch_order():
+    rows, total = ResultTable(make_posts(10)).view(page=1, page_size=3)
+
+    assert total == 10
+    assert list(rows['id']) == ['id0', 'id1', 'id2']
+
+
+def test_view_rejects_unknown_sort_column():
+    with pytest.raises(ValueError):
+        ResultTable(make_posts(3)).view(sort_by='url')
+
+
+def test_empty_results_have_one_page():
+    table = ResultTable([])
+
+    rows, total = table.view(text='anything', sort_by='score')
+
+    assert total == 0 and rows.empty
+    assert page_count(total, 50) == 1
+    assert table.subreddits() == []
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.row_index import RowIndex, index_path, sample_csv_rows, scan_row_offsets, shuffle_csv_rows, split_csv_rows
+
+
+@pytest.fixture
+def posts_csv(tmp_path):
+    frame = pd.DataFrame({
+        'id': [f'id{i}' for i in range(100)],
+        'title': [f'Post "{i}"\nsecond line' if i % 10 == 0 else f'Post {i}, plain' for i in range(100)],
+        'score': range(100),
+    })
+    path = tmp_path / 'posts.csv'
+    frame.to_csv(path, index=False)
+    return path, frame
+
+
+def test_scan_handles_quoted_newlines_across_blocks(posts_csv):
+    path, frame = posts_csv
+
+    offsets = scan_row_offsets(path, block_size=7)
+
+    assert len(offsets) - 1 == len(frame)
+    data = path.read_bytes()
+    assert data[offsets[10]:offsets[11]] == b'id10,"Post ""10""\nsecond line",10\n'
+    assert offsets[-1] == len(data)
+
+
+def test_scan_without_trailing_newline(tmp_path):
+    path = tmp_path / 'posts.csv'
+    path.write_bytes(b'id,title\na,x\nb,y')
+
+    index = RowIndex.load(path, persist=False)
+    index.write_rows(np.array([1, 0]), tmp_path / 'out.csv')
+
+    assert list(scan_row_offsets(path)) == [9, 13, 16]
+    assert (tmp_path / 'out.csv').read_bytes() == b'id,title\nb,y\na,x\n'
+
+
+def test_index_is_persisted_and_rebuilt_when_stale(posts_csv):
+    path, frame = posts_csv
+    assert len(RowIndex.load(path)) == 100
+    assert os.path.exists(index_path(path))
+
+    frame.head(10).to_csv(path, index=False)
+
+    assert len(RowIndex.load(path)) == 10
+
+
+def test_shuffle_is_reproducible_and_keeps_rows(posts_csv, tmp_path):
+    path, frame = posts_csv
+
+    shuffle_csv_rows(path, tmp_path / 'a.csv', seed=1)
+    shuffle_csv_rows(path, tmp_path / 'b.csv', seed=1)
+    shuffle_csv_rows(path, tmp_path / 'c.csv', seed=2)
+
+    shuffled = pd.read_csv(tmp_path / 'a.csv')
+    assert (tmp_path / 'a.csv').read_bytes() == (tmp_path / 'b.csv').read_bytes()
+    assert (tmp_path / 'a.csv').read_bytes() != (tmp_path / 'c.csv').read_bytes()
+    assert list(shuffled['id']) != list(frame['id'])
+    assert shuffled.sort_values('score').reset_index(drop=True).equals(frame)
+
+
+def test_sample_keeps_file_order(posts_csv, tmp_path):
+    path, frame = posts_csv
+
+    assert sample_csv_rows(path, tmp_path / 'sample.csv', fraction=0.25, seed=3) == 25
+
+    sample = pd.read_csv(tmp_path / 'sample.csv')
+    assert len(sample) == 25 and sample['score'].is_monotonic_increasing
+    assert sample['title'].isin(frame['title']).all()
+
+
+def test_split_partitions_rows(posts_csv, tmp_path):
+    path, frame = posts_csv
+    outputs = {tmp_path / 'train.csv': 0.8, tmp_path / 'validation.csv': 0.1, tmp_path / 'test.csv': 0.1}
+
+    counts = split_csv_rows(path, outputs, seed=4)
+
+    parts = [pd.read_csv(output) for output in outputs]
+    assert list(counts.values()) == [80, 10, 10]
+    assert sorted(pd.concat(parts)['id']) == sorted(frame['id'])
+
+
+def test_split_rejects_fractions_not_summing_to_one(posts_csv, tmp_path):
+    with pytest.raises(ValueError):
+        split_csv_rows(posts_csv[0], {tmp_path / 'a.csv': 0.5, tmp_path / 'b.csv': 0.2})
+
+
+def test_row_index_requires_csv(tmp_path):
+    with pytest.raises(ValueError):
+        RowIndex.load(tmp_path / 'posts.parquet')
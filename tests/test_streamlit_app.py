@@ -0,0 +1,10 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+
+def test_module_imports():
+    from app import streamlit_app
+
+    assert callable(streamlit_app.load_results)
+    assert hasattr(streamlit_app.StreamlitRedditScraper, 'fetch_posts')
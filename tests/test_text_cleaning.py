@@ -0,0 +1,55 @@
+import re
+import string
+
+import numpy as np
+import pandas as pd
+
+from app.text_cleaning import clean_frame, clean_text, clean_text_column
+
+
+def legacy_clean_text(text):
+    if isinstance(text, str):
+        text = text.lower()
+        text = text.translate(str.maketrans('', '', string.punctuation))
+        text = re.sub(r'[^\w\s]', '', text)
+    return text
+
+
+def test_clean_text_column_matches_clean_text_for_every_character():
+    characters = [chr(i) for i in range(1, 0x30000) if not 0xd800 <= i < 0xe000]
+    series = pd.Series(characters + ["Hello, World! 🌍", "Café — déjà vu?", "under_score\tTab"])
+
+    cleaned = clean_text_column(series)
+
+    assert cleaned.tolist() == [legacy_clean_text(text) for text in series]
+
+
+def test_clean_text_column_keeps_non_strings():
+    series = pd.Series(["Hello, World!", np.nan, 42, None], dtype=object)
+
+    cleaned = clean_text_column(series)
+
+    assert cleaned[0] == "hello world"
+    assert pd.isna(cleaned[1]) and cleaned[2] == 42 and cleaned[3] is None
+
+
+def test_clean_text_column_handles_missing_values_in_string_columns():
+    series = pd.Series(["Héllo, World!", pd.NA, "A_b"], dtype='string')
+
+    cleaned = clean_text_column(series)
+
+    assert cleaned[0] == "héllo world" and pd.isna(cleaned[1]) and cleaned[2] == "ab"
+
+
+def test_clean_frame_only_touches_text_columns():
+    df = pd.DataFrame({'Title': ['Hello, World! 🌍'], 'score': [10], 'id': ['Ab_1'],
+                       'created_at': ['2021-03-24 12:00:00'], 'url': ['https://Example.com/a?b=1']})
+
+    clean_frame(df)
+
+    assert list(df.columns) == ['title', 'score', 'id', 'created_at', 'url']
+    assert df.loc[0, 'title'] == clean_text('Hello, World! 🌍')
+    assert df.loc[0, 'url'] == 'httpsexamplecomab1'
+    assert df.loc[0, 'id'] == 'Ab_1'
+    assert df.loc[0, 'created_at'] == '2021-03-24 12:00:00'
+    assert df.loc[0, 'score'] == 10